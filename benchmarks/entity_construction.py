@@ -0,0 +1,86 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Benchmark of building `Incident` instances from pages of results.
+
+Builds 100k incidents from canned page data (no requests are sent) the way
+`_fetch_page` used to, resolving the endpoint and client attributes of every
+row, and the way it does now.
+
+    python benchmarks/entity_construction.py
+"""
+from __future__ import print_function
+import re
+import timeit
+
+from pypd import Incident
+from pypd.mixins import ClientMixin
+
+API_KEY = 'FAUX_API_KEY'
+PAGE_SIZE = 100
+
+
+def incident(n):
+    return {
+        'id': 'PINC%05d' % n,
+        'type': 'incident',
+        'status': ('triggered', 'acknowledged', 'resolved')[n % 3],
+        'urgency': ('high', 'low')[n % 2],
+        'title': 'Incident %s' % n,
+        'service': {'id': 'PSERVIC', 'type': 'service_reference'},
+    }
+
+
+def legacy_init(self, api_key=None, _data=None):
+    """`Entity.__init__` as it used to be."""
+    if _data is not None:
+        self._set(_data)
+
+    cls = self.__class__
+    if cls.endpoint is not None:
+        endpoint = cls.endpoint
+    else:
+        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', cls.__name__)
+        endpoint = cls.sanitize_ep(
+            re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower(), plural=True)
+    self.endpoint = endpoint
+    if self.endpoint.endswith('/'):
+        self.endpoint = self.endpoint[:-1]
+
+    ClientMixin.__init__(self, api_key)
+
+
+class LegacyIncident(Incident):
+    __init__ = legacy_init
+
+
+def legacy(pages):
+    output = []
+    for datas in pages:
+        output += [LegacyIncident(api_key=API_KEY, _data=d) for d in datas]
+    return output
+
+
+def current(pages):
+    output = []
+    for datas in pages:
+        inst = Incident(api_key=API_KEY)
+        output += Incident._from_page(inst, datas)
+    return output
+
+
+def main(count=100000):
+    datas = [incident(n) for n in range(count)]
+    pages = [datas[i:i + PAGE_SIZE] for i in range(0, count, PAGE_SIZE)]
+
+    results = {}
+    for func in (legacy, current):
+        results[func.__name__] = min(timeit.repeat(
+            lambda: func(pages), number=1, repeat=3))
+    print('{0} incidents: legacy {1:.3f}s  current {2:.3f}s  ({3:.1f}x)'
+          .format(count, results['legacy'], results['current'],
+                  results['legacy'] / results['current']))
+
+
+if __name__ == '__main__':
+    main()
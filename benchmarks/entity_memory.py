@@ -0,0 +1,64 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Benchmark of the memory held by incidents built from pages of results.
+
+Decodes canned pages of 200k incidents (no requests are sent) and builds
+`Incident` instances from them, then compact ones (`Incident.compact()`),
+reporting the memory allocated for each.
+
+    python benchmarks/entity_memory.py
+"""
+from __future__ import print_function
+import json
+import tracemalloc
+
+from pypd import Incident
+
+API_KEY = 'FAUX_API_KEY'
+PAGE_SIZE = 100
+
+
+def incident(n):
+    return {
+        'id': 'PINC%05d' % n,
+        'type': 'incident',
+        'status': ('triggered', 'acknowledged', 'resolved')[n % 3],
+        'urgency': ('high', 'low')[n % 2],
+        'title': 'Incident %s' % n,
+        'service': {'id': 'PSERVIC', 'type': 'service_reference'},
+    }
+
+
+def build(cls, page, count):
+    inst = cls(api_key=API_KEY)
+    output = []
+    for _ in range(count // PAGE_SIZE):
+        # each page is decoded on its own, as responses are
+        output += cls._from_page(inst, json.loads(page))
+    return output
+
+
+def measure(cls, page, count):
+    tracemalloc.start()
+    try:
+        entities = build(cls, page, count)
+        return len(entities), tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main(count=200000):
+    page = json.dumps([incident(n) for n in range(PAGE_SIZE)])
+    results = {}
+    for name, cls in (('regular', Incident), ('compact', Incident.compact())):
+        n, size = measure(cls, page, count)
+        results[name] = size
+        print('{0}: {1} incidents, {2:.1f} MiB ({3:.0f} bytes each)'
+              .format(name, n, size / 2.0 ** 20, size / float(n)))
+    print('compact saves {0:.0%}'.format(
+        1 - results['compact'] / float(results['regular'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Benchmark of filtering `User.find()` results with `exclude`.
+
+Filters 50k users against 2k excluded email addresses (no requests are sent)
+by matching every user against every value, as `find()` used to, and with
+the filter compiled once per `find()`, as it does now.
+
+    python benchmarks/exclude_filter.py
+"""
+from __future__ import print_function
+import timeit
+
+from pypd import User
+
+API_KEY = 'FAUX_API_KEY'
+
+
+def user(n):
+    return User(api_key=API_KEY, _data={
+        'id': 'PUSR%05d' % n,
+        'type': 'user',
+        'name': 'User %s' % n,
+        'email': 'user%05d@example.com' % n,
+    })
+
+
+def legacy_exclude_filter(cls, excludes, item):
+    """`Entity._find_exclude_filter` as it used to be."""
+    if excludes is None:
+        return False
+
+    def test_each_exclude(exclude_value):
+        def exclude_equals_value_test(exclude_filter):
+            if callable(exclude_filter):
+                return exclude_filter(cls, item, exclude_value,)
+            return item.get(exclude_filter) == exclude_value
+        return any(map(exclude_equals_value_test, cls.EXCLUDE_FILTERS))
+    return any(map(test_each_exclude, excludes))
+
+
+def legacy(users, exclude):
+    return [u for u in users if not legacy_exclude_filter(User, exclude, u)]
+
+
+def current(users, exclude):
+    excluded = User._compile_exclude_filter(exclude)
+    return [u for u in users if not excluded(u)]
+
+
+def main(count=50000, excluded=2000):
+    users = [user(n) for n in range(count)]
+    exclude = ['user%05d@example.com' % n
+               for n in range(0, count, count // excluded)]
+    assert legacy(users, exclude) == current(users, exclude)
+
+    results = {}
+    for func in (legacy, current):
+        results[func.__name__] = min(timeit.repeat(
+            lambda: func(users, exclude), number=1, repeat=3))
+    print('{0} users, {1} excluded: legacy {2:.3f}s  current {3:.3f}s  '
+          '({4:.1f}x)'.format(count, len(exclude), results['legacy'],
+                              results['current'],
+                              results['legacy'] / results['current']))
+
+
+if __name__ == '__main__':
+    main()
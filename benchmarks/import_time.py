@@ -0,0 +1,53 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Benchmark the startup cost of importing pypd.
+
+Every statement is timed in a fresh interpreter, the fastest of a few runs
+is printed with the number of modules it imported. `baseline` is an empty
+interpreter, `requests` is what every model used to import up front.
+
+    python benchmarks/import_time.py
+"""
+from __future__ import print_function
+import subprocess
+import sys
+
+STATEMENTS = (
+    ('baseline', 'pass'),
+    ('requests', 'import requests'),
+    ('import pypd', 'import pypd'),
+    ('pypd.EventV2', 'import pypd; pypd.EventV2'),
+    ('pypd.Incident', 'import pypd; pypd.Incident'),
+    ('all models', 'import pypd; [getattr(pypd, n) for n in dir(pypd)]'),
+    ('HTTP stack', 'import pypd; pypd.Incident; import pypd.pool'),
+)
+
+SCRIPT = '''
+import sys, time
+modules = len(sys.modules)
+started = time.perf_counter()
+{0}
+print(time.perf_counter() - started, len(sys.modules) - modules)
+'''
+
+
+def measure(statement, repeat=5):
+    results = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', SCRIPT.format(statement)])
+        elapsed, modules = output.split()
+        results.append((float(elapsed), int(modules)))
+    return min(results)
+
+
+def main():
+    for name, statement in STATEMENTS:
+        elapsed, modules = measure(statement)
+        print('{0:>14}: {1:7.1f}ms  {2:4d} modules'.format(
+            name, elapsed * 1e3, modules))
+
+
+if __name__ == '__main__':
+    main()
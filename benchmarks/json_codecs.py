@@ -0,0 +1,92 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Benchmark decoding typical `Incident` and `LogEntry` pages with each codec.
+
+`legacy` is how responses used to be parsed, decoding the body to `str` to
+check it is not empty and parsing it again with `response.json()`. The other
+rows parse `response.content` bytes with every codec installed.
+
+    python benchmarks/json_codecs.py
+"""
+from __future__ import print_function
+import copy
+import json
+import os.path
+import timeit
+
+from pypd import codec
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test', 'data')
+PAGE_SIZES = (25, 100,)
+
+
+def load(name):
+    with open(os.path.join(DATA, name)) as f:
+        return json.load(f)
+
+
+def incident_page(size):
+    """A page of incidents with their alerts embedded (include[]=alerts)."""
+    incident = load('sample_incidents.json')[0]
+    alerts = load('sample_alerts.json')
+    incidents = []
+    for n in range(size):
+        item = copy.deepcopy(incident)
+        item['id'] = 'PINC%03d' % n
+        item['alerts'] = alerts
+        incidents.append(item)
+    return {'incidents': incidents, 'limit': size, 'offset': 0,
+            'more': True, 'total': None}
+
+
+def log_entry_page(size):
+    incident = load('sample_incidents.json')[0]
+    entries = [{
+        'id': 'PLOG%03d' % n,
+        'type': 'notify_log_entry',
+        'summary': 'Notified Nizar Gharbi by email',
+        'created_at': '2017-04-07T03:41:08Z',
+        'agent': incident['last_status_change_by'],
+        'channel': {'type': 'auto'},
+        'service': incident['service'],
+        'incident': {'id': incident['id'], 'type': 'incident_reference'},
+        'teams': [],
+        'contexts': [],
+        'user': incident['last_status_change_by'],
+    } for n in range(size)]
+    return {'log_entries': entries, 'limit': size, 'offset': 0,
+            'more': True, 'total': None}
+
+
+def legacy(content):
+    text = content.decode('utf-8')
+    if not text:
+        return None
+    return json.loads(content.decode('utf-8'))
+
+
+def main(number=200):
+    pages = []
+    for size in PAGE_SIZES:
+        pages.append(('incidents x%s' % size, incident_page(size)))
+        pages.append(('log_entries x%s' % size, log_entry_page(size)))
+
+    decoders = [('legacy', legacy)]
+    decoders += [(name, codec.create(name).loads)
+                 for name in codec.available()]
+
+    for name, page in pages:
+        content = json.dumps(page).encode('utf-8')
+        print('{0} ({1} KiB)'.format(name, len(content) // 1024))
+        baseline = None
+        for decoder_name, loads in decoders:
+            elapsed = min(timeit.repeat(lambda: loads(content),
+                                        number=number, repeat=3)) / number
+            baseline = baseline or elapsed
+            print('    {0:>8}: {1:8.1f}us  ({2:.1f}x)'.format(
+                decoder_name, elapsed * 1e6, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
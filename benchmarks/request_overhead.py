@@ -0,0 +1,93 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Micro-benchmark of the per-request work done by `ClientMixin.request`.
+
+Compares building headers and encoding query params the way it used to be
+done on every call with the per-API-key headers and `encode_query_params`.
+
+    python benchmarks/request_overhead.py
+"""
+from __future__ import print_function
+import datetime
+import timeit
+from numbers import Number
+
+import six
+
+from pypd.mixins import (ClientMixin, CONTENT_TYPE, base_headers,
+                         encode_query_params)
+from pypd.models.entity import Entity
+
+API_KEY = 'FAUX_API_KEY'
+SERVICES = [Entity(_data={'id': 'PSERVI%s' % n}) for n in range(3)]
+QUERY_SHAPES = {
+    'find page': {'limit': 100, 'offset': 200, 'query': 'joe'},
+    'incident query': {
+        'limit': 100,
+        'offset': 0,
+        'since': datetime.datetime(2018, 1, 1),
+        'until': datetime.datetime(2018, 2, 1),
+        'statuses': ['triggered', 'acknowledged'],
+        'service_ids': SERVICES,
+        'time_zone': 'UTC',
+    },
+}
+
+
+def legacy(api_key, query_params, add_headers=None):
+    """Headers and query params as `request` used to build them."""
+    auth = 'Token token={0}'.format(api_key)
+    query_params = dict(query_params)
+    headers = {
+        'Accept': CONTENT_TYPE,
+        'Authorization': auth,
+        'Content-Type': 'application/json',
+    }
+    if add_headers is not None:
+        headers.update(**add_headers)
+
+    for k, v in query_params.copy().items():
+        if isinstance(v, six.string_types):
+            continue
+        elif isinstance(v, Number):
+            continue
+        elif isinstance(v, datetime.datetime):
+            query_params[k] = v.isoformat()
+        elif isinstance(v, ClientMixin):
+            query_params[k] = v['id']
+        try:
+            iter(v)
+        except:
+            continue
+        key = '%s[]' % k
+        query_params.pop(k)
+        values = [v_['id'] if isinstance(v_, ClientMixin) else v_
+                  for v_ in v]
+        query_params[key] = values
+    return headers, query_params
+
+
+def current(api_key, query_params, add_headers=None):
+    """Headers and query params as `request` builds them now."""
+    headers = base_headers(api_key)
+    if add_headers is not None:
+        headers = dict(headers, **add_headers)
+    return headers, encode_query_params(query_params)
+
+
+def main(number=100000):
+    for name, query_params in sorted(QUERY_SHAPES.items()):
+        results = {}
+        for func in (legacy, current):
+            results[func.__name__] = min(timeit.repeat(
+                lambda: func(API_KEY, query_params),
+                number=number, repeat=3,
+            )) / number * 1e6
+        print('{0:>16}: legacy {1:6.2f}us  current {2:6.2f}us  ({3:.1f}x)'
+              .format(name, results['legacy'], results['current'],
+                      results['legacy'] / results['current']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,71 @@
-
 # Copyright (c) PagerDuty.
 # See LICENSE for details.
+import importlib
 import logging
+import sys
 
 from .version import __version__
-from .models.ability import can, abilities
-from .models.add_ons import AddOn
-from .models.escalation_policy import EscalationPolicy
-from .models.event import Event, EventV2
-from .models.alert import Alert
-from .models.incident import Incident
-from .models.integration import Integration
-from .models.log_entry import LogEntry
-from .models.maintenance_window import MaintenanceWindow
-from .models.note import Note
-from .models.notification import Notification
-from .models.on_call import OnCall
-from .models.schedule import Schedule
-from .models.service import Service
-from .models.team import Team
-from .models.user import User
-from .models.vendor import Vendor
 
 api_key = None
 base_url = 'https://api.pagerduty.com'
 proxies = None
+# (connect, read) timeouts of requests in seconds, as `requests` takes them
+timeout = (5.0, 30.0)
+# number of workers used to fetch the pages of a `find()` concurrently
+page_concurrency = 1
+# number of workers used by `fetch_many()`
+fetch_concurrency = 10
+# number of workers used to fetch the time windows of a sharded `find()`
+window_concurrency = 4
+
+# models (and the HTTP stack they use) are imported on first access, eg.
+# `pypd.EventV2` only imports `pypd.models.event`
+_LAZY_ATTRIBUTES = {
+    'Client': '.client',
+    'can': '.models.ability',
+    'abilities': '.models.ability',
+    'AddOn': '.models.add_ons',
+    'AuditRecord': '.models.audit_record',
+    'EscalationPolicy': '.models.escalation_policy',
+    'Event': '.models.event',
+    'EventV2': '.models.event',
+    'Alert': '.models.alert',
+    'Incident': '.models.incident',
+    'Integration': '.models.integration',
+    'LogEntry': '.models.log_entry',
+    'MaintenanceWindow': '.models.maintenance_window',
+    'Note': '.models.note',
+    'Notification': '.models.notification',
+    'OnCall': '.models.on_call',
+    'Schedule': '.models.schedule',
+    'Service': '.models.service',
+    'Team': '.models.team',
+    'User': '.models.user',
+    'Vendor': '.models.vendor',
+}
+
+
+def __getattr__(name):
+    """Import the model called `name` on first access."""
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError('module {0!r} has no attribute {1!r}'
+                             .format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+# module level __getattr__ needs Python 3.7, import every model up front on 3.6
+if sys.version_info < (3, 7):
+    for _name in _LAZY_ATTRIBUTES:
+        __getattr__(_name)
+
 
 def set_api_key_from_file(path, set_global=True):
     """Set the global api_key from a file path."""
@@ -0,0 +1,363 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Opt-in cache of GET responses for entities that rarely change.
+
+Models set how long their responses may be cached with the `CACHE_TTL` class
+attribute (in seconds, None means never cached), eg. `User`, `Service`,
+`EscalationPolicy`, `Schedule`, `Team` and `Vendor` do. Nothing is cached
+until a cache is set for the package, eg.
+
+    from pypd.cache import MemoryCache, SQLiteCache, set_cache
+    set_cache(MemoryCache(maxsize=1024))
+    # or, to keep the cache across runs
+    set_cache(SQLiteCache('~/.cache/pypd.sqlite', compress=True))
+
+    pypd.Service.fetch('PXXXXXX')   # sent to the API
+    pypd.Service.fetch('PXXXXXX')   # served from the cache
+
+    pypd.Service.CACHE_TTL = 60     # tune the TTL of a model
+    set_cache(None)                 # stop caching
+
+Responses are cached by base URL, API key, endpoint and query params. Any
+other request (`create`, `delete`, `put`, ...) done through pypd drops the
+cached responses of the resource it writes to, eg. a PUT to
+`services/PXXXXXX` drops every cached `services/...` response.
+
+The `ETag` and `Last-Modified` headers of responses are cached along with
+them. Once expired, those responses are revalidated with a conditional
+request, and reused as they are when the API answers `304 Not Modified`.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .codec import get_codec
+
+
+def cache_key(base_url, api_key, endpoint, params):
+    """
+    Return the key a GET of `endpoint` is cached at.
+
+    `params` are the query params as encoded by `encode_query_params`.
+    """
+    params = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                          for k, v in params.items()))
+    return (base_url, api_key, endpoint, params)
+
+
+def resource(endpoint):
+    """Return the resource `endpoint` belongs to, eg. `services`."""
+    return endpoint.strip('/').split('/', 1)[0]
+
+
+class MemoryCache(object):
+    """
+    In-memory LRU cache whose entries expire after a TTL.
+
+    At most `maxsize` entries are kept, the least recently used ones are
+    dropped first. Values are copied in and out so that modifying an entity
+    does not modify what is cached.
+    """
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.revalidations = 0
+
+    def lookup(self, key):
+        """
+        Return `(value, validators, fresh)` cached at `key`, None if missing.
+
+        Expired entries are kept (and returned with `fresh` False) when they
+        have validators, so that they can be revalidated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and entry[0] > self.clock()
+            if entry is not None and not fresh and not entry[2]:
+                del self._entries[key]
+                entry = None
+
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+        return copy.deepcopy(entry[1]), entry[2], fresh
+
+    def get(self, key):
+        """Return the value cached at `key`, None if missing or expired."""
+        entry = self.lookup(key)
+        if entry is None or not entry[2]:
+            return None
+        return entry[0]
+
+    def set(self, key, value, ttl, validators=None):
+        """Cache `value` and its `validators` at `key` for `ttl` seconds."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value, validators or {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def touch(self, key, ttl):
+        """Keep the value at `key` for `ttl` more seconds, once revalidated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (self.clock() + ttl,) + entry[1:]
+                self.revalidations += 1
+
+    def invalidate(self, endpoint):
+        """Drop the cached responses of the resource `endpoint` is part of."""
+        name = resource(endpoint)
+        with self._lock:
+            for key in [k for k in self._entries if resource(k[2]) == name]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit, miss, eviction and revalidation counts and size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'revalidations': self.revalidations,
+                'size': len(self._entries),
+            }
+
+
+class SQLiteCache(object):
+    """
+    Cache kept in a SQLite file, which outlives the process.
+
+    Responses are stored encoded by the package codec, compressed with zlib
+    when `compress` is True. At most `maxsize` entries (and `max_bytes` bytes
+    of stored values, if set) are kept, the least recently used ones are
+    dropped first.
+
+    `sqlite3` (and `zlib`) are only imported once a `SQLiteCache` is used.
+    The database is in WAL mode and every thread (and process) uses its own
+    connection, so several processes on one host can share the file.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS entries ('
+        ' key TEXT PRIMARY KEY,'
+        ' resource TEXT NOT NULL,'
+        ' expires REAL NOT NULL,'
+        ' accessed REAL NOT NULL,'
+        ' size INTEGER NOT NULL,'
+        ' value BLOB NOT NULL,'
+        ' validators TEXT)',
+        'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)',
+        'CREATE INDEX IF NOT EXISTS entries_resource ON entries (resource)',
+    )
+
+    def __init__(self, path, maxsize=10000, max_bytes=None, compress=False,
+                 timeout=5.0, clock=time.time):
+        self.path = os.path.expanduser(path)
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.timeout = timeout
+        self.clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.revalidations = 0
+
+        with self._connection() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self):
+        """Return the connection of this thread, opening it if needed."""
+        connection = getattr(self._local, 'connection', None)
+        # connections must not be shared with forked processes
+        if connection is None or self._local.pid != os.getpid():
+            import sqlite3
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _key(key):
+        # keys hold API keys, which are not stored as they are
+        import hashlib
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, key):
+        """
+        Return `(value, validators, fresh)` cached at `key`, None if missing.
+
+        Expired entries are kept (and returned with `fresh` False) when they
+        have validators, so that they can be revalidated.
+        """
+        key = self._key(key)
+        now = self.clock()
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT expires, value, validators FROM entries'
+                ' WHERE key = ?', (key,),
+            ).fetchone()
+            if row is not None and row[0] <= now and not row[2]:
+                connection.execute('DELETE FROM entries WHERE key = ?',
+                                   (key,))
+                row = None
+            if row is not None:
+                connection.execute(
+                    'UPDATE entries SET accessed = ? WHERE key = ?',
+                    (now, key),
+                )
+
+        fresh = row is not None and row[0] > now
+        self._count(fresh)
+        if row is None:
+            return None
+
+        value = row[1]
+        if self.compress:
+            import zlib
+            value = zlib.decompress(value)
+        validators = json.loads(row[2]) if row[2] else {}
+        return get_codec().loads(value), validators, fresh
+
+    def get(self, key):
+        """Return the value cached at `key`, None if missing or expired."""
+        entry = self.lookup(key)
+        if entry is None or not entry[2]:
+            return None
+        return entry[0]
+
+    def set(self, key, value, ttl, validators=None):
+        """Cache `value` and its `validators` at `key` for `ttl` seconds."""
+        data = get_codec().dumps(value)
+        if self.compress:
+            import zlib
+            data = zlib.compress(data)
+
+        now = self.clock()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO entries'
+                ' (key, resource, expires, accessed, size, value, validators)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self._key(key), resource(key[2]), now + ttl, now, len(data),
+                 data,
+                 json.dumps(validators) if validators else None),
+            )
+            self._evict(connection, now)
+
+    def touch(self, key, ttl):
+        """Keep the value at `key` for `ttl` more seconds, once revalidated."""
+        now = self.clock()
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE entries SET expires = ?, accessed = ? WHERE key = ?',
+                (now + ttl, now, self._key(key)),
+            )
+        with self._lock:
+            self.revalidations += 1
+
+    def _evict(self, connection, now):
+        """
+        Drop expired entries that cannot be revalidated, then the least
+        recently used ones while over the limits.
+        """
+        connection.execute('DELETE FROM entries WHERE expires <= ?'
+                           ' AND validators IS NULL', (now,))
+        count, total = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries',
+        ).fetchone()
+        if count <= self.maxsize and (self.max_bytes is None or
+                                      total <= self.max_bytes):
+            return
+
+        evicted = []
+        rows = connection.execute(
+            'SELECT key, size FROM entries ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if count <= self.maxsize and (self.max_bytes is None or
+                                          total <= self.max_bytes):
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+
+        connection.executemany('DELETE FROM entries WHERE key = ?', evicted)
+        with self._lock:
+            self.evictions += len(evicted)
+
+    def invalidate(self, endpoint):
+        """Drop the cached responses of the resource `endpoint` is part of."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM entries WHERE resource = ?',
+                               (resource(endpoint),))
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM entries')
+
+    def stats(self):
+        """Return hit, miss, eviction and revalidation counts and size."""
+        count, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries',
+        ).fetchone()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'revalidations': self.revalidations,
+                'size': count,
+                'bytes': total,
+            }
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the package-wide cache, None if caching is disabled."""
+    return _cache
+
+
+def set_cache(new_cache):
+    """Set the package-wide cache, None disables caching."""
+    global _cache
+    _cache = new_cache
+    return new_cache
@@ -0,0 +1,217 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Clients own the credentials and machinery requests are sent with.
+
+A `Client` has its own API key, base URL, proxies and timeouts, as well as
+its own connection pool, async pool, rate limiter, retry policy and single
+flight, so that one process can drive several PagerDuty accounts without
+them sharing any state. Models accessed on a client are bound to it, eg.
+
+    from pypd import Client
+
+    acme = Client(api_key='ACME_API_KEY')
+    initech = Client(api_key='INITECH_API_KEY', cache=MemoryCache())
+
+    acme.Incident.find(statuses=['triggered'])
+    initech.Service.fetch('PXXXXXX').integrations()
+    acme.abilities()
+
+Models that are not accessed on a client (eg. `pypd.Incident`) use the
+default client, which reads the module globals (`pypd.api_key`, ...) and the
+package-wide pool, cache, rate limiter, ... every time it is used.
+"""
+import functools
+import threading
+
+import pypd
+from .cache import get_cache
+from .codec import get_codec
+from .ratelimit import RateLimiter, get_rate_limiter
+from .singleflight import SingleFlight, get_single_flight
+
+# `Client` arguments left to their default create the client's own instance
+DEFAULT = object()
+
+# functions of pypd that take the client to use as `client=`
+_FUNCTIONS = ('abilities', 'can',)
+
+
+def _new_pool():
+    from .pool import ConnectionPool
+    return ConnectionPool()
+
+
+def _new_async_pool():
+    from .pool import AsyncPool
+    return AsyncPool()
+
+
+def _new_retry_policy():
+    from .retry import RetryPolicy
+    return RetryPolicy()
+
+
+class Client(object):
+    """
+    Credentials and the machinery used to send requests with them.
+
+    `pool`, `async_pool`, `rate_limiter`, `retry_policy` and `single_flight`
+    default to new instances owned by this client (created when first
+    used), None disables the ones that can be disabled like the package-wide
+    setters do. `cache` is None (no caching) unless given, and `codec`
+    defaults to the package's codec.
+    """
+
+    def __init__(self, api_key=None, base_url='https://api.pagerduty.com',
+                 proxies=None, timeout=(5.0, 30.0), pool=DEFAULT,
+                 async_pool=DEFAULT, cache=None, rate_limiter=DEFAULT,
+                 retry_policy=DEFAULT, single_flight=DEFAULT, codec=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.proxies = proxies
+        self.timeout = timeout
+        self._pool = pool
+        self._async_pool = async_pool
+        self._cache = cache
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._single_flight = single_flight
+        self._codec = codec
+        self._lock = threading.RLock()
+        self._models = {}
+
+    def _resource(self, name, factory):
+        """Return the resource at attribute `name`, created if DEFAULT."""
+        value = getattr(self, name)
+        if value is DEFAULT:
+            with self._lock:
+                value = getattr(self, name)
+                if value is DEFAULT:
+                    value = factory()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def pool(self):
+        return self._resource('_pool', _new_pool)
+
+    @property
+    def async_pool(self):
+        return self._resource('_async_pool', _new_async_pool)
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def rate_limiter(self):
+        return self._resource('_rate_limiter', RateLimiter)
+
+    @property
+    def retry_policy(self):
+        return self._resource('_retry_policy', _new_retry_policy)
+
+    @property
+    def single_flight(self):
+        return self._resource('_single_flight', SingleFlight)
+
+    @property
+    def codec(self):
+        if self._codec is not None:
+            return self._codec
+        return get_codec()
+
+    def bind(self, model):
+        """
+        Return a subclass of the `model` class that is bound to this client.
+
+        Models it creates through factories (eg. `Incident.logEntryFactory`)
+        are bound to this client too.
+        """
+        from .mixins import ClientMixin
+
+        with self._lock:
+            bound = self._models.get(model)
+            if bound is not None:
+                return bound
+
+            attributes = {
+                'client': self,
+                '__module__': model.__module__,
+                '__doc__': model.__doc__,
+            }
+            if getattr(model, '_compact', False):
+                attributes['__slots__'] = ()
+            # registered before its factories, which may refer back to it
+            bound = self._models[model] = type(model.__name__, (model,),
+                                               attributes)
+            for name in dir(model):
+                factory = getattr(model, name)
+                if (name.endswith('Factory') and isinstance(factory, type) and
+                        issubclass(factory, ClientMixin)):
+                    setattr(bound, name, self.bind(factory))
+            return bound
+
+    def __getattr__(self, name):
+        """Return the model (or function) `name` of pypd, bound to this."""
+        if name in _FUNCTIONS:
+            return functools.partial(getattr(pypd, name), client=self)
+        elif name in pypd._LAZY_ATTRIBUTES and name[0].isupper():
+            value = getattr(pypd, name)
+            if value is not Client:
+                return self.bind(value)
+        raise AttributeError('{0!r} object has no attribute {1!r}'
+                             .format(type(self).__name__, name))
+
+    def close(self):
+        """Close the pools owned by this client."""
+        with self._lock:
+            for name in ('_pool', '_async_pool'):
+                value = getattr(self, name)
+                if value is not DEFAULT and value is not None:
+                    value.close()
+                    setattr(self, name, DEFAULT)
+
+
+class _DefaultClient(Client):
+    """The client reading the module globals and package-wide settings."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._models = {}
+
+    api_key = property(lambda self: pypd.api_key)
+    base_url = property(lambda self: pypd.base_url)
+    proxies = property(lambda self: pypd.proxies)
+    timeout = property(lambda self: pypd.timeout)
+
+    @property
+    def pool(self):
+        from .pool import get_pool
+        return get_pool()
+
+    @property
+    def async_pool(self):
+        from .pool import get_async_pool
+        return get_async_pool()
+
+    cache = property(lambda self: get_cache())
+    rate_limiter = property(lambda self: get_rate_limiter())
+    single_flight = property(lambda self: get_single_flight())
+    codec = property(lambda self: get_codec())
+
+    @property
+    def retry_policy(self):
+        from .retry import get_retry_policy
+        return get_retry_policy()
+
+    def bind(self, model):
+        # the default client's models are the models themselves
+        return model
+
+    def close(self):
+        pass
+
+
+default_client = _DefaultClient()
@@ -0,0 +1,113 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+JSON codecs used to encode request bodies and decode response bodies.
+
+The standard library `json` module is used by default. `orjson` or `ujson`
+can be used instead when they are installed, they are noticeably faster at
+decoding large pages of incidents or log entries, eg.
+
+    from pypd.codec import set_codec
+    set_codec('orjson')
+    set_codec('auto')  # the fastest codec installed
+
+A codec can also be set for a single model by setting the `codec` class
+attribute of a `ClientMixin` subclass to a codec instance.
+
+Codecs decode bytes (`response.content`) straight away, without first
+decoding them into a `str`, and encode into UTF-8 bytes.
+"""
+import json
+
+
+class JSONCodec(object):
+    """Codec using the standard library `json` module."""
+
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj, allow_nan=False).encode('utf-8')
+
+
+class OrjsonCodec(object):
+    """Codec using `orjson`, which has to be installed."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.loads = orjson.loads
+        self.dumps = orjson.dumps
+
+
+class UJSONCodec(object):
+    """Codec using `ujson`, which has to be installed."""
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.loads = ujson.loads
+        self._dumps = ujson.dumps
+
+    def dumps(self, obj):
+        return self._dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+CODECS = {
+    'json': JSONCodec,
+    'orjson': OrjsonCodec,
+    'ujson': UJSONCodec,
+}
+
+# order in which codecs are tried by `auto`
+PREFERENCE = ('orjson', 'ujson', 'json',)
+
+
+def available():
+    """Return the names of the codecs that can be used."""
+    names = []
+    for name in PREFERENCE:
+        try:
+            CODECS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def create(name):
+    """
+    Return a new codec called `name`, or the fastest one for `auto`.
+
+    Raises ImportError when the codec's library is not installed.
+    """
+    if name == 'auto':
+        name = available()[0]
+
+    try:
+        codec_cls = CODECS[name]
+    except KeyError:
+        raise ValueError('Unknown codec %r, expected auto or one of %s'
+                         % (name, ', '.join(sorted(CODECS))))
+    return codec_cls()
+
+
+_codec = JSONCodec()
+
+
+def get_codec():
+    """Return the package-wide codec."""
+    return _codec
+
+
+def set_codec(new_codec):
+    """Set the package-wide codec, by name or as a codec instance."""
+    global _codec
+    if isinstance(new_codec, str):
+        new_codec = create(new_codec)
+    _codec = new_codec
+    return new_codec
@@ -0,0 +1,63 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Time budgets shared by every request of an operation.
+
+`find()`, `iter_find()`, `fetch()` and `fetch_many()` take a `deadline=` (in
+seconds, or a `Deadline`) shared by every request of the operation: every
+page or entity fetched and their retries. The timeouts of requests are
+shortened to what is left of the deadline, and once it has passed
+`DeadlineExceeded` is raised, eg.
+
+    incidents = Incident.find(statuses=['triggered'], deadline=30)
+
+    # streams stop at the deadline with what was fetched so far
+    for incident in Incident.iter_find(deadline=30):
+        ...
+"""
+import time
+
+from .errors import DeadlineExceeded
+
+
+class Deadline(object):
+    """A point in time `seconds` from now by which an operation must end."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires = clock() + seconds
+
+    @classmethod
+    def coerce(cls, deadline):
+        """Return `deadline` as a `Deadline`, None if it is None."""
+        if deadline is None or isinstance(deadline, cls):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        """Return the number of seconds left, 0 once expired."""
+        return max(0.0, self.expires - self.clock())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise `DeadlineExceeded` if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceeded(self.seconds)
+
+    def timeout(self, timeout):
+        """
+        Return `timeout`, as given to `requests`, capped to the time left.
+
+        `timeout` is None, a number of seconds or a (connect, read) tuple.
+        """
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        elif isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining)
+                         for t in timeout)
+        return min(timeout, remaining)
@@ -41,6 +41,22 @@ class BadRequest(Error):
         return error
 
 
+class RateLimitExceeded(BadRequest):
+    """The API kept answering 429 Too Many Requests."""
+
+
+class DeadlineExceeded(Error):
+    """An operation did not complete within its deadline."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        Error.__init__(self, seconds)
+
+    def __str__(self):
+        return '{0}: not done within {1} seconds'.format(
+            self.__class__.__name__, self.seconds)
+
+
 class UnknownError(Error):
     def __init__(self, code, url, message=''):
         self.code = code
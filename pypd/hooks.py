@@ -0,0 +1,103 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Hooks to instrument the HTTP requests done by pypd.
+
+Functions can be registered for these events, they are called with keyword
+arguments only (accept `**kwargs` to stay compatible with later additions):
+
+    on_request_start:
+        method, url, endpoint, bytes_out
+    on_request_end:
+        method, url, endpoint, bytes_out, bytes_in, status, elapsed, error
+    on_retry:
+        method, url, endpoint, attempt, delay, status, error
+    on_page_size:
+        endpoint, previous, limit, reason, elapsed, bytes_in
+
+`endpoint` is the endpoint template, eg. `incidents/{id}/log_entries` rather
+than the endpoint with the actual ID in it, `status` is None when the request
+raised `error`, `elapsed` is in seconds and byte counts are body sizes.
+`on_page_size` is called when the page size of a query changes from
+`previous` to `limit` (see `pypd.paging`), `reason` being `slow`, `large` or
+`recovered`. Eg.
+
+    from pypd import hooks
+
+    def track(endpoint, status, elapsed, **kwargs):
+        statsd.timing('pagerduty.%s.%s' % (endpoint, status), elapsed)
+
+    hooks.register('on_request_end', track)
+
+No work is done to gather this information when no hooks are registered.
+Exceptions raised by hooks are logged and otherwise ignored.
+"""
+import re
+import threading
+from functools import lru_cache
+
+from .log import error
+
+EVENTS = ('on_request_start', 'on_request_end', 'on_retry', 'on_page_size',)
+
+# segments of endpoints that name a resource, anything else is an ID
+RESOURCE_SEGMENT = re.compile(r'^[a-z_]*$')
+
+# registered hooks by event, tuples are replaced (never modified) so they can
+# be iterated without locking
+_hooks = dict((event, ()) for event in EVENTS)
+_lock = threading.Lock()
+
+
+def _check(event):
+    if event not in _hooks:
+        raise ValueError('Unknown hook event %r, expected one of %s'
+                         % (event, ', '.join(EVENTS)))
+
+
+def register(event, func):
+    """Call `func` on every `event`, returns `func`."""
+    _check(event)
+    with _lock:
+        _hooks[event] = _hooks[event] + (func,)
+    return func
+
+
+def unregister(event, func):
+    """Stop calling `func` on `event`."""
+    _check(event)
+    with _lock:
+        _hooks[event] = tuple(f for f in _hooks[event] if f != func)
+
+
+def clear(event=None):
+    """Unregister every hook of `event`, or of every event if None."""
+    with _lock:
+        for name in (EVENTS if event is None else (event,)):
+            _check(name)
+            _hooks[name] = ()
+
+
+def get(event):
+    """Return the hooks registered for `event`, an empty tuple if none."""
+    return _hooks[event]
+
+
+def fire(funcs, **info):
+    """Call every function in `funcs` with `info`."""
+    for func in funcs:
+        try:
+            func(**info)
+        except Exception:
+            error('Hook %r raised an exception', func, exc_info=True)
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(endpoint):
+    """
+    Return `endpoint` with the IDs in it replaced by `{id}`.
+
+    Eg. `incidents/PXXXXXX/log_entries` becomes `incidents/{id}/log_entries`.
+    """
+    return '/'.join(segment if RESOURCE_SEGMENT.match(segment) else '{id}'
+                    for segment in endpoint.split('/'))
@@ -25,6 +25,11 @@ def set_verbosity(level=1):
     return verbosity
 
 
+def is_enabled_for(level):
+    """Return whether the global logger would handle messages of `level`."""
+    return logger.isEnabledFor(level)
+
+
 def log(*args, **kwargs):
     """Log things with the global logger."""
     level = kwargs.pop('level', logging.INFO)
@@ -0,0 +1,262 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Request metrics in the Prometheus text exposition format.
+
+A `MetricsRegistry` records, per endpoint template (eg.
+`incidents/{id}/log_entries`) and method, request latency histograms,
+response status counts, bytes sent and received, retries, and the page size
+of paginated queries and why it changed (see `pypd.paging`). It is fed by
+the request hooks (see `pypd.hooks`), so it costs nothing until it is set,
+eg.
+
+    from pypd import metrics
+    registry = metrics.set_metrics(metrics.MetricsRegistry())
+
+    registry.exposition()            # text to serve to Prometheus
+    metrics.start_http_server(9123)  # or serve it at :9123/metrics
+    metrics.set_metrics(None)        # stop recording
+
+Requests that raised instead of getting a response are counted with the
+`error` status.
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from . import hooks
+
+# upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0,)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value))
+                             for name, value in items)
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Series(object):
+    """What is recorded of the requests of one endpoint and method."""
+
+    def __init__(self, buckets):
+        self.buckets = [0] * (len(buckets) + 1)
+        self.duration = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.page_size = None
+        self.page_size_changes = {}
+
+
+class MetricsRegistry(object):
+    """
+    Request metrics labelled by endpoint template and method.
+
+    `buckets` are the upper bounds of the latency histogram, in seconds.
+    Metric names are prefixed with `prefix`.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='pypd'):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, endpoint, method):
+        key = (endpoint, method.upper())
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(self.bucket_bounds)
+        return series
+
+    def on_request_end(self, endpoint, method, status, elapsed, bytes_in,
+                       bytes_out, **kwargs):
+        """Record a request, registered as an `on_request_end` hook."""
+        status = 'error' if status is None else str(status)
+        index = bisect_left(self.bucket_bounds, elapsed)
+        with self._lock:
+            series = self._get_series(endpoint, method)
+            series.buckets[index] += 1
+            series.duration += elapsed
+            series.count += 1
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.bytes_in += bytes_in
+            series.bytes_out += bytes_out
+
+    def on_retry(self, endpoint, method, **kwargs):
+        """Record a retry, registered as an `on_retry` hook."""
+        with self._lock:
+            self._get_series(endpoint, method).retries += 1
+
+    def on_page_size(self, endpoint, limit, reason, **kwargs):
+        """Record a page size change, registered as an `on_page_size` hook."""
+        with self._lock:
+            series = self._get_series(endpoint, 'GET')
+            series.page_size = limit
+            series.page_size_changes[reason] = (
+                series.page_size_changes.get(reason, 0) + 1)
+
+    def install(self):
+        """Start recording the requests done by pypd."""
+        hooks.register('on_request_end', self.on_request_end)
+        hooks.register('on_retry', self.on_retry)
+        hooks.register('on_page_size', self.on_page_size)
+
+    def uninstall(self):
+        """Stop recording the requests done by pypd."""
+        hooks.unregister('on_request_end', self.on_request_end)
+        hooks.unregister('on_retry', self.on_retry)
+        hooks.unregister('on_page_size', self.on_page_size)
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        """
+        Return what was recorded as a dict keyed by (endpoint, method).
+
+        Values are dicts of `count`, `duration` (total seconds), `statuses`
+        (counts by status), `bytes_in`, `bytes_out`, `retries`, `page_size`
+        (the last one adapted, None if it never was) and `page_size_changes`
+        (counts by reason).
+        """
+        with self._lock:
+            return dict((key, {
+                'count': series.count,
+                'duration': series.duration,
+                'statuses': dict(series.statuses),
+                'bytes_in': series.bytes_in,
+                'bytes_out': series.bytes_out,
+                'retries': series.retries,
+                'page_size': series.page_size,
+                'page_size_changes': dict(series.page_size_changes),
+            }) for key, series in self._series.items())
+
+    def exposition(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        name = self.prefix + '_request_duration_seconds'
+        lines = [
+            '# HELP %s Duration of PagerDuty API requests.' % name,
+            '# TYPE %s histogram' % name,
+        ]
+        statuses, bytes_out, bytes_in, retries = [], [], [], []
+        page_sizes, page_size_changes = [], []
+
+        with self._lock:
+            for (endpoint, method), series in sorted(self._series.items()):
+                labels = (('endpoint', endpoint), ('method', method))
+                cumulative = 0
+                bounds = self.bucket_bounds + (float('inf'),)
+                for bound, count in zip(bounds, series.buckets):
+                    cumulative += count
+                    lines.append('%s_bucket%s %d' % (
+                        name, _labels(labels, le=_number(bound)),
+                        cumulative))
+                lines.append('%s_sum%s %s' % (name, _labels(labels),
+                                              _number(series.duration)))
+                lines.append('%s_count%s %d' % (name, _labels(labels),
+                                                series.count))
+
+                for status, count in sorted(series.statuses.items()):
+                    statuses.append((_labels(labels, status=status),
+                                     count))
+                bytes_out.append((_labels(labels), series.bytes_out))
+                bytes_in.append((_labels(labels), series.bytes_in))
+                retries.append((_labels(labels), series.retries))
+                if series.page_size is not None:
+                    page_sizes.append((_labels(labels), series.page_size))
+                for reason, count in sorted(series.page_size_changes.items()):
+                    page_size_changes.append((_labels(labels, reason=reason),
+                                              count))
+
+        for suffix, kind, description, samples in (
+                ('requests_total', 'counter',
+                 'PagerDuty API requests by status.', statuses),
+                ('request_bytes_total', 'counter',
+                 'Bytes sent in request bodies.', bytes_out),
+                ('response_bytes_total', 'counter',
+                 'Bytes received in response bodies.', bytes_in),
+                ('retries_total', 'counter',
+                 'PagerDuty API requests sent again.', retries),
+                ('page_size', 'gauge',
+                 'Page size paginated queries were last adapted to.',
+                 page_sizes),
+                ('page_size_changes_total', 'counter',
+                 'Page size changes by reason.', page_size_changes)):
+            name = '%s_%s' % (self.prefix, suffix)
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s %s' % (name, kind))
+            lines.extend('%s%s %d' % (name, labels, value)
+                         for labels, value in samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Return the package-wide metrics registry, None if disabled."""
+    return _metrics
+
+
+def set_metrics(new_metrics):
+    """Set (and install) the package-wide metrics registry, None disables."""
+    global _metrics
+    if _metrics is not None:
+        _metrics.uninstall()
+    if new_metrics is not None:
+        new_metrics.install()
+    _metrics = new_metrics
+    return new_metrics
+
+
+def start_http_server(port, address='', registry=None):
+    """
+    Serve the metrics of `registry` (default: the package's) at `/metrics`.
+
+    The server runs in a daemon thread, it is returned so that it can be
+    shut down with `shutdown()`.
+    """
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            current = registry if registry is not None else get_metrics()
+            if self.path.split('?')[0] != '/metrics' or current is None:
+                self.send_error(404)
+                return
+
+            body = current.exposition().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer((address, port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
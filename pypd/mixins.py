@@ -1,13 +1,18 @@
 """Helpful mixins for PagerDuty entity classes."""
 import datetime
 import logging
+import time
+from functools import lru_cache
 from numbers import Number
 
-import requests
 import six
 
-from .log import log
-from .errors import (BadRequest, UnknownError, InvalidResponse, InvalidHeaders)
+from . import hooks
+from .cache import cache_key
+from .client import default_client
+from .log import debug, is_enabled_for, warn
+from .errors import (BadRequest, UnknownError, InvalidResponse, InvalidHeaders,
+                     RateLimitExceeded, DeadlineExceeded)
 
 
 CONTENT_TYPE = 'application/vnd.pagerduty+json;version=2'
@@ -15,110 +20,685 @@ AUTH_TEMPLATE = 'Token token={0}'
 BASIC_AUTH_TEMPLATE = 'Basic {0}'
 
 
+@lru_cache(maxsize=64)
+def base_headers(api_key):
+    """
+    Return the headers sent with every request done with `api_key`.
+
+    Built once per API key, the returned dict is shared and must not be
+    modified.
+    """
+    return {
+        'Accept': CONTENT_TYPE,
+        'Authorization': AUTH_TEMPLATE.format(api_key),
+        'Content-Type': 'application/json',
+    }
+
+
+# response headers that validate a cached response, and the request headers
+# they are sent back in to revalidate it
+VALIDATORS = (
+    ('ETag', 'If-None-Match'),
+    ('Last-Modified', 'If-Modified-Since'),
+)
+
+
+def response_validators(response_headers):
+    """Return the validators in `response_headers` as a dict."""
+    return dict((name, response_headers[name]) for name, _ in VALIDATORS
+                if response_headers.get(name))
+
+
+def conditional_headers(validators):
+    """Return the request headers revalidating a copy with `validators`."""
+    return dict((header, validators[name]) for name, header in VALIDATORS
+                if validators.get(name))
+
+
+# query param values that are sent as they are
+_SCALAR_TYPES = frozenset((str, int, float, bool, bytes, type(None),))
+
+
+def _encode_scalar(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    elif isinstance(value, ClientMixin):
+        return value['id']
+    return value
+
+
+def encode_query_params(query_params):
+    """
+    Encode `query_params` for `requests`, returns a new dict.
+
+    Datetimes are sent in ISO 8601 format, entities as their ID and
+    iterables (ie. lists of strings or entities) as `key[]` params.
+    """
+    output = {}
+    if not query_params:
+        return output
+
+    for key, value in query_params.items():
+        kind = type(value)
+        if kind in _SCALAR_TYPES:
+            output[key] = value
+            continue
+        elif kind is not list and kind is not tuple:
+            if isinstance(value, (six.string_types, bytes, Number,
+                                  datetime.datetime, ClientMixin)):
+                output[key] = _encode_scalar(value)
+                continue
+            try:
+                value = iter(value)
+            except TypeError:
+                output[key] = value
+                continue
+
+        if not key.endswith('[]'):
+            key += '[]'
+        output[key] = [v['id'] if isinstance(v, ClientMixin) else v
+                       for v in value]
+
+    return output
+
+
+# Requests are sent by "flows": generators yielding the steps that wait
+# (see below) as tuples of the step and its arguments, sent back what the
+# step resulted in (or thrown what it raised), and returning their result.
+# `run_flow` runs the steps of a flow in the calling thread, `arun_flow`
+# awaits them on the running event loop, so both share the same logic.
+ACQUIRE = 'acquire'  # (rate limiter, key, deadline): wait for a budget
+SEND = 'send'  # (client mixin, method, url, kwargs): send a request once
+SLEEP = 'sleep'  # (retry policy, delay): sleep before a retry
+COALESCE = 'coalesce'  # (single flight, key, deadline, flow): run flow once
+PAGE = 'page'  # (entities,): a page of results for the caller
+PAGES = 'pages'  # (iterator, async pool): pages of a blocking iterator
+
+
+_STEPS = {
+    ACQUIRE: lambda rate_limiter, key, deadline: rate_limiter.acquire(
+        key, deadline),
+    SEND: lambda inst, method, url, kwargs: inst._http_request(
+        method, url, **kwargs),
+    SLEEP: lambda retry_policy, delay: retry_policy.sleep(delay),
+    COALESCE: lambda single_flight, key, deadline, flow: single_flight.do(
+        key, run_flow, flow, deadline=deadline),
+}
+
+_ASYNC_STEPS = {
+    ACQUIRE: lambda rate_limiter, key, deadline: rate_limiter.aacquire(
+        key, deadline),
+    SEND: lambda inst, method, url, kwargs: inst._ahttp_request(
+        method, url, **kwargs),
+    SLEEP: lambda retry_policy, delay: retry_policy.asleep(delay),
+    COALESCE: lambda single_flight, key, deadline, flow: single_flight.ado(
+        key, arun_flow, flow, deadline=deadline),
+}
+
+
+def _resume(flow, result, error):
+    """Resume `flow` with what its last step resulted in."""
+    if error is None:
+        return flow.send(result)
+    return flow.throw(error)
+
+
+def run_flow(flow):
+    """Run the steps of `flow` in this thread, return its result."""
+    result = error = None
+    while True:
+        try:
+            step = _resume(flow, result, error)
+        except StopIteration as stop:
+            return stop.value
+        result = error = None
+        try:
+            result = _STEPS[step[0]](*step[1:])
+        except Exception as e:
+            error = e
+
+
+async def arun_flow(flow):
+    """Await the steps of `flow` on the running event loop."""
+    result = error = None
+    while True:
+        try:
+            step = _resume(flow, result, error)
+        except StopIteration as stop:
+            return stop.value
+        result = error = None
+        try:
+            result = await _ASYNC_STEPS[step[0]](*step[1:])
+        except Exception as e:
+            error = e
+
+
+def iter_flow(flow):
+    """Like `run_flow`, yielding the pages of results of `flow`."""
+    result = error = None
+    try:
+        while True:
+            try:
+                step = _resume(flow, result, error)
+            except StopIteration:
+                return
+            result = error = None
+            if step[0] == PAGE:
+                yield step[1]
+            elif step[0] == PAGES:
+                for page in step[1]:
+                    yield page
+            else:
+                try:
+                    result = _STEPS[step[0]](*step[1:])
+                except Exception as e:
+                    error = e
+    finally:
+        flow.close()
+
+
+async def aiter_flow(flow):
+    """
+    Like `arun_flow`, yielding the pages of results of `flow`.
+
+    The pages of blocking iterators are taken on the workers of the async
+    pool they come with.
+    """
+    result = error = None
+    try:
+        while True:
+            try:
+                step = _resume(flow, result, error)
+            except StopIteration:
+                return
+            result = error = None
+            if step[0] == PAGE:
+                yield step[1]
+            elif step[0] == PAGES:
+                while True:
+                    page = await step[2].run(next, step[1], None)
+                    if page is None:
+                        break
+                    yield page
+            else:
+                try:
+                    result = await _ASYNC_STEPS[step[0]](*step[1:])
+                except Exception as e:
+                    error = e
+    finally:
+        flow.close()
+
+
+def _function(method):
+    """Return the function of a (bound, class or static) method."""
+    return getattr(method, '__func__', method)
+
+
+def map_pages(flow, func):
+    """Return `flow` with its pages of results replaced by `func(page)`."""
+    result = error = None
+    try:
+        while True:
+            try:
+                step = _resume(flow, result, error)
+            except StopIteration as stop:
+                return stop.value
+            if step[0] == PAGE:
+                step = (PAGE, func(step[1]))
+            elif step[0] == PAGES:
+                step = (PAGES, map(func, step[1])) + step[2:]
+            result = error = None
+            try:
+                result = yield step
+            except Exception as e:
+                error = e
+    finally:
+        flow.close()
+
+
 class ClientMixin(object):
     api_key = None
     base_url = None
     proxies = None
+    # JSON codec (see `pypd.codec`), the package's codec is used if None
+    codec = None
+    # seconds GET responses may be cached for (see `pypd.cache`), None if never
+    CACHE_TTL = None
+    # (connect, read) timeouts of requests, the client's are used if None
+    timeout = None
+    # `pypd.Client` this is bound to, the default client (reading the
+    # package's globals) if None
+    client = None
 
     def __init__(self, api_key=None, base_url=None, proxies=None):
-        # if no api key is provided try to get one from the packages api_key
+        client = self.get_client()
+
+        # if no api key is provided try to get one from the client
         if api_key:
             self.api_key = api_key
 
         if self.api_key is None:
-            from pypd import api_key
-            self.api_key = api_key
+            self.api_key = client.api_key
 
         if base_url:
             self.base_url = base_url
 
         if self.base_url is None:
-            from pypd import base_url
-            self.base_url = base_url
+            self.base_url = client.base_url
 
         if not proxies:
-            from pypd import proxies
+            proxies = client.proxies
 
         self.proxies = proxies
 
-    def _handle_response(self, response):
-        if response.status_code == 404:
+    @classmethod
+    def get_client(cls):
+        """Return the `pypd.Client` requests are sent with."""
+        if cls.client is not None:
+            return cls.client
+        return default_client
+
+    def _handle_response(self, response, meta=None):
+        if meta is not None:
+            meta['status'] = response.status_code
+            meta['validators'] = response_validators(response.headers)
+            meta['bytes'] = len(response.content)
+
+        if response.status_code == 304:
+            return None
+        elif response.status_code == 404:
             response.raise_for_status()
+        elif response.status_code == 429:
+            raise RateLimitExceeded(response.status_code, response.text)
         elif response.status_code // 100 == 4:
             raise BadRequest(response.status_code, response.text)
         elif response.status_code // 100 != 2:
             raise UnknownError(response.status_code, response.text)
 
-        if not response.text:
+        content = response.content
+        if not content:
             return None
 
         try:
-            response = response.json()
-        except:
+            return self._get_codec().loads(content)
+        except Exception:
             raise InvalidResponse(response.text)
 
-        return response
+    def _get_codec(self):
+        """Return the JSON codec of this class, the client's if not set."""
+        if self.codec is not None:
+            return self.codec
+        return self.get_client().codec
+
+    def _http_request(self, method, url, **kwargs):
+        """
+        Send a request once over the client's pool, return its response.
 
-    def _do_request(self, method, *args, **kwargs):
+        Takes the arguments of a `requests.Session` request and returns a
+        `requests.Response`. This is where mocked responses can be injected,
+        every request sent (and sent again) by `request` goes through it.
         """
-        Modularized because API was broken.
+        session = self.get_client().pool.session(self.base_url, self.proxies)
+        return getattr(session, method)(url, **kwargs)
+
+    def _do_request_flow(self, method, url, idempotent=None, endpoint='',
+                         meta=None, deadline=None, **kwargs):
+        """
+        Send a request and return its parsed response, as a request flow.
+
+        Requests are paced by the client's rate limiter and sent again as the
+        client's retry policy allows, `idempotent` overrides whether the retry
+        policy considers this request safe to send more than once. `endpoint`
+        is the endpoint requested, reported to hooks as a template. `meta` is
+        a dict filled in with the status, validators and size (in bytes) of
+        the response, and the seconds its HTTP exchange took (`elapsed`, not
+        counting rate limiting or retries).
 
-        Need to be able to inject Mocked response objects here.
+        Requests time out after `timeout` (or the client's), shortened to
+        what is left of `deadline`. Retries (including those of 429s) that
+        would not happen before the deadline are not attempted, and
+        `DeadlineExceeded` is raised without waiting when the rate limiter
+        would not allow the request before it.
         """
-        log('Doing HTTP [{3}] request: {0} - headers: {1} - payload: {2}'.format(
-            args[0], kwargs.get('headers'), kwargs.get('json'), method,),
-            level=logging.DEBUG,)
-        requests_method = getattr(requests, method)
-        return self._handle_response(requests_method(*args, **kwargs))
+        client = self.get_client()
+        timeout = self.timeout
+        if timeout is None:
+            timeout = client.timeout
+
+        if is_enabled_for(logging.DEBUG):
+            debug('Doing HTTP [%s] request: %s - headers: %s - payload: %s',
+                  method, url, kwargs.get('headers'), kwargs.get('data'))
+
+        # the HTTP stack (`requests`) is only imported once it is needed
+        from .retry import RETRYABLE_ERRORS
+
+        rate_limiter = client.rate_limiter
+        retry_policy = client.retry_policy
+
+        # requests share a budget per API key
+        budget = (self.base_url, self.api_key)
+        started = retry_policy.clock() if retry_policy is not None else None
+        attempts = throttled = 0
+
+        while True:
+            if deadline is not None:
+                deadline.check()
+            if rate_limiter is not None:
+                yield (ACQUIRE, rate_limiter, budget, deadline)
+
+            if deadline is not None:
+                kwargs['timeout'] = deadline.timeout(timeout)
+            else:
+                kwargs['timeout'] = timeout
+
+            attempts += 1
+            sent = time.monotonic()
+            try:
+                response = yield from self._send_flow(method, url, endpoint,
+                                                      kwargs)
+            except RETRYABLE_ERRORS as e:
+                if deadline is not None and deadline.expired:
+                    raise DeadlineExceeded(deadline.seconds) from e
+
+                delay = None
+                if retry_policy is not None:
+                    delay = retry_policy.delay(method, attempts, started,
+                                               error=e, idempotent=idempotent)
+                if delay is None or not self._fits(deadline, delay):
+                    raise
+                self._retrying(method, url, endpoint, attempts, delay,
+                               error=e)
+                yield (SLEEP, retry_policy, delay)
+                continue
+
+            status = response.status_code
+            if meta is not None:
+                meta['elapsed'] = time.monotonic() - sent
+
+            # 429s are sent again once the budget allows it, if that is
+            # before the deadline
+            if rate_limiter is not None:
+                rate_limiter.update(budget, response.headers)
+                if status == 429 and throttled < rate_limiter.max_retries:
+                    delay = rate_limiter.throttled(budget, response.headers)
+                    if self._fits(deadline, delay):
+                        throttled += 1
+                        self._retrying(method, url, endpoint, attempts,
+                                       delay, status=status)
+                        continue
+
+            delay = None
+            if retry_policy is not None:
+                delay = retry_policy.delay(method, attempts, started,
+                                           status=status,
+                                           idempotent=idempotent)
+            if delay is None or not self._fits(deadline, delay):
+                return self._handle_response(response, meta)
+
+            self._retrying(method, url, endpoint, attempts, delay,
+                           status=status)
+            yield (SLEEP, retry_policy, delay)
+
+    @staticmethod
+    def _fits(deadline, delay):
+        """Return whether a request can be sent again after `delay`."""
+        return deadline is None or delay < deadline.remaining()
+
+    def _send_flow(self, method, url, endpoint, kwargs):
+        """Send a request once, letting the request hooks know about it."""
+        start_hooks = hooks.get('on_request_start')
+        end_hooks = hooks.get('on_request_end')
+        if not start_hooks and not end_hooks:
+            return (yield (SEND, self, method, url, kwargs))
+
+        info = {
+            'method': method,
+            'url': url,
+            'endpoint': hooks.endpoint_template(endpoint),
+            'bytes_out': len(kwargs.get('data') or b''),
+        }
+        hooks.fire(start_hooks, **info)
+
+        response = error = None
+        started = time.monotonic()
+        try:
+            response = yield (SEND, self, method, url, kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if end_hooks:
+                hooks.fire(
+                    end_hooks,
+                    status=getattr(response, 'status_code', None),
+                    bytes_in=(len(response.content) if response is not None
+                              else 0),
+                    elapsed=time.monotonic() - started,
+                    error=error,
+                    **info
+                )
+
+    @staticmethod
+    def _retrying(method, url, endpoint, attempt, delay, status=None,
+                  error=None):
+        """Log and let the retry hooks know a request will be sent again."""
+        warn('HTTP [%s] request to %s failed (%s), retrying in %.2f seconds',
+             method, url, status if error is None else error, delay)
+
+        retry_hooks = hooks.get('on_retry')
+        if retry_hooks:
+            hooks.fire(retry_hooks, method=method, url=url,
+                       endpoint=hooks.endpoint_template(endpoint),
+                       attempt=attempt, delay=delay, status=status,
+                       error=error)
 
     def request(self, method='GET', endpoint='', query_params=None,
-                data=None, add_headers=None, headers=None,):
-        auth = 'Token token={0}'.format(self.api_key)
-        if query_params is None:
-            query_params = {}
+                data=None, add_headers=None, headers=None, idempotent=None,
+                validators=None, meta=None, deadline=None):
+        """
+        Send a request to the API and return its parsed response.
+
+        `validators` (eg. `{'ETag': ...}`) of a copy the caller already has
+        make the request conditional, None is returned when the API responds
+        `304 Not Modified`. `meta`, if given, is a dict filled in with the
+        `status`, `validators`, `bytes` (size of the body) and `elapsed`
+        (seconds the HTTP exchange took) of the response, the last two unless
+        it came from the cache. `deadline` is a
+        `pypd.deadline.Deadline` the request must be done by.
+        """
+        return run_flow(self._request_flow(method, endpoint, query_params,
+                                           data, add_headers, headers,
+                                           idempotent, validators, meta,
+                                           deadline))
+
+    def _request_flow(self, method='GET', endpoint='', query_params=None,
+                      data=None, add_headers=None, headers=None,
+                      idempotent=None, validators=None, meta=None,
+                      deadline=None):
+        """The flow of `request` (and `arequest`), takes the same arguments."""
+        # identical plain GETs in flight at once share a response
+        shared = (method.upper() == 'GET' and data is None and
+                  headers is None and add_headers is None and not validators)
 
         if headers is None:
-            headers = {
-                'Accept': CONTENT_TYPE,
-                'Authorization': auth,
-                'Content-Type': 'application/json',
-            }
+            headers = base_headers(self.api_key)
         elif not isinstance(headers, dict):
             raise InvalidHeaders(headers)
 
         if add_headers is not None:
-            headers.update(**add_headers)
+            headers = dict(headers, **add_headers)
 
-        for k, v in query_params.copy().items():
-            if isinstance(v, six.string_types):
-                continue
-            elif isinstance(v, Number):
-                continue
-            elif isinstance(v, datetime.datetime):
-                query_params[k] = v.isoformat()
-            elif isinstance(v, ClientMixin):
-                query_params[k] = v['id']
+        query_params = encode_query_params(query_params)
+
+        client = self.get_client()
+        cache = client.cache
+        if cache is not None and method.upper() != 'GET':
+            # whatever happens the resource may have changed
             try:
-                iter(v)
-            except:
-                continue
-            key = '%s[]' % k
-            query_params.pop(k)
-            values = [v_['id'] if isinstance(v_, ClientMixin) else v_
-                      for v_ in v]
-            query_params[key] = values
+                return (yield from self._send_request_flow(
+                    method, endpoint, query_params, headers, data,
+                    idempotent, meta, deadline))
+            finally:
+                cache.invalidate(endpoint)
+
+        single_flight = client.single_flight
+        if shared and single_flight is not None:
+            key = cache_key(self.base_url, self.api_key, endpoint,
+                            query_params)
+            result, response_meta = yield (
+                COALESCE, single_flight, key, deadline,
+                self._shared_get_flow(cache, endpoint, query_params, headers,
+                                      idempotent, deadline))
+            if meta is not None:
+                meta.update(response_meta)
+            return result
 
+        if (cache is not None and self.CACHE_TTL is not None and
+                add_headers is None):
+            return (yield from self._cached_get_flow(
+                cache, endpoint, query_params, headers, validators, meta,
+                deadline))
+
+        if validators:
+            headers = dict(headers, **conditional_headers(validators))
+        return (yield from self._send_request_flow(
+            method, endpoint, query_params, headers, data, idempotent, meta,
+            deadline))
+
+    def _shared_get_flow(self, cache, endpoint, query_params, headers,
+                         idempotent, deadline):
+        """GET `endpoint`, returns its parsed response and meta."""
+        meta = {}
+        if cache is not None and self.CACHE_TTL is not None:
+            result = yield from self._cached_get_flow(
+                cache, endpoint, query_params, headers, None, meta, deadline)
+        else:
+            result = yield from self._send_request_flow(
+                'GET', endpoint, query_params, headers, None, idempotent,
+                meta, deadline)
+        return result, meta
+
+    def _cached_get_flow(self, cache, endpoint, query_params, headers,
+                         validators, meta, deadline=None):
+        """
+        GET `endpoint` from `cache` if it is there and fresh.
+
+        Otherwise send a request, conditional if the cache holds validators
+        (or `validators` are given), and cache the response.
+        """
+        if meta is None:
+            meta = {}
+
+        key = cache_key(self.base_url, self.api_key, endpoint, query_params)
+        entry = cache.lookup(key)
+        if entry is not None and entry[2] and validators is None:
+            meta.update(status=200, validators=entry[1])
+            return entry[0]
+
+        # revalidate the cached value, unless the caller has its own copy
+        revalidating = validators is None and entry is not None
+        if revalidating:
+            validators = entry[1]
+        if validators:
+            headers = dict(headers, **conditional_headers(validators))
+
+        result = yield from self._send_request_flow(
+            'GET', endpoint, query_params, headers, None, None, meta,
+            deadline)
+        if meta['status'] == 304:
+            if entry is not None and entry[1] == validators:
+                cache.touch(key, self.CACHE_TTL)
+            return entry[0] if revalidating else None
+
+        if result is not None:
+            cache.set(key, result, self.CACHE_TTL, meta['validators'])
+        return result
+
+    def _send_request_flow(self, method, endpoint, query_params, headers,
+                           data, idempotent, meta=None, deadline=None):
+        """Send a request with the headers and params `request` built."""
         kwargs = {
             'headers': headers,
             'params': query_params,
             'proxies': self.proxies,
+            'meta': meta,
+            'deadline': deadline,
         }
 
         if data is not None:
-            kwargs['json'] = data
+            kwargs['data'] = self._get_codec().dumps(data)
+            if 'Content-Type' not in headers:
+                kwargs['headers'] = dict(headers, **{
+                    'Content-Type': 'application/json',
+                })
+
+        if idempotent is not None:
+            kwargs['idempotent'] = idempotent
 
-        return self._do_request(
+        return (yield from self._do_request_flow(
             method.lower(),
             '/'.join((self.base_url, endpoint)),
+            endpoint=endpoint,
             **kwargs
-        )
+        ))
+
+
+class AsyncClientMixin(ClientMixin):
+    """
+    asyncio twin of `ClientMixin`.
+
+    Coroutines send their requests through the client's
+    `pypd.pool.AsyncPool`: natively when it is (see `AsyncPool.native`),
+    else on its workers, which bound how many requests are in flight at once.
+    """
+
+    @classmethod
+    async def _arun(cls, func, *args, **kwargs):
+        return await cls.get_client().async_pool.run(func, *args, **kwargs)
+
+    @classmethod
+    def _native(cls, base, *names):
+        """
+        Return whether the twins of the `names` methods of `base` are native.
+
+        They send their requests natively when the async pool does and this
+        class does not override `names`, overridden methods are awaited on
+        the async pool's workers instead.
+        """
+        if not cls.get_client().async_pool.native:
+            return False
+        return all(_function(getattr(cls, name)) is
+                   _function(getattr(base, name)) for name in names)
+
+    async def _ahttp_request(self, method, url, **kwargs):
+        """
+        Awaitable `_http_request`, sent natively by the client's async pool.
+
+        Mocked responses of native requests can be injected here.
+        """
+        async_pool = self.get_client().async_pool
+        return await async_pool.request(method, url, **kwargs)
+
+    async def arequest(self, method='GET', endpoint='', query_params=None,
+                       *args, **kwargs):
+        """
+        Awaitable `request`, takes the same arguments.
+
+        Identical plain GETs awaited at once on an event loop share a single
+        request, and do not each hold a worker of the async pool.
+        """
+        if self.get_client().async_pool.native:
+            return await arun_flow(self._request_flow(
+                method, endpoint, query_params, *args, **kwargs))
+
+        single_flight = self.get_client().single_flight
+        if (single_flight is None or method.upper() != 'GET' or args or
+                kwargs):
+            return await self._arun(self.request, method, endpoint,
+                                    query_params, *args, **kwargs)
+
+        key = cache_key(self.base_url, self.api_key, endpoint,
+                        encode_query_params(query_params))
+        return await single_flight.ado(key, self._arun, self.request, method,
+                                       endpoint, query_params)
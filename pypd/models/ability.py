@@ -10,20 +10,26 @@ called.
 from ..mixins import ClientMixin
 
 
-def abilities(api_key=None, add_headers=None):
+def _requester(api_key=None, client=None):
+    """Return a `ClientMixin` sending requests with `client`."""
+    cls = ClientMixin if client is None else client.bind(ClientMixin)
+    return cls(api_key=api_key)
+
+
+def abilities(api_key=None, add_headers=None, client=None):
     """Fetch a list of permission-like strings for this account."""
-    client = ClientMixin(api_key=api_key)
-    result = client.request('GET', endpoint='abilities',
-                            add_headers=add_headers,)
+    requester = _requester(api_key, client)
+    result = requester.request('GET', endpoint='abilities',
+                               add_headers=add_headers,)
     return result['abilities']
 
 
-def can(ability, add_headers=None):
+def can(ability, add_headers=None, client=None):
     """Test whether an ability is allowed."""
-    client = ClientMixin(api_key=None)
+    requester = _requester(client=client)
     try:
-        client.request('GET', endpoint='abilities/%s' % ability,
-                       add_headers=add_headers)
+        requester.request('GET', endpoint='abilities/%s' % ability,
+                          add_headers=add_headers)
         return True
     except Exception:
         pass
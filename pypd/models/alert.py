@@ -7,8 +7,10 @@ from ..errors import InvalidArguments, MissingFromEmail
 
 
 class Alert(Entity):
+    INTERN_FIELDS = ('type', 'status', 'severity',)
+
     @classmethod
-    def fetch(cls, id, incident=None, endpoint=None, *args, **kwargs):
+    def _fetch_flow(cls, id, incident=None, endpoint=None, *args, **kwargs):
         """Customize fetch because this is a nested resource."""
         if incident is None and endpoint is None:
             raise InvalidArguments(incident, endpoint)
@@ -17,8 +19,8 @@ class Alert(Entity):
             iid = incident['id'] if isinstance(incident, Entity) else incident
             endpoint = 'incidents/{0}/alerts'.format(iid)
 
-        return getattr(Entity, 'fetch').__func__(cls, id, endpoint=endpoint,
-                                                 *args, **kwargs)
+        return super(Alert, cls)._fetch_flow(id, endpoint=endpoint, *args,
+                                             **kwargs)
 
     def resolve(self, from_email):
         """Resolve an alert using a valid email address."""
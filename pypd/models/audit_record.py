@@ -0,0 +1,32 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+from .entity import Entity
+from ..errors import InvalidEndpointOperation, InvalidEndpoint
+
+
+class AuditRecord(Entity):
+    """
+    PagerDuty audit record entity.
+
+    Audit records are cursor paginated, so that however many there are each
+    page of a `find()` costs the same to fetch.
+    """
+
+    endpoint = 'audit/records'
+    PAGINATION = 'cursor'
+    STR_OUTPUT_FIELDS = ('id', 'action',)
+    EXCLUDE_FILTERS = ()
+
+    @classmethod
+    def fetch(*args, **kwargs):
+        """Disable this endpoint, not valid v2."""
+        raise InvalidEndpoint('Not a valid location on this endpoint')
+
+    def remove(self, *args, **kwargs):
+        """Disable this operation, not valid on this endpoint."""
+        raise InvalidEndpointOperation(
+            'Not a valid operation on this endpoint.'
+        )
+
+    create = fetch
+    delete = fetch
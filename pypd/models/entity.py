@@ -8,18 +8,52 @@ via PagerDuty v2 API.
 """
 import json
 import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import six
 
-from ..mixins import ClientMixin
+from ..deadline import Deadline
+from ..errors import DeadlineExceeded
+from ..mixins import (ClientMixin, AsyncClientMixin, PAGE, PAGES, run_flow,
+                      arun_flow, iter_flow, aiter_flow, map_pages)
 from ..log import warn
+from ..paging import get_page_sizing
 
 
 class NotInitialized(Exception):
     """Raise when an entity is not initialized but accessed as if it were."""
 
 
-class Entity(ClientMixin):
+class BatchResult(list):
+    """
+    A list of the entities a batch operation succeeded for.
+
+    Errors of the items the operation failed for are in `errors`, a dict
+    keyed by the item (eg. an ID) in the order the items were given.
+    """
+
+    def __init__(self, *args):
+        list.__init__(self, *args)
+        self.errors = OrderedDict()
+
+
+# guards the creation of compact classes
+_compact_lock = threading.Lock()
+
+
+def intern_fields(data, fields):
+    """Intern the string values of `fields` in the `data` dict, in place."""
+    for field in fields:
+        value = data.get(field)
+        if type(value) is str:
+            data[field] = sys.intern(value)
+    return data
+
+
+class Entity(AsyncClientMixin):
     """
     Base class for implementing a PagerDuty-something.
 
@@ -34,19 +68,31 @@ class Entity(ClientMixin):
     to return a class instance, or a list of class instances they are:
         find:
             finds some instances of this entity, returns a list
+        iter_find:
+            like find, but yields instances as pages are fetched
         find_one:
             finds one instance of this entity, returns instance
         fetch:
             finds one instance of this entity, returns instance
+        fetch_many:
+            finds instances by a list of IDs concurrently, returns a list
         create:
             creates an instance of this entity (HTTP POST), returns instance
         delete:
             deletes an instance of this entity (HTTP DELETE), returns None
 
+    Each of these has an asyncio twin prefixed with `a` (`afind`,
+    `afind_one`, `afetch`, `afetch_many`, `acreate`, `adelete`, `aput`) that
+    is awaited instead, and `aiter_find` can be used with `async for` to
+    iterate over paginated results as pages arrive.
+
     Entities have instance methods that help interact with an entity on the api
     they are:
         remove:
             deletes this entity instance, returns None
+        refresh:
+            fetches this entity again unless it has not changed, returns
+            True if it was updated
         get:
             access any property on the entity, like dict-accessor get
 
@@ -60,6 +106,9 @@ class Entity(ClientMixin):
             (do not use directly) contains raw entity data, accessible with
             `get(property, default_value)` OR with entity['property'] syntax
 
+    `Entity.compact()` returns a compact twin of an entity class, for holding
+    many instances at once (see `CompactEntity`).
+
     Entity classes use few special class instances:
         TRANSLATE_QUERY_PARAM:
             A list of strings that ought to be translated to 'query' for the
@@ -71,6 +120,15 @@ class Entity(ClientMixin):
         MAX_LIMIT_VALUE:
             The normal maximum number of entities returned per page from the
             PagerDuty API
+        PAGINATION:
+            How pages of results are walked: 'offset' (`offset`/`limit`,
+            the default), 'cursor' (following the `next_cursor` of each
+            page) or, for `TimeWindowed` models, 'time_window' (by windows
+            of `since`..`until`, see `pypd.models.windowed`). Any other
+            value raises a `ValueError` when the class is defined
+        INTERN_FIELDS:
+            Fields whose (repeated) string values are interned by compact
+            classes, eg. ('type', 'status',)
         EXCLUDE_FILTERS:
             A list of strings and methods that will be used to filter out
             entities with the matching criteria. Where strings will look
@@ -93,25 +151,108 @@ class Entity(ClientMixin):
     endpoint = None
     # flag so subsequent 'save' operations fail, and require a 'clone'
     _is_deleted = False
+    # how this instance was fetched and the validators of the response, used
+    # by `refresh()`
+    _fetched = None
+    _validators = None
     EXCLUDE_FILTERS = ('name',)  # exclude will filter on these properties
     STR_OUTPUT_FIELDS = ('id',)  # fields to output in __str__
     TRANSLATE_QUERY_PARAM = ('name',)  # translates uri?query=stuff
     MAX_LIMIT_VALUE = 100
+    PAGINATION = 'offset'
+    INTERN_FIELDS = ('type',)
+    # whether this is a compact class, see `compact()`
+    _compact = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # resolved once per class rather than for every instance
+        cls._endpoint_names()
+
+        if cls.PAGINATION not in ('offset', 'cursor', 'time_window'):
+            raise ValueError('Unknown PAGINATION %r of %s' % (cls.PAGINATION,
+                                                              cls))
+        if cls.PAGINATION == 'time_window':
+            from .windowed import TimeWindowed
+            if not issubclass(cls, TimeWindowed):
+                raise ValueError("PAGINATION 'time_window' of %s needs the "
+                                 "TimeWindowed mixin" % cls)
 
     def __init__(self, api_key=None, _data=None):
         """Initialize Entity model."""
         if _data is not None:
             self._set(_data)
 
-        # sanitize the endpoint name incase people make mistakes
-        self.endpoint = self.__class__.get_endpoint()
-        if self.endpoint.endswith('/'):
-            warn('Endpoints should not end with a trailing slash, %s',
-                 self.__class__)
-            self.endpoint = self.endpoint[:-1]
-
+        self.endpoint = self._endpoint_names()[0]
         ClientMixin.__init__(self, api_key)
 
+    @classmethod
+    def _from_page(cls, inst, datas):
+        """
+        Return a `cls` instance for each of `datas`, as `inst` was created.
+
+        Instances share the attributes `inst` got from `__init__` (API key,
+        base URL, ...) instead of each resolving them again, unless `cls`
+        overrides `__init__`.
+        """
+        new = object.__new__
+        entities = []
+        if cls._compact:
+            # the class of `inst` holds the API key it was created with
+            compact, fields = type(inst), cls.INTERN_FIELDS
+            for data in datas:
+                entity = new(compact)
+                entity._data = intern_fields(data, fields)
+                entity._fetched = entity._validators = None
+                entities.append(entity)
+            return entities
+
+        if cls.__init__ is not Entity.__init__:
+            return [cls(api_key=inst.api_key, _data=d) for d in datas]
+
+        state = inst.__dict__
+        for data in datas:
+            entity = new(cls)
+            entity.__dict__.update(state)
+            entity._set(data)
+            entities.append(entity)
+        return entities
+
+    @classmethod
+    def compact(cls):
+        """
+        Return the compact twin of this class, a subclass of it.
+
+        Compact instances only hold their data: their base URL and proxies
+        are the client's (see `pypd.Client`), their endpoint is the class'
+        and so is their API key (instances created with another API key than
+        the client's are of a subclass holding it). The string values of
+        `INTERN_FIELDS` of the entities found are interned. Models created
+        through factories are compact too.
+        """
+        if cls._compact:
+            return cls
+
+        with _compact_lock:
+            compact = cls.__dict__.get('_compact_class')
+            if compact is not None:
+                return compact
+
+            compact = type(cls.__name__, (CompactEntity, cls), {
+                '__slots__': ('_data', '_fetched', '_validators'),
+                '__module__': cls.__module__,
+                '__doc__': cls.__doc__,
+                'endpoint': cls.get_endpoint(),
+            })
+            cls._compact_class = compact
+
+        for name in dir(cls):
+            factory = getattr(cls, name)
+            if (name.endswith('Factory') and isinstance(factory, type) and
+                    issubclass(factory, Entity)):
+                setattr(compact, name, factory.compact())
+        return compact
+
     @staticmethod
     def sanitize_ep(endpoint, plural=False):
         """
@@ -146,37 +287,97 @@ class Entity(ClientMixin):
         this way unless otherwise specified will translate class name to
         endpoint name.
         """
-        if cls.endpoint is not None:
-            return cls.endpoint
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', cls.__name__)
-        return cls.sanitize_ep(
-            re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower(),
-            plural=True
-        )
+        return cls._endpoint_names()[0]
 
     @classmethod
-    def _fetch_all(cls, api_key, endpoint=None, offset=0, limit=25, **kwargs):
+    def _endpoint_names(cls):
         """
-        Call `self._fetch_page` for as many pages as exist.
+        Return the endpoint of this class and its plural form.
 
-        TODO: should be extended to do async page fetches if API allows it via
-        exposing total value.
+        Both are worked out once per class (and again if `endpoint` is
+        changed), trailing slashes are dropped.
+        """
+        names = cls.__dict__.get('_endpoint_cache')
+        if names is not None and names[0] is cls.endpoint:
+            return names[1:]
 
-        Returns a list of `cls` instances.
+        endpoint = cls.endpoint
+        if endpoint is None:
+            s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', cls.__name__)
+            endpoint = cls.sanitize_ep(
+                re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower(),
+                plural=True
+            )
+        # sanitize the endpoint name incase people make mistakes
+        elif endpoint.endswith('/'):
+            warn('Endpoints should not end with a trailing slash, %s', cls)
+            endpoint = endpoint[:-1]
+
+        names = (endpoint, cls.sanitize_ep(endpoint, plural=True))
+        cls._endpoint_cache = (cls.endpoint,) + names
+        return names
+
+    @classmethod
+    def _iter_pages(cls, *args, **kwargs):
+        """Iterate over `_iter_pages_flow` in this thread."""
+        return iter_flow(cls._iter_pages_flow(*args, **kwargs))
+
+    @classmethod
+    def _iter_pages_flow(cls, api_key, endpoint=None, offset=0, limit=None,
+                         concurrency=None, deadline=None, **kwargs):
         """
-        output = []
+        Fetch the pages of `_fetch_page_flow` for as many pages as exist.
+
+        Yields a list of `cls` instances for each page, in server order and
+        never more than `maximum` instances in total.
+
+        Pages hold `limit` (default: `MAX_LIMIT_VALUE`) entities, or as few as
+        `maximum` needs, and are made smaller while they are slow or large
+        (see `pypd.paging`). Pages are never asked to be larger than the
+        server made them once it has paged fewer entities than asked for.
+
+        If `concurrency` (default: `pypd.page_concurrency`) is more than 1,
+        the first page is requested with `total=true` and the remaining pages
+        are fetched on a pool of `concurrency` workers. Endpoints that do not
+        report a total are walked one page at a time.
+
+        Every page is fetched before `deadline` (a `Deadline`), if not None.
+
+        Cursor paginated models (see `PAGINATION`) are walked by
+        `_iter_cursor_pages_flow` instead.
+        """
+        if cls.PAGINATION == 'cursor':
+            return (yield from cls._iter_cursor_pages_flow(
+                api_key, endpoint=endpoint, limit=limit, deadline=deadline,
+                **kwargs))
+
+        if concurrency is None:
+            from pypd import page_concurrency as concurrency
+
         qp = kwargs.copy()
-        limit = max(1, min(100, limit))
+        limit = cls._page_limit(limit)
+        sizer = cls._page_sizer(limit, endpoint)
         maximum = kwargs.get('maximum')
         qp['limit'] = min(limit, maximum) if maximum is not None else limit
         qp['offset'] = offset
         more, total = None, None
+        count = 0
+        # the page size the server caps pages at, if it is smaller
+        ceiling = None
+
+        if concurrency > 1:
+            qp['total'] = 'true'
 
         while True:
-            entities, options = cls._fetch_page(
-                api_key=api_key, endpoint=endpoint, **qp
-            )
-            output += entities
+            entities, options, next_limit = yield from (
+                cls._fetch_sized_page_flow(
+                    sizer, api_key=api_key, endpoint=endpoint,
+                    deadline=deadline, **qp
+                ))
+            if maximum is not None:
+                entities = entities[:maximum - count]
+            count += len(entities)
+            yield (PAGE, entities)
             more = options.get('more')
             limit = options.get('limit')
             offset = options.get('offset')
@@ -187,17 +388,168 @@ class Entity(ClientMixin):
                     break
                 more = (limit + offset) < total
 
-            if not more or (maximum is not None and len(output) >= maximum):
+            if not more or (maximum is not None and count >= maximum):
                 break
 
-            qp['limit'] = limit
             qp['offset'] = offset + limit
+            # the offsets of later pages must step by what the server pages,
+            # or the entities in between are skipped
+            if limit < qp['limit']:
+                ceiling = limit if ceiling is None else min(ceiling, limit)
+                if sizer is not None:
+                    sizer.cap(ceiling)
+            if ceiling is not None:
+                next_limit = min(next_limit, ceiling)
+            qp['limit'] = (next_limit if maximum is None
+                           else min(next_limit, maximum - count))
+
+            if concurrency > 1:
+                qp.pop('total', None)
+                if total is not None:
+                    remaining = (maximum - count if maximum is not None
+                                 else None)
+                    yield (PAGES, cls._iter_pages_concurrently(
+                        api_key, endpoint, qp, total, remaining, concurrency,
+                        deadline), cls.get_client().async_pool)
+                    break
+
+    @classmethod
+    def _iter_cursor_pages_flow(cls, api_key, endpoint=None, limit=None,
+                                deadline=None, cursor=None, **kwargs):
+        """
+        Fetch each page with `_fetch_page_flow`, following their `next_cursor`.
 
+        Yields a list of `cls` instances for each page, never more than
+        `maximum` instances in total. Every page costs the same to fetch, how
+        deep it is does not matter. Pages are sized like `_iter_pages_flow`
+        does.
+        """
+        qp = kwargs.copy()
+        maximum = qp.pop('maximum', None)
+        limit = cls._page_limit(limit)
+        sizer = cls._page_sizer(limit, endpoint)
+        count = 0
+
+        while True:
+            if maximum is not None:
+                limit = min(limit, maximum - count)
+            entities, options, limit = yield from cls._fetch_sized_page_flow(
+                sizer, api_key=api_key, endpoint=endpoint, limit=limit,
+                cursor=cursor, deadline=deadline, **qp
+            )
+            if maximum is not None:
+                entities = entities[:maximum - count]
+            count += len(entities)
+            yield (PAGE, entities)
+
+            cursor = options.get('next_cursor')
+            if (not cursor or not entities or
+                    (maximum is not None and count >= maximum)):
+                break
+
+    @classmethod
+    def _page_limit(cls, limit=None):
+        """Return `limit` within what is allowed, `MAX_LIMIT_VALUE` if None."""
+        if limit is None:
+            return cls.MAX_LIMIT_VALUE
+        return max(1, min(cls.MAX_LIMIT_VALUE, limit))
+
+    @classmethod
+    def _page_sizer(cls, limit, endpoint=None):
+        """Return the `PageSizer` of a query, None if sizes are fixed."""
+        page_sizing = get_page_sizing()
+        if page_sizing is None:
+            return None
+        return page_sizing.sizer(limit, endpoint or cls.get_endpoint())
+
+    @classmethod
+    def _fetch_sized_page_flow(cls, sizer, **kwargs):
+        """
+        `_fetch_page_flow` letting `sizer` know how long the page took and
+        weighed.
+
+        Only the HTTP exchange of the page is timed, not the time spent
+        waiting on the rate limiter or between retries.
+
+        Returns a tuple of the entities, the response options and the size
+        the next page ought to have.
+        """
+        meta = {}
+        entities, options = yield from cls._fetch_page_flow(meta=meta,
+                                                            **kwargs)
+        if sizer is None:
+            return entities, options, cls._page_limit(kwargs.get('limit'))
+        limit = sizer.update(meta.get('elapsed', 0), meta.get('bytes', 0))
+        return entities, options, limit
+
+    @classmethod
+    def _iter_pages_concurrently(cls, api_key, endpoint, qp, total, remaining,
+                                 concurrency, deadline=None):
+        """
+        Fetch the pages from `qp['offset']` up to `total` on a worker pool.
+
+        Yields the list of `cls` instances of each page in offset order, at
+        most `remaining` instances if it is not None. Pages not yet fetched
+        are cancelled if the caller stops iterating early.
+        """
+        limit, start = qp['limit'], qp['offset']
+        stop = total if remaining is None else min(total, start + remaining)
+
+        def fetch(offset):
+            entities, _ = run_flow(cls._fetch_page_flow(
+                api_key=api_key, endpoint=endpoint, deadline=deadline,
+                **dict(qp, offset=offset)))
+            return entities
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = [executor.submit(fetch, offset)
+                   for offset in range(start, stop, limit)]
+        try:
+            for future in futures:
+                entities = future.result()
+                if remaining is not None:
+                    entities = entities[:remaining]
+                    remaining -= len(entities)
+                yield entities
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @classmethod
+    def _fetch_all(cls, api_key, endpoint=None, offset=0, limit=None,
+                   concurrency=None, deadline=None, **kwargs):
+        """
+        Call `_fetch_page_flow` for as many pages as exist.
+
+        See `_iter_pages_flow` for the meaning of `concurrency`, `deadline` is
+        the time (in seconds or a `Deadline`) every page must be fetched in.
+
+        Returns a list of `cls` instances.
+        """
+        output = []
+        for entities in cls._iter_pages(api_key, endpoint=endpoint,
+                                        offset=offset, limit=limit,
+                                        concurrency=concurrency,
+                                        deadline=Deadline.coerce(deadline),
+                                        **kwargs):
+            output += entities
         return output
 
     @classmethod
-    def _fetch_page(cls, api_key, endpoint=None, page_index=0, offset=None,
-                    limit=25, **kwargs):
+    def _fetch_page(cls, *args, **kwargs):
+        """
+        Run `_fetch_page_flow` in this thread.
+
+        Every way of paging goes through `_fetch_page_flow`, models that need
+        to alter how pages are fetched override it rather than this.
+        """
+        return run_flow(cls._fetch_page_flow(*args, **kwargs))
+
+    @classmethod
+    def _fetch_page_flow(cls, api_key, endpoint=None, page_index=0,
+                         offset=None, limit=None, deadline=None, cursor=None,
+                         meta=None, **kwargs):
         """
         Fetch a single page of `limit` number of results.
 
@@ -210,25 +562,33 @@ class Entity(ClientMixin):
         Optionally provide `limit` integer describing how many items pages
         ought to have.
 
+        Cursor paginated models (see `PAGINATION`) are sent `cursor` (the
+        `next_cursor` of the previous page) instead of an offset.
+
         Returns a tuple containing a list of `cls` instances and response
         options.
         """
-        # if offset is provided have it overwrite the page_index provided
-        if offset is not None:
-            page_index = int(offset / limit)
-
         # limit can be maximum MAX_LIMIT_VALUE for most PD queries
-        limit = max(1, min(cls.MAX_LIMIT_VALUE, limit))
+        limit = cls._page_limit(limit)
+
+        # if offset is provided have it overwrite the page_index provided,
+        # pages of different sizes may follow each other
+        if offset is None:
+            offset = page_index * limit
 
         # make an tmp instance to do query work
         inst = cls(api_key=api_key)
 
-        kwargs['offset'] = int(page_index * limit)
+        if cls.PAGINATION != 'cursor':
+            kwargs['offset'] = int(offset)
+        elif cursor is not None:
+            kwargs['cursor'] = cursor
         maximum = kwargs.pop('maximum', None)
 
         # if maximum is valid, make the limit <= maximum
         kwargs['limit'] = min(limit, maximum) if maximum is not None else limit
-        ep = parse_key = cls.sanitize_ep(cls.get_endpoint(), plural=True)
+        ep = cls._endpoint_names()[1]
+        parse_key = ep.rsplit('/', 1)[-1]
 
         # if an override to the endpoint is provided use that instead
         # this is useful for nested value searches ie. for
@@ -238,40 +598,109 @@ class Entity(ClientMixin):
         if endpoint is not None:
             ep = endpoint
 
-        response = inst.request('GET', endpoint=ep, query_params=kwargs)
+        response = yield from inst._request_flow(
+            'GET', endpoint=ep, query_params=kwargs, meta=meta,
+            deadline=deadline)
         # XXX: this is a little gross right now. Seems like the best way
         # to do the parsing out of something and then return everything else
         datas = cls._parse(response, key=parse_key)
         response.pop(parse_key, None)
-        entities = [cls(api_key=api_key, _data=d) for d in datas]
+        entities = cls._from_page(inst, datas)
         # return a tuple
         return entities, response
 
     @classmethod
-    def fetch(cls, id, api_key=None, endpoint=None, add_headers=None,
-              **kwargs):
+    def fetch(cls, *args, **kwargs):
         """
         Fetch a single entity from the API endpoint.
 
-        Used when you know the exact ID that must be queried.
+        Used when you know the exact ID that must be queried. `deadline` is
+        the time (in seconds or a `Deadline`) it must be fetched in.
         """
+        return run_flow(cls._fetch_flow(*args, **kwargs))
+
+    @classmethod
+    def _fetch_flow(cls, id, api_key=None, endpoint=None, add_headers=None,
+                    deadline=None, **kwargs):
+        """The flow of `fetch` (and `afetch`), takes the same arguments."""
         if endpoint is None:
             endpoint = cls.get_endpoint()
 
         inst = cls(api_key=api_key)
         parse_key = cls.sanitize_ep(endpoint).split("/")[-1]
         endpoint = '/'.join((endpoint, id))
-        data = cls._parse(inst.request('GET',
-                                       endpoint=endpoint,
-                                       add_headers=add_headers,
-                                       query_params=kwargs),
-                          key=parse_key)
+        meta = {}
+        data = cls._parse((yield from inst._request_flow(
+            'GET',
+            endpoint=endpoint,
+            add_headers=add_headers,
+            query_params=kwargs,
+            meta=meta,
+            deadline=Deadline.coerce(deadline))), key=parse_key)
         inst._set(data)
+        inst._fetched = (endpoint, parse_key, kwargs)
+        inst._validators = meta.get('validators')
         return inst
 
     # sugar-pills
     get = fetch
 
+    @classmethod
+    def fetch_many(cls, ids, api_key=None, concurrency=None,
+                   raise_errors=False, deadline=None, **kwargs):
+        """
+        Fetch the entities of `ids` concurrently.
+
+        Each distinct ID is fetched once, with at most `concurrency` (default:
+        `pypd.fetch_concurrency`) requests at a time, all before `deadline`
+        (in seconds or a `Deadline`) if given. Remaining keyword arguments are
+        passed to `fetch`.
+
+        Returns a `BatchResult`, a list of the entities in the order their IDs
+        first appear in `ids`. IDs that could not be fetched are left out,
+        their exceptions are in the `errors` dict of the result, unless
+        `raise_errors` is True in which case the first error is raised once
+        all fetches are done.
+        """
+        if concurrency is None:
+            from pypd import fetch_concurrency as concurrency
+
+        unique_ids = list(OrderedDict.fromkeys(ids))
+        deadline = Deadline.coerce(deadline)
+
+        def fetch(id_):
+            try:
+                return cls.fetch(id_, api_key=api_key, deadline=deadline,
+                                 **kwargs), None
+            except Exception as e:
+                return None, e
+
+        workers = max(1, min(concurrency, len(unique_ids)))
+        if workers == 1:
+            results = [fetch(id_) for id_ in unique_ids]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(fetch, unique_ids))
+        return cls._batch_result(unique_ids, results, raise_errors)
+
+    @staticmethod
+    def _batch_result(unique_ids, results, raise_errors=False):
+        """
+        Return the `BatchResult` of the (entity, error) `results` of IDs.
+
+        The first error is raised if `raise_errors` is True.
+        """
+        output = BatchResult()
+        for id_, (entity, error) in zip(unique_ids, results):
+            if error is None:
+                output.append(entity)
+            else:
+                output.errors[id_] = error
+
+        if raise_errors and output.errors:
+            raise next(iter(output.errors.values()))
+        return output
+
     @classmethod
     def _find_exclude_filter(cls, excludes, item):
         """
@@ -292,24 +721,52 @@ class Entity(ClientMixin):
         matching any value on any indexed field, where EXCLUDE_FILTERS are the
         indexes.
 
-        XXX: Even explaining this was difficult. Probably an easier more
-        pragmatic way to do this.
+        `find()` compiles `excludes` once with `_compile_exclude_filter`
+        instead of calling this for each item.
         """
-        # if exclude is left blank (not a list) then the predicate will just
-        # be true
-        if excludes is None:
-            return False
+        excluded = cls._compile_exclude_filter(excludes)
+        return excluded is not None and excluded(item)
+
+    @classmethod
+    def _compile_exclude_filter(cls, excludes):
+        """
+        Compile the `exclude` values of a `find()` into a predicate.
+
+        Returns None if nothing is excluded, else a function of an item that
+        is true where the item ought to be filtered out. Values are looked up
+        in a set for each field of `EXCLUDE_FILTERS`, so an item costs the
+        same however many values are excluded. Callable filters are still
+        called with each value.
+        """
+        if not excludes:
+            return None
 
-        # oh my...
-        def test_each_exclude(exclude_value):
-            # excluded_value is one of excludes = (...,)
-            def exclude_equals_value_test(exclude_filter):
-                # exclude_filter is one of EXCLUDE_FILTERS = (...,)
-                if callable(exclude_filter):
-                    return exclude_filter(cls, item, exclude_value,)
-                return item.get(exclude_filter) == exclude_value
-            return any(map(exclude_equals_value_test, cls.EXCLUDE_FILTERS))
-        return any(map(test_each_exclude, excludes))
+        excludes = tuple(excludes)
+        fields = tuple(f for f in cls.EXCLUDE_FILTERS if not callable(f))
+        callables = tuple(f for f in cls.EXCLUDE_FILTERS if callable(f))
+        values, unhashable = set(), []
+        for value in excludes:
+            try:
+                values.add(value)
+            except TypeError:
+                unhashable.append(value)
+
+        def excluded(item):
+            for field in fields:
+                value = item.get(field)
+                try:
+                    if value in values:
+                        return True
+                except TypeError:
+                    pass
+                if unhashable and value in unhashable:
+                    return True
+            for exclude_filter in callables:
+                for value in excludes:
+                    if exclude_filter(cls, item, value):
+                        return True
+            return False
+        return excluded
 
     @classmethod
     def translate_query_params(cls, **kwargs):
@@ -379,23 +836,13 @@ class Entity(ClientMixin):
         return output
 
     @classmethod
-    def find(cls, api_key=None, fetch_all=True, endpoint=None, maximum=None,
-             **kwargs):
+    def _find_params(cls, endpoint, kwargs):
         """
-        Find some entities from the API endpoint.
-
-        If no api_key is provided, the global api key will be used.
-        If fetch_all is True, page through all the data and find every record
-        that exists.
-        If add_headers is provided (as a dict) use it to add headers to the
-        HTTP request, eg.
-
-            {'host': 'some.hidden.host'}
+        Split `find()` keyword arguments into endpoint, exclude and query.
 
-        Capitalizing header keys does not matter.
-
-        Remaining keyword arguments will be passed as `query_params` to the
-        instant method `request` (ClientMixin).
+        Returns a tuple of the endpoint to query, the compiled exclusion
+        filter (or None, see `_compile_exclude_filter`) and the translated
+        query params.
         """
         exclude = kwargs.pop('exclude', None)
 
@@ -409,39 +856,115 @@ class Entity(ClientMixin):
         if endpoint is None:
             endpoint = cls.get_endpoint()
 
+        return endpoint, cls._compile_exclude_filter(exclude), query_params
+
+    @classmethod
+    def _find_pages(cls, *args, **kwargs):
+        """Iterate over `_find_pages_flow` in this thread."""
+        return iter_flow(cls._find_pages_flow(*args, **kwargs))
+
+    @classmethod
+    def _find_pages_flow(cls, api_key=None, fetch_all=True, endpoint=None,
+                         maximum=None, concurrency=None, deadline=None,
+                         **kwargs):
+        """
+        Fetch the (exclusion filtered) entities of each page of a `find()`.
+
+        Takes the same arguments as `find()`. This is what `find`, `iter_find`
+        and their asyncio twins are built on, models that need to alter the
+        query of every find ought to override this method.
+        """
+        endpoint, excluded, query_params = cls._find_params(endpoint, kwargs)
+        deadline = Deadline.coerce(deadline)
+
+        def first_page():
+            entities, _ = yield from cls._fetch_page_flow(
+                api_key=api_key, endpoint=endpoint, maximum=maximum,
+                deadline=deadline, **query_params)
+            yield (PAGE, entities)
+
         if fetch_all:
-            result = cls._fetch_all(api_key=api_key, endpoint=endpoint,
-                                    maximum=maximum,
-                                    **query_params)
+            pages = cls._iter_pages_flow(
+                api_key=api_key, endpoint=endpoint, maximum=maximum,
+                concurrency=concurrency, deadline=deadline, **query_params)
         else:
-            result = cls._fetch_page(api_key=api_key, endpoint=endpoint,
-                                     maximum=maximum,
-                                     **query_params)
+            pages = first_page()
+
+        # for each result run it through the exclusion filter
+        if excluded is not None:
+            pages = map_pages(pages, lambda entities: [
+                r for r in entities if not excluded(r)])
+        yield from pages
+
+    @classmethod
+    def find(cls, *args, **kwargs):
+        """
+        Find some entities from the API endpoint.
+
+        If no api_key is provided, the global api key will be used.
+        If fetch_all is True, page through all the data and find every record
+        that exists.
+        If concurrency is more than 1 (default: `pypd.page_concurrency`), pages
+        after the first are fetched concurrently by that many workers.
+        If deadline is provided (in seconds or as a `pypd.deadline.Deadline`)
+        every page must be fetched within it, or `DeadlineExceeded` is raised.
+        If add_headers is provided (as a dict) use it to add headers to the
+        HTTP request, eg.
+
+            {'host': 'some.hidden.host'}
 
-        # for each result run it through an exlcusion filter
-        collection = [r for r in result
-                      if not cls._find_exclude_filter(exclude, r)]
-        return collection
+        Capitalizing header keys does not matter.
+
+        Remaining keyword arguments will be passed as `query_params` to the
+        instant method `request` (ClientMixin).
+
+        Returns a list, use `iter_find()` to iterate over the results while
+        they are being fetched instead.
+        """
+        return [entity for entities in cls._find_pages(*args, **kwargs)
+                for entity in entities]
+
+    @classmethod
+    def iter_find(cls, *args, **kwargs):
+        """
+        Like `find()` except entities are yielded page by page.
+
+        Only one page of results is held at a time, and the first entities
+        are available as soon as the first page has been fetched. Stopping
+        the iteration early stops fetching further pages, as does reaching the
+        `deadline`: the iteration then stops with the entities fetched so far.
+        """
+        try:
+            for entities in cls._find_pages(*args, **kwargs):
+                for entity in entities:
+                    yield entity
+        except DeadlineExceeded:
+            return
 
     @classmethod
     def find_one(cls, *args, **kwargs):
-        """Like `find()` except ensure that only one result is returned."""
+        """
+        Like `find()` except ensure that only one result is returned.
+
+        Built on `iter_find()`, None is returned if there are no results or
+        the `deadline` is reached before the first one.
+        """
         # ensure that maximum is supplied so that a big query is not happening
-        # behind the scenes
-        if 'maximum' not in kwargs:
+        # behind the scenes, unless some results may be excluded, then stop
+        # at the first result that is not
+        if 'maximum' not in kwargs and not kwargs.get('exclude'):
             kwargs['maximum'] = 1
 
+        # extract the first iterated value from the result, None if there are
+        # no results
+        entities = cls.iter_find(*args, **kwargs)
         try:
-            # call find and extract the first iterated value from the result
-            iterable = iter(cls.find(*args, **kwargs))
-            return next(iterable)
-        except StopIteration:
-            # no result was found
-            return None
+            return next(entities, None)
+        finally:
+            entities.close()
 
     @classmethod
-    def create(cls, data=None, api_key=None, endpoint=None, add_headers=None,
-               data_key=None, response_data_key=None, method='POST', **kwargs):
+    def create(cls, *args, **kwargs):
         """
         Create an instance of the Entity model by calling to the API endpoint.
 
@@ -451,6 +974,13 @@ class Entity(ClientMixin):
         NOTE: The server must return a response with the schema containing
         the entire entity value. A True or False response is no bueno.
         """
+        return run_flow(cls._create_flow(*args, **kwargs))
+
+    @classmethod
+    def _create_flow(cls, data=None, api_key=None, endpoint=None,
+                     add_headers=None, data_key=None, response_data_key=None,
+                     method='POST', **kwargs):
+        """The flow of `create` (and `acreate`), takes the same arguments."""
         inst = cls(api_key=api_key)
 
         if data_key is None:
@@ -465,33 +995,164 @@ class Entity(ClientMixin):
         if endpoint is None:
             endpoint = cls.get_endpoint()
 
-        inst._set(cls._parse(inst.request(method,
-                                          endpoint=endpoint,
-                                          data=body,
-                                          query_params=kwargs,
-                                          add_headers=add_headers,
-                                          ),
-                             key=response_data_key))
+        inst._set(cls._parse((yield from inst._request_flow(
+            method,
+            endpoint=endpoint,
+            data=body,
+            query_params=kwargs,
+            add_headers=add_headers,
+        )), key=response_data_key))
         return inst
 
     # sugar-pills
     post = create
 
     @classmethod
-    def delete(cls, id, api_key=None, **kwargs):
+    def delete(cls, *args, **kwargs):
         """Delete an entity from the server by ID."""
+        return run_flow(cls._delete_flow(*args, **kwargs))
+
+    @classmethod
+    def _delete_flow(cls, id, api_key=None, **kwargs):
         inst = cls(api_key=api_key)
         endpoint = '/'.join((cls.get_endpoint(), id))
-        inst.request('DELETE', endpoint=endpoint, query_params=kwargs)
+        yield from inst._request_flow('DELETE', endpoint=endpoint,
+                                      query_params=kwargs)
         inst._is_deleted = True
         return True
 
     @classmethod
-    def put(cls, id, api_key=None, **kwargs):
+    def put(cls, *args, **kwargs):
         """Delete an entity from the server by ID."""
+        return run_flow(cls._put_flow(*args, **kwargs))
+
+    @classmethod
+    def _put_flow(cls, id, api_key=None, **kwargs):
         inst = cls(api_key=api_key)
         endpoint = '/'.join((cls.get_endpoint(), id))
-        return inst.request('PUT', endpoint=endpoint, query_params=kwargs)
+        return (yield from inst._request_flow('PUT', endpoint=endpoint,
+                                              query_params=kwargs))
+
+    @classmethod
+    async def afetch(cls, *args, **kwargs):
+        """Awaitable `fetch`, takes the same arguments."""
+        if not cls._native(Entity, 'fetch'):
+            return await cls._arun(cls.fetch, *args, **kwargs)
+        return await arun_flow(cls._fetch_flow(*args, **kwargs))
+
+    @classmethod
+    async def afetch_many(cls, ids, api_key=None, concurrency=None,
+                          raise_errors=False, deadline=None, **kwargs):
+        """Awaitable `fetch_many`, takes the same arguments."""
+        if not cls._native(Entity, 'fetch_many'):
+            return await cls._arun(cls.fetch_many, ids, api_key=api_key,
+                                   concurrency=concurrency,
+                                   raise_errors=raise_errors,
+                                   deadline=deadline, **kwargs)
+
+        import asyncio
+
+        if concurrency is None:
+            from pypd import fetch_concurrency as concurrency
+
+        unique_ids = list(OrderedDict.fromkeys(ids))
+        deadline = Deadline.coerce(deadline)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch(id_):
+            async with semaphore:
+                try:
+                    return await cls.afetch(id_, api_key=api_key,
+                                            deadline=deadline, **kwargs), None
+                except Exception as e:
+                    return None, e
+
+        results = await asyncio.gather(*[fetch(id_) for id_ in unique_ids])
+        return cls._batch_result(unique_ids, results, raise_errors)
+
+    @classmethod
+    async def afind(cls, *args, **kwargs):
+        """Awaitable `find`, takes the same arguments."""
+        if not cls._native(Entity, 'find', '_find_pages'):
+            return await cls._arun(cls.find, *args, **kwargs)
+        return [entity async for entities in
+                aiter_flow(cls._find_pages_flow(*args, **kwargs))
+                for entity in entities]
+
+    @classmethod
+    async def afind_one(cls, *args, **kwargs):
+        """Awaitable `find_one`, takes the same arguments."""
+        if not cls._native(Entity, 'find_one', 'iter_find'):
+            return await cls._arun(cls.find_one, *args, **kwargs)
+
+        if 'maximum' not in kwargs and not kwargs.get('exclude'):
+            kwargs['maximum'] = 1
+
+        entities = cls.aiter_find(*args, **kwargs)
+        try:
+            async for entity in entities:
+                return entity
+        finally:
+            await entities.aclose()
+        return None
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs):
+        """Awaitable `create`, takes the same arguments."""
+        if not cls._native(Entity, 'create'):
+            return await cls._arun(cls.create, *args, **kwargs)
+        return await arun_flow(cls._create_flow(*args, **kwargs))
+
+    @classmethod
+    async def adelete(cls, *args, **kwargs):
+        """Awaitable `delete`, takes the same arguments."""
+        if not cls._native(Entity, 'delete'):
+            return await cls._arun(cls.delete, *args, **kwargs)
+        return await arun_flow(cls._delete_flow(*args, **kwargs))
+
+    @classmethod
+    async def aput(cls, *args, **kwargs):
+        """Awaitable `put`, takes the same arguments."""
+        if not cls._native(Entity, 'put'):
+            return await cls._arun(cls.put, *args, **kwargs)
+        return await arun_flow(cls._put_flow(*args, **kwargs))
+
+    @classmethod
+    async def aiter_find(cls, *args, **kwargs):
+        """
+        Asynchronously iterate over the entities `find()` would return.
+
+        Pages are fetched one at a time while iterating, so the first
+        entities are available before the last page has been fetched, and
+        the iteration stops at the `deadline` like `iter_find()`, eg.
+
+            async for incident in Incident.aiter_find(statuses=['triggered']):
+                ...
+        """
+        if cls._native(Entity, '_find_pages'):
+            pages = aiter_flow(cls._find_pages_flow(*args, **kwargs))
+            try:
+                async for entities in pages:
+                    for entity in entities:
+                        yield entity
+            except DeadlineExceeded:
+                pass
+            finally:
+                await pages.aclose()
+            return
+
+        pages = cls._find_pages(*args, **kwargs)
+
+        while True:
+            try:
+                entities = await cls._arun(next, pages, None)
+            except DeadlineExceeded:
+                break
+            if entities is None:
+                break
+
+            for entity in entities:
+                yield entity
 
     @classmethod
     def _parse(cls, data, key=None):
@@ -535,10 +1196,52 @@ class Entity(ClientMixin):
         """
         return self._data
 
+    def refresh(self):
+        """
+        Fetch this entity again and update it in place.
+
+        The request is conditional on the `ETag`/`Last-Modified` of the
+        previous response, so nothing is downloaded or parsed when the entity
+        has not changed. Returns True if the entity was updated.
+        """
+        return run_flow(self._refresh_flow())
+
+    def _refresh_flow(self):
+        if self._fetched is not None:
+            endpoint, parse_key, query_params = self._fetched
+        else:
+            endpoint = '/'.join((self.get_endpoint(), self.id))
+            parse_key = self.sanitize_ep(self.get_endpoint())
+            query_params = None
+
+        meta = {}
+        response = yield from self._request_flow(
+            'GET', endpoint=endpoint, query_params=query_params,
+            validators=self._validators, meta=meta)
+        if meta['status'] == 304:
+            return False
+
+        self._set(self._parse(response, key=parse_key))
+        self._fetched = (endpoint, parse_key, query_params)
+        self._validators = meta.get('validators')
+        return True
+
+    async def arefresh(self):
+        """Awaitable `refresh`."""
+        if not self._native(Entity, 'refresh'):
+            return await self._arun(self.refresh)
+        return await arun_flow(self._refresh_flow())
+
     def remove(self):
         """Delete this instance from server record."""
         return self.__class__.delete(self.id)
 
+    async def aremove(self):
+        """Awaitable `remove`."""
+        if not self._native(Entity, 'remove'):
+            return await self._arun(self.remove)
+        return await self.__class__.adelete(self.id)
+
     def __getitem__(self, attr):
         """Attribute accessor method in dict-like fashion."""
         try:
@@ -595,3 +1298,69 @@ class Entity(ClientMixin):
     def __repr__(self):
         """Return a more meaningful programmer representation string."""
         return self.__str__()
+
+
+class CompactEntity(object):
+    """
+    Mixin of the compact entity classes returned by `Entity.compact()`.
+
+    Instances keep their data (and how they were fetched, for `refresh()`)
+    in `__slots__`, and their keys are iterated over without copying the
+    data. Models are not slotted so instances still have a `__dict__`, but
+    nothing is ever stored in it.
+    """
+
+    __slots__ = ()
+    _compact = True
+    # API key of the instances of this class, the client's if None
+    _api_key = None
+
+    def __new__(cls, api_key=None, _data=None):
+        if api_key and api_key != cls._api_key:
+            cls = cls._keyed(api_key)
+        return object.__new__(cls)
+
+    def __init__(self, api_key=None, _data=None):
+        self._data = _data
+        self._fetched = self._validators = None
+
+    @classmethod
+    def _keyed(cls, api_key):
+        """
+        Return the subclass of this class holding `api_key`.
+
+        The unkeyed class is returned if `api_key` is the client's.
+        """
+        base = cls.__mro__[1] if cls._api_key is not None else cls
+        if api_key == base.get_client().api_key:
+            return base
+        with _compact_lock:
+            keyed = base.__dict__.get('_keyed_classes')
+            if keyed is None:
+                keyed = base._keyed_classes = {}
+            if api_key not in keyed:
+                keyed[api_key] = type(base.__name__, (base,), {
+                    '__slots__': (),
+                    '__module__': base.__module__,
+                    '__doc__': base.__doc__,
+                    '_api_key': api_key,
+                })
+            return keyed[api_key]
+
+    @property
+    def api_key(self):
+        if self._api_key is not None:
+            return self._api_key
+        return self.get_client().api_key
+
+    @property
+    def base_url(self):
+        return self.get_client().base_url
+
+    @property
+    def proxies(self):
+        return self.get_client().proxies
+
+    def __iter__(self):
+        """Return an iterator over the keys of the data."""
+        return iter(self._data or ())
@@ -8,12 +8,15 @@ class EscalationPolicy(Entity):
     """PagerDuty escalation policy entity."""
 
     STR_OUTPUT_FIELDS = ('id', 'name',)
+    CACHE_TTL = 300
     TRANSLATE_QUERY_PARAM = ('name',)
+    serviceFactory = Service
 
     def services(self):
         """Fetch all instances of services for this EP."""
         ids = [ref['id'] for ref in self['services']]
-        return [Service.fetch(id) for id in ids]
+        return self.serviceFactory.fetch_many(ids, api_key=self.api_key,
+                                              raise_errors=True)
 
     def update(self, *args, **kwargs):
         """Update this escalation policy."""
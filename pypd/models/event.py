@@ -18,6 +18,8 @@ class Event(Entity):
     base_url = 'https://events.pagerduty.com/generic/2010-04-15/'\
                'create_event.json'
     EVENT_TYPES = ('trigger', 'acknowledge', 'resolve',)
+    # events sharing this key are de-duplicated, so sending them twice is safe
+    DEDUP_KEY = 'incident_key'
 
     @classmethod
     def validate(cls, event_info):
@@ -50,6 +52,7 @@ class Event(Entity):
                             data=data,
                             query_params=kwargs,
                             add_headers=add_headers,
+                            idempotent=bool(data.get(cls.DEDUP_KEY)),
                             )
 
 
@@ -58,6 +61,7 @@ class EventV2(Event):
 
     base_url = 'https://events.pagerduty.com/v2/enqueue'
     SEVERITY_TYPES = ('critical', 'error', 'warning', 'info',)
+    DEDUP_KEY = 'dedup_key'
 
     @classmethod
     def validate(cls, event_info):
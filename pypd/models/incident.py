@@ -8,13 +8,15 @@ from .entity import Entity
 from .log_entry import LogEntry
 from .note import Note
 from .alert import Alert
+from .windowed import TimeWindowed
 from ..errors import InvalidArguments, MissingFromEmail
 
 
-class Incident(Entity):
+class Incident(TimeWindowed, Entity):
     """Represents an Incident in PagerDuty's API."""
 
     STR_OUTPUT_FIELDS = ('id', 'status',)
+    INTERN_FIELDS = ('type', 'status', 'urgency',)
 
     logEntryFactory = LogEntry
     noteFactory = Note
@@ -22,6 +24,10 @@ class Incident(Entity):
 
     def resolve(self, from_email, resolution=None):
         """Resolve an incident using a valid email address."""
+        return self.request('PUT', **self._resolve_args(from_email,
+                                                        resolution))
+
+    def _resolve_args(self, from_email, resolution=None):
         if from_email is None or not isinstance(from_email, six.string_types):
             raise MissingFromEmail(from_email)
 
@@ -37,14 +43,13 @@ class Incident(Entity):
         if resolution is not None:
             data['resolution'] = resolution
 
-        result = self.request('PUT',
-                              endpoint=endpoint,
-                              add_headers=add_headers,
-                              data=data,)
-        return result
+        return dict(endpoint=endpoint, add_headers=add_headers, data=data)
 
     def acknowledge(self, from_email):
         """Resolve an incident using a valid email address."""
+        return self.request('PUT', **self._acknowledge_args(from_email))
+
+    def _acknowledge_args(self, from_email):
         endpoint = '/'.join((self.endpoint, self.id,))
 
         if from_email is None or not isinstance(from_email, six.string_types):
@@ -58,14 +63,14 @@ class Incident(Entity):
             }
         }
 
-        result = self.request('PUT',
-                              endpoint=endpoint,
-                              add_headers=add_headers,
-                              data=data,)
-        return result
+        return dict(endpoint=endpoint, add_headers=add_headers, data=data)
 
     def reassign(self, from_email, user_ids):
         """Reassign an incident to other users using a valid email address."""
+        return self.request('PUT', **self._reassign_args(from_email,
+                                                         user_ids))
+
+    def _reassign_args(self, from_email, user_ids):
         endpoint = '/'.join((self.endpoint, self.id,))
 
         if from_email is None or not isinstance(from_email, six.string_types):
@@ -94,15 +99,16 @@ class Incident(Entity):
             }
         }
 
-        result = self.request('PUT',
-                              endpoint=endpoint,
-                              add_headers=add_headers,
-                              data=data,)
-        return result
+        return dict(endpoint=endpoint, add_headers=add_headers, data=data)
 
     def log_entries(self, time_zone='UTC', is_overview=False,
                     include=None, fetch_all=True):
         """Query for log entries on an incident instance."""
+        return self.logEntryFactory.find(**self._log_entries_args(
+            time_zone, is_overview, include, fetch_all))
+
+    def _log_entries_args(self, time_zone='UTC', is_overview=False,
+                          include=None, fetch_all=True):
         endpoint = '/'.join((self.endpoint, self.id, 'log_entries'))
 
         query_params = {
@@ -113,14 +119,8 @@ class Incident(Entity):
         if include:
             query_params['include'] = include
 
-        result = self.logEntryFactory.find(
-            endpoint=endpoint,
-            api_key=self.api_key,
-            fetch_all=fetch_all,
-            **query_params
-        )
-
-        return result
+        return dict(endpoint=endpoint, api_key=self.api_key,
+                    fetch_all=fetch_all, **query_params)
 
     def update(self, *args, **kwargs):
         """Update this incident."""
@@ -128,21 +128,25 @@ class Incident(Entity):
 
     def notes(self):
         """Query for notes attached to this incident."""
+        return self.noteFactory.find(**self._notes_args())
+
+    def _notes_args(self):
         endpoint = '/'.join((self.endpoint, self.id, 'notes'))
-        return self.noteFactory.find(
-            endpoint=endpoint,
-            api_key=self.api_key,
-        )
+        return dict(endpoint=endpoint, api_key=self.api_key)
 
     def create_note(self, from_email, content):
         """Create a note for this incident."""
+        return self.noteFactory.create(**self._create_note_args(from_email,
+                                                                content))
+
+    def _create_note_args(self, from_email, content):
         if from_email is None or not isinstance(from_email, six.string_types):
             raise MissingFromEmail(from_email)
 
         endpoint = '/'.join((self.endpoint, self.id, 'notes'))
         add_headers = {'from': from_email, }
 
-        return self.noteFactory.create(
+        return dict(
             endpoint=endpoint,
             api_key=self.api_key,
             add_headers=add_headers,
@@ -151,13 +155,17 @@ class Incident(Entity):
 
     def snooze(self, from_email, duration):
         """Snooze this incident for `duration` seconds."""
+        return self.__class__.create(**self._snooze_args(from_email,
+                                                         duration))
+
+    def _snooze_args(self, from_email, duration):
         if from_email is None or not isinstance(from_email, six.string_types):
             raise MissingFromEmail(from_email)
 
         endpoint = '/'.join((self.endpoint, self.id, 'snooze'))
         add_headers = {'from': from_email, }
 
-        return self.__class__.create(
+        return dict(
             endpoint=endpoint,
             api_key=self.api_key,
             add_headers=add_headers,
@@ -167,6 +175,10 @@ class Incident(Entity):
 
     def merge(self, from_email, source_incidents):
         """Merge other incidents into this incident."""
+        return self.__class__.create(**self._merge_args(from_email,
+                                                        source_incidents))
+
+    def _merge_args(self, from_email, source_incidents):
         if from_email is None or not isinstance(from_email, six.string_types):
             raise MissingFromEmail(from_email)
 
@@ -177,7 +189,7 @@ class Incident(Entity):
         incident_references = [{'type': 'incident_reference', 'id': id_}
                                for id_ in incident_ids]
 
-        return self.__class__.create(
+        return dict(
             endpoint=endpoint,
             api_key=self.api_key,
             add_headers=add_headers,
@@ -188,8 +200,69 @@ class Incident(Entity):
 
     def alerts(self):
         """Query for alerts attached to this incident."""
+        return self.alertFactory.find(**self._alerts_args())
+
+    def _alerts_args(self):
         endpoint = '/'.join((self.endpoint, self.id, 'alerts'))
-        return self.alertFactory.find(
-            endpoint=endpoint,
-            api_key=self.api_key,
-        )
+        return dict(endpoint=endpoint, api_key=self.api_key)
+
+    async def aresolve(self, *args, **kwargs):
+        """Awaitable `resolve`, takes the same arguments."""
+        if not self._native(Incident, 'resolve'):
+            return await self._arun(self.resolve, *args, **kwargs)
+        return await self.arequest('PUT', **self._resolve_args(*args,
+                                                               **kwargs))
+
+    async def aacknowledge(self, *args, **kwargs):
+        """Awaitable `acknowledge`, takes the same arguments."""
+        if not self._native(Incident, 'acknowledge'):
+            return await self._arun(self.acknowledge, *args, **kwargs)
+        return await self.arequest('PUT', **self._acknowledge_args(*args,
+                                                                   **kwargs))
+
+    async def areassign(self, *args, **kwargs):
+        """Awaitable `reassign`, takes the same arguments."""
+        if not self._native(Incident, 'reassign'):
+            return await self._arun(self.reassign, *args, **kwargs)
+        return await self.arequest('PUT', **self._reassign_args(*args,
+                                                                **kwargs))
+
+    async def asnooze(self, *args, **kwargs):
+        """Awaitable `snooze`, takes the same arguments."""
+        if not self._native(Incident, 'snooze'):
+            return await self._arun(self.snooze, *args, **kwargs)
+        return await self.__class__.acreate(**self._snooze_args(*args,
+                                                                **kwargs))
+
+    async def amerge(self, *args, **kwargs):
+        """Awaitable `merge`, takes the same arguments."""
+        if not self._native(Incident, 'merge'):
+            return await self._arun(self.merge, *args, **kwargs)
+        return await self.__class__.acreate(**self._merge_args(*args,
+                                                               **kwargs))
+
+    async def acreate_note(self, *args, **kwargs):
+        """Awaitable `create_note`, takes the same arguments."""
+        if not self._native(Incident, 'create_note'):
+            return await self._arun(self.create_note, *args, **kwargs)
+        return await self.noteFactory.acreate(
+            **self._create_note_args(*args, **kwargs))
+
+    async def alog_entries(self, *args, **kwargs):
+        """Awaitable `log_entries`, takes the same arguments."""
+        if not self._native(Incident, 'log_entries'):
+            return await self._arun(self.log_entries, *args, **kwargs)
+        return await self.logEntryFactory.afind(
+            **self._log_entries_args(*args, **kwargs))
+
+    async def anotes(self):
+        """Awaitable `notes`."""
+        if not self._native(Incident, 'notes'):
+            return await self._arun(self.notes)
+        return await self.noteFactory.afind(**self._notes_args())
+
+    async def aalerts(self):
+        """Awaitable `alerts`."""
+        if not self._native(Incident, 'alerts'):
+            return await self._arun(self.alerts)
+        return await self.alertFactory.afind(**self._alerts_args())
@@ -36,7 +36,7 @@ class Integration(Entity):
         assert (integration_info['type'] in cls.ALLOWED_INTEGRATION_TYPES)
 
     @classmethod
-    def fetch(cls, id, service=None, endpoint=None, *args, **kwargs):
+    def _fetch_flow(cls, id, service=None, endpoint=None, *args, **kwargs):
         """Customize fetch because it lives on a special endpoint."""
         if service is None and endpoint is None:
             raise InvalidArguments(service, endpoint)
@@ -45,8 +45,8 @@ class Integration(Entity):
             sid = service['id'] if isinstance(service, Entity) else service
             endpoint = 'services/{0}/integrations'.format(sid)
 
-        return getattr(Entity, 'fetch').__func__(cls, id, endpoint=endpoint,
-                                                 *args, **kwargs)
+        return super(Integration, cls)._fetch_flow(id, endpoint=endpoint,
+                                                   *args, **kwargs)
 
     @classmethod
     def delete(*args, **kwargs):
@@ -60,7 +60,8 @@ class Integration(Entity):
         )
 
     @classmethod
-    def create(cls, service=None, endpoint=None, data=None, *args, **kwargs):
+    def _create_flow(cls, service=None, endpoint=None, data=None, *args,
+                     **kwargs):
         """
         Create an integration within the scope of an service.
 
@@ -76,5 +77,6 @@ class Integration(Entity):
             endpoint = 'services/{0}/integrations'.format(sid)
 
         # otherwise endpoint should contain the service path too
-        return getattr(Entity, 'create').__func__(cls, endpoint=endpoint,
-                                                  data=data, *args, **kwargs)
+        return super(Integration, cls)._create_flow(endpoint=endpoint,
+                                                    data=data, *args,
+                                                    **kwargs)
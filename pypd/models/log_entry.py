@@ -1,10 +1,11 @@
 # Copyright (c) PagerDuty.
 # See LICENSE for details.
 from .entity import Entity
+from .windowed import TimeWindowed
 from ..errors import InvalidEndpointOperation, InvalidEndpoint
 
 
-class LogEntry(Entity):
+class LogEntry(TimeWindowed, Entity):
     """PagerDuty log entry entity."""
     STR_OUTPUT_FIELDS = ('id', 'type',)
 
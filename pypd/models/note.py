@@ -22,7 +22,7 @@ class Note(Entity):
     delete = fetch
 
     @classmethod
-    def create(cls, incident=None, endpoint=None, *args, **kwargs):
+    def _create_flow(cls, incident=None, endpoint=None, *args, **kwargs):
         """
         Create a note within the scope of an incident.
 
@@ -36,8 +36,7 @@ class Note(Entity):
             endpoint = 'incidents/{0}/notes'.format(iid)
 
         # otherwise endpoint should contain the incident path too
-        return getattr(Entity, 'create').__func__(
-            cls,
+        return super(Note, cls)._create_flow(
             endpoint=endpoint,
             *args,
             **kwargs
@@ -3,17 +3,20 @@
 import datetime
 
 from .entity import Entity
-from ..errors import (InvalidArguments, InvalidEndpoint,
-                      InvalidEndpointOperation)
+from .windowed import TimeWindowed
+from ..errors import InvalidEndpoint, InvalidEndpointOperation
 
 
-class Notification(Entity):
+class Notification(TimeWindowed, Entity):
     """A PagerDuty Notification entity."""
 
+    # as per PD spec, date range must not exceed 1 month
+    MAX_WINDOW = datetime.timedelta(days=30)
+
     @classmethod
-    def find(cls, *args, **kwargs):
+    def _find_pages_flow(cls, *args, **kwargs):
         """
-        Find notifications.
+        Find notifications, used by `find`, `iter_find` and their twins.
 
         Optional kwargs are:
             since:
@@ -24,9 +27,10 @@ class Notification(Entity):
         If not specified, until will default to now(), and since will default
         to 30 days prior to until.
 
-        As per PD spec, date range must not exceed 1 month.
+        Ranges longer than the month PagerDuty accepts are fetched by windows
+        of at most 30 days, concurrently (see `TimeWindowed`), and yielded in
+        time order.
         """
-        seconds = 60 * 60 * 24 * 30  # seconds in 30 days
         until = kwargs.pop('until', None)
         since = kwargs.pop('since', None)
 
@@ -34,16 +38,15 @@ class Notification(Entity):
             until = datetime.datetime.now()
 
         if since is None:
-            since = until - datetime.timedelta(seconds=seconds)
-
-        dt = until - since
-        if dt > datetime.timedelta(seconds=seconds):
-            raise InvalidArguments(until, since)
+            since = until - cls.MAX_WINDOW
 
-        kwargs['since'] = since.isoformat()
-        kwargs['until'] = until.isoformat()
+        if until - since > cls.MAX_WINDOW or kwargs.get('sharded'):
+            kwargs.update(since=since, until=until, sharded=True)
+        else:
+            kwargs['since'] = since.isoformat()
+            kwargs['until'] = until.isoformat()
 
-        return getattr(Entity, 'find').__func__(cls, *args, **kwargs)
+        return super(Notification, cls)._find_pages_flow(*args, **kwargs)
 
     @classmethod
     def fetch(*args, **kwargs):
@@ -6,6 +6,9 @@ from .entity import Entity
 class Schedule(Entity):
     """PagerDuty schedule entity."""
 
+    # schedules are rendered for the current time, keep them briefly
+    CACHE_TTL = 60
+
     def get_oncall(self, **kwargs):
         """Retrieve this schedule's "on call" users."""
 
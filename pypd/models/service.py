@@ -9,6 +9,7 @@ class Service(Entity):
     """PagerDuty service entity."""
 
     STR_OUTPUT_FIELDS = ('id', 'name',)
+    CACHE_TTL = 300
     integrationFactory = Integration
     vendorFactory = Vendor
 
@@ -53,11 +54,14 @@ class Service(Entity):
     def integrations(self, **kwargs):
         """Retrieve all this services integrations."""
         ids = [ref['id'] for ref in self['integrations']]
-        return [Integration.fetch(id, service=self, query_params=kwargs) for id in ids]
+        return self.integrationFactory.fetch_many(
+            ids, service=self, api_key=self.api_key, raise_errors=True,
+            **kwargs)
 
     def get_integration(self, id, **kwargs):
         """Retrieve a single integration by id."""
-        return Integration.fetch(id, service=self, query_params=kwargs)
+        return self.integrationFactory.fetch(id, service=self,
+                                             api_key=self.api_key, **kwargs)
 
     def update_integration(self, *args, **kwargs):
         """Update this integration on this service."""
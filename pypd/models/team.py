@@ -11,6 +11,7 @@ class Team(Entity):
     """PagerDuty team entity."""
 
     STR_OUTPUT_FIELDS = ('id', 'name',)
+    CACHE_TTL = 300
     escalationPolicyFactory = EscalationPolicy
 
     def remove_escalation_policy(self, escalation_policy, **kwargs):
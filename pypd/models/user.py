@@ -6,6 +6,7 @@ from .entity import Entity
 class User(Entity):
     """PagerDuty user entity."""
     STR_OUTPUT_FIELDS = ('id', 'email',)
+    CACHE_TTL = 300
     EXCLUDE_FILTERS = TRANSLATE_QUERY_PARAM = ('email', 'name',)
 
     @property
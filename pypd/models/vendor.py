@@ -8,6 +8,8 @@ from ..errors import InvalidEndpointOperation, InvalidEndpoint
 class Vendor(Entity):
     """PagerDuty vedor entity."""
 
+    CACHE_TTL = 3600
+
     ALLOWED_VENDOR_TYPES = [
         # 'vendor',
         'vendor_reference',
@@ -0,0 +1,249 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Finding entities of a date range by time windows, fetched concurrently.
+
+PagerDuty stops offset pagination at `MAX_OFFSET` results, so a `find()` over
+a long date range silently stops there. Models mixing in `TimeWindowed` can
+instead be found with `sharded=True`: the range is cut into windows fetched
+concurrently, windows holding more results than can be paged through are cut
+in halves until they do not, and the results are merged in time order
+without duplicates, eg.
+
+    Incident.find(since=datetime(2018, 1, 1), until=datetime(2018, 7, 1),
+                  sharded=True, concurrency=8)
+"""
+import datetime
+import threading
+from collections import deque
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+
+from ..deadline import Deadline
+from ..errors import InvalidArguments
+from ..log import warn
+from ..mixins import PAGES, run_flow
+
+
+def split_range(since, until, parts, max_width=None):
+    """
+    Cut the `since`..`until` range into `parts` windows of equal width.
+
+    More windows are made if needed for none to be wider than `max_width`.
+    Returns a list of (since, until) tuples in time order.
+    """
+    span = until - since
+    if max_width is not None:
+        parts = max(parts, -(-span // max_width))
+    parts = max(1, parts)
+    bounds = [since + span * i / parts for i in range(parts)] + [until]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class TimeWindowed(object):
+    """
+    Mixin of the entities that can be found by time windows.
+
+    `find(since=..., until=..., sharded=True)` (and `iter_find`, `find_one`,
+    `aiter_find`) cut the range in `shards` windows (default: as many as
+    `concurrency`, itself defaulting to `pypd.window_concurrency`) fetched on
+    a pool of `concurrency` workers. Windows with more than `MAX_OFFSET`
+    results are cut in halves, down to `MIN_WINDOW`. With `fetch_all=False`
+    only the first page of the range (of its first `MAX_WINDOW`, if any) is
+    fetched.
+
+    Models whose `PAGINATION` is 'time_window' are always found that way.
+    """
+
+    # results past this offset cannot be paged through
+    MAX_OFFSET = 10000
+    # windows are not cut in parts shorter than this
+    MIN_WINDOW = datetime.timedelta(seconds=1)
+    # widest date range the endpoint accepts, None if there is no limit
+    MAX_WINDOW = None
+
+    @classmethod
+    def _find_pages_flow(cls, *args, **kwargs):
+        if not kwargs.pop('sharded', cls.PAGINATION == 'time_window'):
+            return super(TimeWindowed, cls)._find_pages_flow(*args, **kwargs)
+        return cls._find_window_pages_flow(*args, **kwargs)
+
+    @classmethod
+    def _find_window_pages_flow(cls, api_key=None, fetch_all=True,
+                                endpoint=None, maximum=None, concurrency=None,
+                                deadline=None, since=None, until=None,
+                                shards=None, **kwargs):
+        """
+        Fetch the (exclusion filtered) entities of `since`..`until` by window.
+
+        Takes the same arguments as `find()`, entities are handed over page
+        by page in time order and each only once, by `_iter_window_pages`
+        on the worker threads of the windows.
+        """
+        if (not isinstance(since, datetime.datetime) or
+                not isinstance(until, datetime.datetime) or since >= until):
+            raise InvalidArguments(since, until)
+
+        if not fetch_all:
+            if cls.MAX_WINDOW is not None:
+                until = min(until, since + cls.MAX_WINDOW)
+            return (yield from super(TimeWindowed, cls)._find_pages_flow(
+                api_key=api_key, fetch_all=False, endpoint=endpoint,
+                maximum=maximum, deadline=deadline, since=since, until=until,
+                **kwargs))
+
+        if concurrency is None:
+            from pypd import window_concurrency as concurrency
+
+        endpoint, excluded, query_params = cls._find_params(endpoint, kwargs)
+        windows = split_range(since, until, shards or concurrency,
+                              cls.MAX_WINDOW)
+        yield (PAGES, cls._iter_window_pages(
+            api_key, endpoint, query_params, windows, concurrency,
+            Deadline.coerce(deadline), maximum, excluded),
+            cls.get_client().async_pool)
+
+    @classmethod
+    def _iter_window_pages(cls, api_key, endpoint, query_params, windows,
+                           concurrency, deadline=None, maximum=None,
+                           excluded=None):
+        """
+        Yield the entities of `windows` not `excluded`, page by page.
+
+        Entities are yielded in time order and each only once. Windows stop
+        being fetched once `maximum` entities have been yielded.
+        """
+        seen = set()
+        count = 0
+
+        for entities in cls._iter_windows(api_key, endpoint, query_params,
+                                          windows, concurrency, deadline,
+                                          maximum):
+            page = []
+            for entity in entities:
+                key = entity.get('id')
+                if key is not None:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                if excluded is None or not excluded(entity):
+                    page.append(entity)
+
+            if maximum is not None:
+                page = page[:maximum - count]
+            count += len(page)
+            yield page
+            if maximum is not None and count >= maximum:
+                break
+
+    @classmethod
+    def _iter_windows(cls, api_key, endpoint, query_params, windows,
+                      concurrency, deadline=None, maximum=None):
+        """
+        Fetch `windows` on a pool of `concurrency` workers.
+
+        Yields the entities of each page of each window as they arrive,
+        windows in order, no more than `maximum` of each window. Windows not
+        yet fetched are dropped if the caller stops iterating early, without
+        waiting on the requests in flight (which would block an event loop
+        driving `aiter_find`), those finish on their own.
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                      thread_name_prefix='pypd-window')
+        stopped = threading.Event()
+        futures = []
+
+        def submit(since, until):
+            """Fetch a window, return the queue its pages are put on."""
+            pages = Queue()
+            futures.append(executor.submit(fetch, since, until, pages))
+            return pages
+
+        def fetch(since, until, pages):
+            """
+            Put the pages of a window on `pages`.
+
+            They are followed by None once the window is done, the queues of
+            its halves if it has too many results, or the error raised.
+            """
+            try:
+                whole = cls._fetch_window(api_key, endpoint, query_params,
+                                          since, until, pages.put, deadline,
+                                          stopped, maximum)
+                if whole or stopped.is_set():
+                    pages.put(None)
+                    return
+                middle = since + (until - since) / 2
+                pages.put((submit(since, middle), submit(middle, until)))
+            except Exception as e:
+                pages.put(e)
+
+        pending = deque(submit(since, until) for since, until in windows)
+        try:
+            while pending:
+                item = pending[0].get()
+                if isinstance(item, list):
+                    yield item
+                    continue
+                pending.popleft()
+                if isinstance(item, tuple):
+                    pending.extendleft(reversed(item))
+                elif item is not None:
+                    raise item
+        finally:
+            stopped.set()
+            for future in list(futures):
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @classmethod
+    def _fetch_window(cls, api_key, endpoint, query_params, since, until,
+                      put, deadline=None, stopped=None, maximum=None):
+        """
+        Fetch the entities of the `since`..`until` window.
+
+        Calls `put` with the list of the entities of each page. Returns True
+        once every page (or `maximum` entities) has been put, False if the
+        window holds more than `MAX_OFFSET` entities and ought to be cut in
+        halves (some pages may have been put already when the server does not
+        report a total). Stops early once the `stopped` event, if given, is
+        set.
+        """
+        limit = cls.MAX_LIMIT_VALUE
+        if maximum is not None:
+            limit = max(1, min(limit, maximum))
+        divisible = until - since >= 2 * cls.MIN_WINDOW
+        qp = dict(query_params, since=since, until=until, limit=limit)
+        offset = count = 0
+
+        while stopped is None or not stopped.is_set():
+            qp['offset'] = offset
+            if offset == 0:
+                qp['total'] = 'true'
+            entities, options = run_flow(cls._fetch_page_flow(
+                api_key=api_key, endpoint=endpoint, deadline=deadline, **qp))
+            qp.pop('total', None)
+
+            total = options.get('total')
+            if (divisible and offset == 0 and total is not None and
+                    total > cls.MAX_OFFSET):
+                return False
+
+            put(entities)
+            count += len(entities)
+            if maximum is not None and count >= maximum:
+                return True
+            # step by what the server pages, which may be less than asked for
+            offset += options.get('limit') or len(entities)
+            more = options.get('more')
+            if more is None:
+                more = total is not None and offset < total
+            if not more or not entities:
+                return True
+            if offset >= cls.MAX_OFFSET:
+                if divisible:
+                    return False
+                warn('%s of %s to %s are truncated at %s results', cls,
+                     since, until, cls.MAX_OFFSET)
+                return True
+        return True
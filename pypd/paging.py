@@ -0,0 +1,92 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Adaptive page sizes for walking paginated results.
+
+`find()` asks for the largest pages an endpoint allows (`MAX_LIMIT_VALUE`,
+or `limit=` if given), or fewer when `maximum` needs no more. While pages are
+walked one after another the size of the next page is adapted: it is halved
+when a page took longer than `slow` seconds or its body was larger than
+`large` bytes (eg. big `include[]` expansions), and doubled back towards the
+largest size once pages are fast and small again.
+
+Changes are reported to the `on_page_size` hooks (and so to
+`pypd.metrics`). The policy used by the package can be swapped out or
+disabled, eg.
+
+    from pypd.paging import PageSizing, set_page_sizing
+    set_page_sizing(PageSizing(slow=5.0, large=4 * 1024 * 1024))
+    set_page_sizing(None)  # fixed page sizes
+"""
+from . import hooks
+
+
+class PageSizing(object):
+    """
+    When the pages of a query ought to be made smaller or larger.
+
+    slow:
+        seconds a page may take before the next ones are made smaller
+    large:
+        bytes a page may weigh before the next ones are made smaller
+    minimum:
+        smallest page size it shrinks pages to
+    """
+
+    def __init__(self, slow=2.0, large=1024 * 1024, minimum=10):
+        self.slow = slow
+        self.large = large
+        self.minimum = minimum
+
+    def sizer(self, limit, endpoint=''):
+        """Return a `PageSizer` of the pages of a query, at most `limit`."""
+        return PageSizer(self, limit, endpoint)
+
+
+class PageSizer(object):
+    """The size of the pages of one query, as `PageSizing` adapts it."""
+
+    def __init__(self, sizing, limit, endpoint=''):
+        self.sizing = sizing
+        self.ceiling = self.limit = limit
+        self.endpoint = endpoint
+
+    def cap(self, limit):
+        """Never make pages larger than `limit`, eg. what the server allows."""
+        self.ceiling = min(self.ceiling, limit)
+        self.limit = min(self.limit, self.ceiling)
+
+    def update(self, elapsed, size):
+        """Return the size of the next page, given how the last one went."""
+        sizing, previous = self.sizing, self.limit
+        if elapsed > sizing.slow or size > sizing.large:
+            reason = 'slow' if elapsed > sizing.slow else 'large'
+            self.limit = max(min(sizing.minimum, previous), previous // 2)
+        elif (previous < self.ceiling and elapsed < sizing.slow / 2 and
+                size < sizing.large / 2):
+            reason = 'recovered'
+            self.limit = min(self.ceiling, previous * 2)
+
+        if self.limit != previous:
+            page_size_hooks = hooks.get('on_page_size')
+            if page_size_hooks:
+                hooks.fire(page_size_hooks,
+                           endpoint=hooks.endpoint_template(self.endpoint),
+                           previous=previous, limit=self.limit,
+                           reason=reason, elapsed=elapsed, bytes_in=size)
+        return self.limit
+
+
+_page_sizing = PageSizing()
+
+
+def get_page_sizing():
+    """Return the package-wide page sizing, None if disabled."""
+    return _page_sizing
+
+
+def set_page_sizing(new_page_sizing):
+    """Set the package-wide page sizing, None keeps page sizes fixed."""
+    global _page_sizing
+    _page_sizing = new_page_sizing
+    return new_page_sizing
@@ -0,0 +1,424 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Shared, keep-alive HTTP sessions for pypd clients.
+
+Every HTTP request done by a `ClientMixin` (all `Entity` subclasses as well as
+`Event`/`EventV2`) is sent through a `requests.Session` handed out by a
+`ConnectionPool`. One session is kept per (base_url, proxies) pair, so TCP and
+TLS connections are reused between requests instead of being set up again for
+every call.
+
+The pool used by the package can be swapped out, eg.
+
+    from pypd.pool import ConnectionPool, set_pool
+    set_pool(ConnectionPool(pool_maxsize=50, pool_block=True))
+
+asyncio callers (see `AsyncClientMixin`) share an `AsyncPool`, which sends
+their requests natively with `httpx` when it is installed (`pip install
+pypd[httpx]`), and otherwise runs those same pooled requests on a bounded set
+of worker threads.
+"""
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class PoolStats(object):
+    """
+    Thread-safe counters describing how pooled connections are used.
+
+    hits:
+        a request was sent over an already open (kept-alive) connection
+    new_connections:
+        a new connection had to be opened
+    waits:
+        a request had to wait for a connection to be returned to a full pool
+        (only happens when the pool is blocking)
+    """
+
+    FIELDS = ('hits', 'new_connections', 'waits',)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field, value=1):
+        with self._lock:
+            self._counters[field] += value
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class _CountingPoolMixin(object):
+    """Count hits, new connections and waits of a urllib3 connection pool."""
+
+    stats = None
+
+    def _get_conn(self, timeout=None):
+        # with a blocking pool, an empty queue means every connection is
+        # checked out and this request is about to wait for one
+        if self.block and self.pool is not None and self.pool.empty():
+            self.stats.incr('waits')
+
+        conn = super(_CountingPoolMixin, self)._get_conn(timeout=timeout)
+
+        if getattr(conn, '_pypd_used', False):
+            self.stats.incr('hits')
+        else:
+            conn._pypd_used = True
+        return conn
+
+    def _new_conn(self):
+        self.stats.incr('new_connections')
+        return super(_CountingPoolMixin, self)._new_conn()
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _PooledAdapter(HTTPAdapter):
+    """An `HTTPAdapter` whose connection pools report to a `PoolStats`."""
+
+    def __init__(self, stats, *args, **kwargs):
+        self._pool_classes = {
+            'http': type('HTTPConnectionPool',
+                         (_CountingHTTPConnectionPool,), {'stats': stats}),
+            'https': type('HTTPSConnectionPool',
+                          (_CountingHTTPSConnectionPool,), {'stats': stats}),
+        }
+        HTTPAdapter.__init__(self, *args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, *args, **kwargs):
+        manager = HTTPAdapter.proxy_manager_for(self, *args, **kwargs)
+        manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+
+class ConnectionPool(object):
+    """
+    Hand out one keep-alive `requests.Session` per (base_url, proxies).
+
+    pool_connections:
+        number of per-host urllib3 pools to keep around
+    pool_maxsize:
+        maximum number of connections kept open per host
+    pool_block:
+        when True, wait for a free connection instead of opening more than
+        `pool_maxsize` connections to a host
+    keep_alive:
+        when False, ask the server to close connections after every request
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._stats = PoolStats()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url, proxies):
+        if proxies:
+            proxies = tuple(sorted(proxies.items()))
+        else:
+            proxies = None
+        return base_url, proxies
+
+    def _new_session(self, proxies):
+        session = requests.Session()
+        adapter = _PooledAdapter(
+            self._stats,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if proxies:
+            session.proxies.update(proxies)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def session(self, base_url, proxies=None):
+        """Return the shared session for `base_url` and `proxies`."""
+        key = self._key(base_url, proxies)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._new_session(proxies)
+        return session
+
+    def stats(self):
+        """Return a dict of pool statistics."""
+        output = self._stats.as_dict()
+        output['sessions'] = len(self._sessions)
+        return output
+
+    def close(self):
+        """Close every session (and its connections) held by this pool."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+def _import_httpx():
+    """Return the `httpx` module, None if it is not installed."""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx
+
+
+def _encode_params(params):
+    """
+    Return `params` as a list of (key, value) pairs, as `requests` sends them.
+
+    Lists are sent as repeated keys, None values are left out and other
+    values are sent as their `str()` (eg. `True`, not `true`).
+    """
+    output = []
+    for key, values in (params or {}).items():
+        if not isinstance(values, (list, tuple)):
+            values = (values,)
+        for value in values:
+            if value is None:
+                continue
+            if not isinstance(value, (str, bytes)):
+                value = str(value)
+            output.append((key, value))
+    return output
+
+
+def _httpx_timeout(httpx, timeout):
+    """Return the `httpx.Timeout` of a `requests` (connect, read) timeout."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    # like with `requests`, waiting for a free connection is not timed out
+    return httpx.Timeout(read, connect=connect, pool=None)
+
+
+def _requests_response(response):
+    """Return an `httpx.Response` as a `requests.Response`."""
+    output = requests.Response()
+    output.status_code = response.status_code
+    output.headers = CaseInsensitiveDict(response.headers.items())
+    output._content = response.content
+    output.encoding = response.encoding
+    output.reason = response.reason_phrase
+    output.url = str(response.url)
+    return output
+
+
+class AsyncPool(object):
+    """
+    Send the requests of asyncio callers.
+
+    With `httpx` installed, requests are sent natively: awaiting them holds
+    no thread, so thousands can be in flight at once. The requests of an
+    event loop share one `httpx.AsyncClient` per proxies, which keeps at most
+    `max_connections` connections open (`max_keepalive` of them idle) and
+    queues other requests until a connection is free.
+
+    Without `httpx` (or with `native=False`), and for operations that have
+    no native twin, calls are run on `max_concurrency` worker threads which
+    send requests over the sessions of the `ConnectionPool`, so at most that
+    many are in flight at once. `native=True` raises ImportError when
+    `httpx` is not installed.
+
+    `transport` is an `httpx` async transport the clients use instead of
+    opening connections (eg. an `httpx.MockTransport`).
+    """
+
+    def __init__(self, max_concurrency=10, max_connections=100,
+                 max_keepalive=20, native=None, transport=None):
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.transport = transport
+        if native is None:
+            native = _import_httpx() is not None
+        elif native and _import_httpx() is None:
+            raise ImportError('native requests need httpx, '
+                              'pip install pypd[httpx]')
+        self.native = native
+        self._executor = None
+        # {event loop: {proxies: httpx.AsyncClient}}
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency,
+                    )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` run on one of the pool workers."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            functools.partial(func, *args, **kwargs),
+        )
+
+    def _client(self, proxies=None):
+        """Return the `httpx.AsyncClient` of this event loop and `proxies`."""
+        loop = asyncio.get_event_loop()
+        key = ConnectionPool._key(None, proxies)[1]
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = self._new_client(proxies)
+        return client
+
+    def _new_client(self, proxies=None):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_keepalive)
+        mounts = None
+        if proxies and self.transport is None:
+            mounts = dict(
+                (scheme if '://' in scheme else scheme + '://',
+                 httpx.AsyncHTTPTransport(proxy=url, limits=limits))
+                for scheme, url in proxies.items()
+            )
+        return httpx.AsyncClient(limits=limits, mounts=mounts,
+                                 transport=self.transport)
+
+    async def request(self, method, url, headers=None, params=None,
+                      data=None, proxies=None, timeout=None):
+        """
+        Send a request natively, return its response.
+
+        Takes the arguments a `requests.Session` request does and returns a
+        `requests.Response`, connection errors and timeouts are raised as
+        the `requests` exceptions.
+        """
+        import httpx
+
+        client = self._client(proxies)
+        try:
+            response = await client.request(
+                method.upper(), url, headers=headers,
+                params=_encode_params(params), content=data,
+                timeout=_httpx_timeout(httpx, timeout),
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        return _requests_response(response)
+
+    async def aclose(self):
+        """Close the connections of the running event loop."""
+        with self._lock:
+            clients = self._clients.pop(asyncio.get_event_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+    def close(self):
+        """
+        Shut down the worker threads once pending calls are done.
+
+        The connections of event loops are left to be closed by `aclose()`.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._clients = weakref.WeakKeyDictionary()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_pool = None
+_async_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the package-wide connection pool, creating it if needed."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def set_pool(new_pool):
+    """
+    Set the package-wide connection pool.
+
+    The previous pool (if any) is closed.
+    """
+    global _pool
+    with _pool_lock:
+        old_pool, _pool = _pool, new_pool
+    if old_pool is not None and old_pool is not new_pool:
+        old_pool.close()
+    return new_pool
+
+
+def get_async_pool():
+    """Return the package-wide asyncio pool, creating it if needed."""
+    global _async_pool
+    if _async_pool is None:
+        with _pool_lock:
+            if _async_pool is None:
+                _async_pool = AsyncPool()
+    return _async_pool
+
+
+def set_async_pool(new_pool):
+    """
+    Set the package-wide asyncio pool.
+
+    The previous pool (if any) is closed.
+    """
+    global _async_pool
+    with _pool_lock:
+        old_pool, _async_pool = _async_pool, new_pool
+    if old_pool is not None and old_pool is not new_pool:
+        old_pool.close()
+    return new_pool
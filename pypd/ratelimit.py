@@ -0,0 +1,254 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Client-side pacing of requests to stay within PagerDuty's rate limits.
+
+PagerDuty limits how many requests an API key may do per minute, going over
+the limit results in `429 Too Many Requests` responses. Every request done by
+a `ClientMixin` first takes a token from a `TokenBucket` kept per (base_url,
+api_key) by the package-wide `RateLimiter`. Buckets are shared by all threads
+(so concurrent page fetches and asyncio calls share a single budget) and are
+tuned by the rate limit headers the API responds with. A 429 response pauses
+the bucket for the `Retry-After` duration before the request is sent again.
+
+The limiter used by the package can be swapped out or disabled, eg.
+
+    from pypd.ratelimit import RateLimiter, set_rate_limiter
+    set_rate_limiter(RateLimiter(rate=5, burst=10))
+    set_rate_limiter(None)  # do not pace requests at all
+"""
+import datetime
+import threading
+import time
+
+from .errors import DeadlineExceeded
+
+
+def _header(headers, *names):
+    """Return the first of `names` found in `headers` as a float, or None."""
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def retry_after(headers):
+    """
+    Return the number of seconds a `Retry-After` header asks to wait.
+
+    Handles both the delay-seconds and HTTP-date forms, returns None when
+    the header is missing or invalid.
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        # only needed for HTTP-dates, and slow to import
+        from email.utils import parsedate_to_datetime
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    now = datetime.datetime.now(date.tzinfo)
+    return max(0.0, (date - now).total_seconds())
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token bucket, refilled with `rate` tokens per second.
+
+    The bucket holds at most `capacity` tokens. Callers that find the bucket
+    empty reserve a token ahead of time and sleep until it is theirs, so
+    waiting callers are served in order.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        if now > self._updated:
+            refill = (now - self._updated) * self.rate
+            self._tokens = min(self.capacity, self._tokens + refill)
+            self._updated = now
+
+    @property
+    def tokens(self):
+        """Return the number of tokens available right now."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def reserve(self):
+        """Take a token, return how many seconds to wait before using it."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """Take a token, sleeping until it is available, return the wait."""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def release(self):
+        """Give back a token that was reserved but not used."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` seconds."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def update(self, remaining=None, reset=None):
+        """
+        Adjust the bucket to the server's view of the remaining budget.
+
+        `remaining` is the number of requests still allowed before the limit
+        resets in `reset` seconds. The rate is set so the remaining budget is
+        spread over the time left.
+        """
+        with self._lock:
+            self._refill()
+            if remaining is not None:
+                self._tokens = min(self._tokens, remaining)
+            if remaining is not None and reset:
+                self.rate = max(remaining, 1.0) / reset
+            if remaining is not None and remaining <= 0 and reset:
+                self._tokens = min(self._tokens, -reset * self.rate)
+
+
+class RateLimiter(object):
+    """
+    Keep a `TokenBucket` per (base_url, api_key) budget.
+
+    rate:
+        requests per second allowed until the API says otherwise
+    burst:
+        requests that may be done at once before pacing kicks in
+    max_retries:
+        how many times a request answered with a 429 is sent again
+    default_retry_after:
+        seconds to wait after a 429 that has no `Retry-After` header
+    """
+
+    # PagerDuty allows 960 requests per minute per API key: a full bucket
+    # plus a minute of refill must not go over it
+    DEFAULT_RATE = 15.0
+    DEFAULT_BURST = 60
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_retries=3,
+                 default_retry_after=1.0, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key):
+        """Return the bucket for `key`, creating it if needed."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            return bucket
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(
+                    self.rate, self.burst, clock=self._clock,
+                    sleep=self._sleep,
+                )
+        return bucket
+
+    def _reserve(self, key, deadline=None):
+        bucket = self.bucket(key)
+        wait = bucket.reserve()
+        if deadline is not None and wait > 0 and wait >= deadline.remaining():
+            bucket.release()
+            raise DeadlineExceeded(deadline.seconds)
+        return wait
+
+    def acquire(self, key, deadline=None):
+        """
+        Wait for the budget of `key` to allow a request, return the wait.
+
+        Raises `DeadlineExceeded` right away, without taking from the budget,
+        if it does not allow a request before `deadline` (a
+        `pypd.deadline.Deadline`, if not None).
+        """
+        wait = self._reserve(key, deadline)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def aacquire(self, key, deadline=None):
+        """Like `acquire`, sleeping on the running event loop."""
+        import asyncio
+
+        wait = self._reserve(key, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update(self, key, headers):
+        """Tune the bucket of `key` from a response's rate limit headers."""
+        remaining = _header(headers, 'ratelimit-remaining',
+                            'x-ratelimit-remaining')
+        reset = _header(headers, 'ratelimit-reset', 'x-ratelimit-reset')
+        if remaining is not None or reset is not None:
+            self.bucket(key).update(remaining=remaining, reset=reset)
+
+    def throttled(self, key, headers):
+        """
+        Pause the bucket of `key` after a 429 response.
+
+        Returns the number of seconds the bucket is paused for.
+        """
+        delay = retry_after(headers)
+        if delay is None:
+            delay = _header(headers, 'ratelimit-reset', 'x-ratelimit-reset')
+        if delay is None:
+            delay = self.default_retry_after
+        self.bucket(key).pause(delay)
+        return delay
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter():
+    """Return the package-wide rate limiter, None if disabled."""
+    return _rate_limiter
+
+
+def set_rate_limiter(new_rate_limiter):
+    """Set the package-wide rate limiter, None disables rate limiting."""
+    global _rate_limiter
+    _rate_limiter = new_rate_limiter
+    return new_rate_limiter
@@ -0,0 +1,157 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Retrying of requests that failed because of transient errors.
+
+A `RetryPolicy` decides whether a failed request (a 502/503/504 response, a
+connection error or a timeout) is sent again and how long to sleep before
+doing so. Only idempotent requests are retried: by default GET, HEAD and
+OPTIONS requests, or any request done with `request(..., idempotent=True)`
+such as `EventV2.create` with a `dedup_key`. Sleeps grow exponentially, are
+capped and jittered, and all attempts together must fit within `deadline`
+seconds.
+
+The policy used by the package can be swapped out or disabled, eg.
+
+    from pypd.retry import RetryPolicy, set_retry_policy
+    set_retry_policy(RetryPolicy(max_attempts=5, deadline=60))
+    set_retry_policy(None)  # never retry
+
+`get_retry_policy().stats()` reports how many retries were done and how much
+time was spent sleeping before them.
+"""
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+
+
+# errors raised by requests which may be retried
+RETRYABLE_ERRORS = (ConnectionError, Timeout,)
+
+
+class RetryPolicy(object):
+    """
+    Capped exponential backoff with jitter for idempotent requests.
+
+    max_attempts:
+        number of times a request is sent, including the first time
+    backoff:
+        sleep before the first retry, doubled for every following retry
+    max_backoff:
+        longest sleep between two attempts
+    jitter:
+        when True sleep a random duration between 0 and the backoff so that
+        concurrent clients do not retry in lockstep
+    deadline:
+        seconds all attempts of a request must fit in, None for no limit
+    statuses:
+        response status codes that are retried
+    idempotent_methods:
+        HTTP methods that are retried unless told otherwise
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=10.0,
+                 jitter=True, deadline=30.0, statuses=(502, 503, 504,),
+                 idempotent_methods=('GET', 'HEAD', 'OPTIONS',),
+                 clock=time.monotonic, sleep=time.sleep, rand=random.random):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.statuses = frozenset(statuses)
+        self.idempotent_methods = frozenset(m.upper()
+                                            for m in idempotent_methods)
+        self.clock = clock
+        self._sleep = sleep
+        self._rand = rand
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._sleep_time = 0.0
+
+    def is_idempotent(self, method, idempotent=None):
+        """Return whether a `method` request may safely be sent again."""
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.idempotent_methods
+
+    def backoff_for(self, attempt):
+        """Return the sleep before retry number `attempt` (1-based)."""
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay *= self._rand()
+        return delay
+
+    def delay(self, method, attempt, started, status=None, error=None,
+              idempotent=None):
+        """
+        Return the seconds to sleep before sending a request again.
+
+        `attempt` is the number of times the request was sent so far and
+        `started` the `clock()` time of the first attempt. Pass the response
+        `status` or the `error` raised. Returns None when the request should
+        not be retried.
+        """
+        if not self.is_idempotent(method, idempotent):
+            return None
+        if attempt >= self.max_attempts:
+            return None
+        if error is None and status not in self.statuses:
+            return None
+        if error is not None and not isinstance(error, RETRYABLE_ERRORS):
+            return None
+
+        delay = self.backoff_for(attempt)
+        if self.deadline is not None:
+            if self.clock() + delay - started > self.deadline:
+                return None
+        return delay
+
+    def _count(self, delay):
+        with self._lock:
+            self._retries += 1
+            self._sleep_time += delay
+
+    def sleep(self, delay):
+        """Sleep `delay` seconds before a retry and count it."""
+        self._count(delay)
+        if delay > 0:
+            self._sleep(delay)
+
+    async def asleep(self, delay):
+        """Like `sleep`, sleeping on the running event loop."""
+        import asyncio
+
+        self._count(delay)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """Return a dict with the number of retries and seconds slept."""
+        with self._lock:
+            return {
+                'retries': self._retries,
+                'sleep_time': self._sleep_time,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._retries = 0
+            self._sleep_time = 0.0
+
+
+_retry_policy = RetryPolicy()
+
+
+def get_retry_policy():
+    """Return the package-wide retry policy, None if disabled."""
+    return _retry_policy
+
+
+def set_retry_policy(new_retry_policy):
+    """Set the package-wide retry policy, None disables retries."""
+    global _retry_policy
+    _retry_policy = new_retry_policy
+    return new_retry_policy
@@ -0,0 +1,141 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+"""
+Coalescing of identical GET requests that are in flight at the same time.
+
+When several threads (or coroutines) GET the same URL with the same params
+and API key at once, only the first one sends a request, the others wait for
+it and get a copy of its response (or its exception). Eg. a burst of alerts
+handled by worker threads that all `Service.fetch()` the same service does a
+single request.
+
+It is enabled by default and can be swapped out or disabled, eg.
+
+    from pypd.singleflight import get_single_flight, set_single_flight
+    get_single_flight().stats()  # {'coalesced': 12}
+    set_single_flight(None)      # send every request
+"""
+import copy
+import threading
+import weakref
+
+from .errors import DeadlineExceeded
+
+
+class _Call(object):
+    """A call in flight, and what it resulted in once done."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Run a function once for every key at a time, sharing its result.
+
+    Callers that wait on a call of another get a deep copy of its result, so
+    that none of them can modify what the others got.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # {event loop: {key: [task, followers]}}
+        self._tasks = weakref.WeakKeyDictionary()
+        self.coalesced = 0
+
+    def do(self, key, func, *args, deadline=None, **kwargs):
+        """
+        Return `func(*args, **kwargs)`, shared by calls of `key` at once.
+
+        A call waiting on another one raises `DeadlineExceeded` once its own
+        `deadline` (a `pypd.deadline.Deadline`, if not None) has passed,
+        whatever the deadline of the call it waits on.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            timeout = deadline.remaining() if deadline is not None else None
+            if not call.done.wait(timeout):
+                raise DeadlineExceeded(deadline.seconds)
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        if call.followers:
+            return copy.deepcopy(call.result)
+        return call.result
+
+    async def ado(self, key, func, *args, deadline=None, **kwargs):
+        """
+        Await `func(*args, **kwargs)`, shared by calls of `key` at once.
+
+        Calls waiting on another one give up at their `deadline` like with
+        `do()`.
+        """
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            tasks = self._tasks.setdefault(loop, {})
+            flight = tasks.get(key)
+            leader = flight is None
+            if leader:
+                flight = tasks[key] = [
+                    asyncio.ensure_future(func(*args, **kwargs)), 0]
+                flight[0].add_done_callback(lambda task: tasks.pop(key, None))
+            else:
+                flight[1] += 1
+                self.coalesced += 1
+
+        # one of the callers being cancelled does not cancel the others
+        waiter = asyncio.shield(flight[0])
+        if leader or deadline is None:
+            result = await waiter
+        else:
+            try:
+                result = await asyncio.wait_for(waiter, deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(deadline.seconds)
+        if flight[1]:
+            return copy.deepcopy(result)
+        return result
+
+    def stats(self):
+        """Return the number of calls that waited on another one."""
+        return {'coalesced': self.coalesced}
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """Return the package-wide single flight, None if disabled."""
+    return _single_flight
+
+
+def set_single_flight(new_single_flight):
+    """Set the package-wide single flight, None disables coalescing."""
+    global _single_flight
+    _single_flight = new_single_flight
+    return new_single_flight
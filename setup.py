@@ -19,13 +19,25 @@ options = {
     'download_url': 'https://github.com/PagerDuty/pagerduty-api-python-client/archive/master.tar.gz',
     'classifiers': [
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Software Development',
         'Topic :: Software Development :: Libraries',
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
+    'python_requires': '>=3.6',
     'install_requires': ['requests', 'six'],
+    'extras_require': {
+        'httpx': ['httpx>=0.26'],
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+    },
     'tests_require': [],
     'cmdclass': {}
 }
@@ -0,0 +1,244 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Process
+
+import mock
+import requests_mock
+
+from pypd import Incident, Service, cache
+
+from .clock import FakeClock
+
+
+class MemoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = cache.MemoryCache(maxsize=2, clock=self.clock)
+
+    def test_expiry(self):
+        self.cache.set('a', {'id': 'a'}, 10)
+        self.assertEqual(self.cache.get('a'), {'id': 'a'})
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats(), {
+            'hits': 1, 'misses': 1, 'evictions': 0, 'revalidations': 0,
+            'size': 0,
+        })
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', 1, 10)
+        self.cache.set('b', 2, 10)
+        self.cache.get('a')
+        self.cache.set('c', 3, 10)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_values_are_copied(self):
+        value = {'teams': []}
+        self.cache.set('a', value, 10)
+        value['teams'].append('PTEAM')
+        self.cache.get('a')['teams'].append('PTEAM')
+        self.assertEqual(self.cache.get('a'), {'teams': []})
+
+    def test_invalidate_resource(self):
+        self.cache.maxsize = 10
+        for endpoint in ('services/P1', 'services/P1/integrations/P2',
+                         'users/P3'):
+            key = cache.cache_key('url', 'key', endpoint, {})
+            self.cache.set(key, {}, 10)
+        self.cache.invalidate('services')
+        self.assertEqual(self.cache.stats()['size'], 1)
+
+    def test_cache_key_ignores_param_order(self):
+        self.assertEqual(
+            cache.cache_key('url', 'key', 'users', {'a': 1, 'b[]': ['x']}),
+            cache.cache_key('url', 'key', 'users', {'b[]': ['x'], 'a': 1}),
+        )
+
+
+def fill(path, n):
+    """Set entries from another process."""
+    sqlite_cache = cache.SQLiteCache(path)
+    for i in range(n):
+        key = cache.cache_key('url', 'key', 'users/P%s' % i, {})
+        sqlite_cache.set(key, {'user': {'id': 'P%s' % i}}, 60)
+
+
+class SQLiteCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+        self.clock = FakeClock()
+        self.cache = cache.SQLiteCache(self.path, maxsize=2,
+                                       clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def key(self, endpoint):
+        return cache.cache_key('url', 'key', endpoint, {})
+
+    def test_survives_reopening(self):
+        self.cache.set(self.key('users/P1'), {'user': {'id': 'P1'}}, 10)
+        self.cache.close()
+
+        reopened = cache.SQLiteCache(self.path, clock=self.clock)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get(self.key('users/P1')),
+                         {'user': {'id': 'P1'}})
+        self.clock.now = 10
+        self.assertIsNone(reopened.get(self.key('users/P1')))
+        self.assertEqual(reopened.stats()['size'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set(self.key('users/P1'), 1, 10)
+        self.clock.now = 1
+        self.cache.set(self.key('users/P2'), 2, 10)
+        self.clock.now = 2
+        self.cache.get(self.key('users/P1'))
+        self.clock.now = 3
+        self.cache.set(self.key('users/P3'), 3, 10)
+        self.assertEqual(self.cache.get(self.key('users/P1')), 1)
+        self.assertIsNone(self.cache.get(self.key('users/P2')))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_max_bytes_and_compression(self):
+        compressed = cache.SQLiteCache(self.path, max_bytes=200,
+                                       compress=True, clock=self.clock)
+        self.addCleanup(compressed.close)
+        value = {'users': ['P%s' % (i % 3) for i in range(100)]}
+        for i in range(5):
+            compressed.set(self.key('users/P%s' % i), value, 10)
+        stats = compressed.stats()
+        self.assertTrue(0 < stats['bytes'] <= 200)
+        self.assertEqual(compressed.get(self.key('users/P4')), value)
+
+    def test_expired_entries_with_validators_are_kept(self):
+        key = self.key('users/P1')
+        self.cache.set(key, 1, 10, validators={'ETag': '"v1"'})
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.lookup(key), (1, {'ETag': '"v1"'}, False))
+        self.cache.touch(key, 10)
+        self.assertEqual(self.cache.get(key), 1)
+        self.assertEqual(self.cache.stats()['revalidations'], 1)
+
+    def test_invalidate_and_clear(self):
+        self.cache.set(self.key('users/P1'), 1, 10)
+        self.cache.set(self.key('services/P2'), 2, 10)
+        self.cache.invalidate('users/P1/contact_methods')
+        self.assertIsNone(self.cache.get(self.key('users/P1')))
+        self.assertEqual(self.cache.get(self.key('services/P2')), 2)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_shared_by_processes(self):
+        self.cache.maxsize = 100
+        processes = [Process(target=fill, args=(self.path, 20))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.cache.stats()['size'], 20)
+
+    def test_api_keys_are_not_stored(self):
+        key = cache.cache_key('url', 'FAUX_API_KEY', 'users/P1', {})
+        self.cache.set(key, 1, 10)
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                self.assertNotIn(b'FAUX_API_KEY', f.read())
+
+
+@requests_mock.Mocker()
+class CachedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api_key = 'FAUX_API_KEY'
+        self.url = 'https://api.pagerduty.com/services/PSERVIC'
+        self.cache = cache.set_cache(cache.MemoryCache())
+
+    def tearDown(self):
+        cache.set_cache(None)
+
+    def test_fetch_is_cached(self, m):
+        m.register_uri('GET', self.url, json={'service': {'id': 'PSERVIC'}})
+        first = Service.fetch('PSERVIC', api_key=self.api_key)
+        second = Service.fetch('PSERVIC', api_key=self.api_key)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(first['id'], second['id'])
+
+        # other API keys and query params are cached on their own
+        Service.fetch('PSERVIC', api_key='OTHER_API_KEY')
+        Service.fetch('PSERVIC', api_key=self.api_key, include=['teams'])
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_write_invalidates(self, m):
+        m.register_uri('GET', self.url, json={'service': {'id': 'PSERVIC'}})
+        m.register_uri('PUT', self.url, json={'service': {'id': 'PSERVIC'}})
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        Service.put('PSERVIC', api_key=self.api_key)
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        self.assertEqual(m.call_count, 3)
+
+    def test_uncached_model(self, m):
+        url = 'https://api.pagerduty.com/incidents/PINCIDE'
+        m.register_uri('GET', url, json={'incident': {'id': 'PINCIDE'}})
+        Incident.fetch('PINCIDE', api_key=self.api_key)
+        Incident.fetch('PINCIDE', api_key=self.api_key)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_expired_response_is_revalidated(self, m):
+        clock = FakeClock()
+        self.cache = cache.set_cache(cache.MemoryCache(clock=clock))
+        m.register_uri('GET', self.url, [
+            {'json': {'service': {'id': 'PSERVIC', 'name': 'API'}},
+             'headers': {'ETag': '"v1"'}},
+            {'status_code': 304},
+        ])
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        clock.now = Service.CACHE_TTL
+
+        with mock.patch.object(Service, 'codec') as codec:
+            service = Service.fetch('PSERVIC', api_key=self.api_key)
+        # the cached response is reused as it is
+        self.assertEqual(codec.loads.call_count, 0)
+        self.assertEqual(service['name'], 'API')
+        self.assertEqual(m.last_request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.cache.stats()['revalidations'], 1)
+
+        # and is fresh again
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        self.assertEqual(m.call_count, 2)
+
+    def test_expired_response_without_validators(self, m):
+        clock = FakeClock()
+        self.cache = cache.set_cache(cache.MemoryCache(clock=clock))
+        m.register_uri('GET', self.url, json={'service': {'id': 'PSERVIC'}})
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        clock.now = Service.CACHE_TTL
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        self.assertNotIn('If-None-Match', m.last_request.headers)
+        self.assertEqual(m.call_count, 2)
+
+    def test_disabled_by_default(self, m):
+        cache.set_cache(None)
+        m.register_uri('GET', self.url, json={'service': {'id': 'PSERVIC'}})
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        Service.fetch('PSERVIC', api_key=self.api_key)
+        self.assertEqual(m.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests_mock
+
+import pypd
+from pypd import Client, Incident, Service, cache
+from pypd.client import default_client
+
+
+@requests_mock.Mocker()
+class ClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.acme = Client(api_key='ACME_API_KEY')
+        self.initech = Client(api_key='INITECH_API_KEY',
+                              base_url='https://initech.example.com')
+        self.addCleanup(self.acme.close)
+        self.addCleanup(self.initech.close)
+
+    def test_clients_are_isolated(self, m):
+        m.register_uri('GET', 'https://api.pagerduty.com/services/P1',
+                       json={'service': {'id': 'P1'}})
+        m.register_uri('GET', 'https://initech.example.com/services/P1',
+                       json={'service': {'id': 'P1'}})
+
+        acme = self.acme.Service.fetch('P1')
+        initech = self.initech.Service.fetch('P1')
+        self.assertEqual(acme.api_key, 'ACME_API_KEY')
+        self.assertEqual(initech.api_key, 'INITECH_API_KEY')
+        self.assertEqual(m.request_history[0].headers['Authorization'],
+                         'Token token=ACME_API_KEY')
+        self.assertEqual(m.request_history[1].headers['Authorization'],
+                         'Token token=INITECH_API_KEY')
+
+        self.assertIsNot(self.acme.pool, self.initech.pool)
+        self.assertIsNot(self.acme.rate_limiter, self.initech.rate_limiter)
+        self.assertEqual(self.acme.pool.stats()['sessions'], 1)
+
+    def test_bound_models(self, m):
+        bound = self.acme.Incident
+        self.assertIs(bound, self.acme.Incident)
+        self.assertTrue(issubclass(bound, Incident))
+        self.assertEqual(bound.__name__, 'Incident')
+        self.assertIs(bound.client, self.acme)
+        self.assertIsNot(self.initech.Incident, bound)
+        # as are the models they create
+        self.assertIs(bound.logEntryFactory.client, self.acme)
+        self.assertIs(self.acme.Team.escalationPolicyFactory.serviceFactory,
+                      self.acme.Service)
+        # models used on their own are not
+        self.assertIsNone(Incident.client)
+        self.assertIs(Incident.get_client(), default_client)
+
+    def test_found_entities_are_bound(self, m):
+        m.register_uri('GET', 'https://api.pagerduty.com/incidents',
+                       json={'incidents': [{'id': 'P1'}], 'more': False})
+        m.register_uri('GET', 'https://api.pagerduty.com/incidents/P1/notes',
+                       json={'notes': []})
+        incident, = self.acme.Incident.find()
+        self.assertIsInstance(incident, self.acme.Incident)
+        incident.notes()
+        self.assertEqual(m.last_request.headers['Authorization'],
+                         'Token token=ACME_API_KEY')
+
+    def test_cache(self, m):
+        m.register_uri('GET', 'https://api.pagerduty.com/services/P1',
+                       json={'service': {'id': 'P1'}})
+        cached = Client(api_key='ACME_API_KEY', cache=cache.MemoryCache())
+        self.addCleanup(cached.close)
+        cached.Service.fetch('P1')
+        cached.Service.fetch('P1')
+        self.acme.Service.fetch('P1')
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(cached.cache.stats()['hits'], 1)
+
+    def test_abilities(self, m):
+        m.register_uri('GET', 'https://api.pagerduty.com/abilities',
+                       json={'abilities': ['sso']})
+        self.assertEqual(self.acme.abilities(), ['sso'])
+        self.assertEqual(m.last_request.headers['Authorization'],
+                         'Token token=ACME_API_KEY')
+
+    def test_unknown_attribute(self, m):
+        with self.assertRaises(AttributeError):
+            self.acme.Client
+        with self.assertRaises(AttributeError):
+            self.acme.entity
+
+
+class DefaultClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api_key = pypd.api_key
+        self.addCleanup(setattr, pypd, 'api_key', self.api_key)
+
+    def test_reads_globals(self):
+        pypd.api_key = 'FAUX_API_KEY'
+        self.assertEqual(default_client.api_key, 'FAUX_API_KEY')
+        self.assertEqual(Service().api_key, 'FAUX_API_KEY')
+        self.assertIs(default_client.Service, Service)
+
+        previous = cache.get_cache()
+        self.addCleanup(cache.set_cache, previous)
+        memory = cache.set_cache(cache.MemoryCache())
+        self.assertIs(default_client.cache, memory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,17 @@
 # Copyright (c) PagerDuty.
 # See LICENSE for details.
+import asyncio
+import datetime
+import json
 import unittest
 
+import requests
 import requests_mock
 from requests import HTTPError
 
-from pypd.mixins import ClientMixin
+from pypd.mixins import (ClientMixin, AsyncClientMixin, base_headers,
+                         encode_query_params)
+from pypd.models.entity import Entity
 from pypd.errors import (BadRequest, UnknownError, InvalidResponse,
                          InvalidHeaders)
 
@@ -93,5 +99,104 @@ class ClientMixinTestCase(unittest.TestCase):
                                                                    'acknowledged']})
         self.assertEqual(body, result)
 
+    def test_add_headers(self, m):
+        method = 'GET'
+        m.register_uri(method, self.url, request_headers={'From': 'a@b.c'})
+        self.requester.request(method, self.endpoint,
+                               add_headers={'From': 'a@b.c'})
+        # the shared base headers are left untouched
+        self.assertNotIn('From', base_headers(self.requester.api_key))
+
+    def test_base_headers_built_once_per_api_key(self, m):
+        headers = base_headers('FAUX_API_KEY')
+        self.assertIs(headers, base_headers('FAUX_API_KEY'))
+        self.assertEqual(headers['Authorization'], 'Token token=FAUX_API_KEY')
+        self.assertIsNot(headers, base_headers('OTHER_API_KEY'))
+
+
+class EncodeQueryParamsTestCase(unittest.TestCase):
+
+    def test_scalars(self):
+        params = {'query': 'joe', 'limit': 25, 'total': True, 'none': None}
+        self.assertEqual(encode_query_params(params), params)
+
+    def test_datetime(self):
+        since = datetime.datetime(2018, 3, 26, 12, 30)
+        self.assertEqual(encode_query_params({'since': since}),
+                         {'since': '2018-03-26T12:30:00'})
+
+    def test_entities(self):
+        entities = [Entity(_data={'id': 'P1'}), Entity(_data={'id': 'P2'})]
+        self.assertEqual(encode_query_params({'service': entities[0]}),
+                         {'service': 'P1'})
+        self.assertEqual(encode_query_params({'service_ids': entities}),
+                         {'service_ids[]': ['P1', 'P2']})
+
+    def test_iterables(self):
+        expected = {'statuses[]': ['triggered', 'acknowledged']}
+        for value in (['triggered', 'acknowledged'],
+                      ('triggered', 'acknowledged'),
+                      iter(['triggered', 'acknowledged'])):
+            self.assertEqual(encode_query_params({'statuses': value}),
+                             expected)
+        self.assertEqual(
+            encode_query_params({'statuses[]': ['triggered',
+                                                'acknowledged']}),
+            expected)
+
+    def test_params_are_not_modified(self):
+        params = {'statuses': ['triggered']}
+        encode_query_params(params)
+        self.assertEqual(params, {'statuses': ['triggered']})
+
+
+
+def mocked_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    return response
+
+
+class InjectedResponseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        sent = self.sent
+
+        class Requester(AsyncClientMixin):
+            def _http_request(self, method, url, **kwargs):
+                sent.append((method, url, kwargs['params']))
+                return mocked_response(200, {'status': 'OK'})
+
+            async def _ahttp_request(self, method, url, **kwargs):
+                sent.append((method, url, kwargs['params']))
+                return mocked_response(200, {'status': 'async'})
+
+        self.requester = Requester(api_key='FAUX_API_KEY',
+                                   base_url='https://api.pagerduty.com')
+
+    def test_http_request(self):
+        result = self.requester.request('GET', 'mock',
+                                        query_params={'limit': 1})
+        self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(self.sent, [
+            ('get', 'https://api.pagerduty.com/mock', {'limit': 1})])
+
+    def test_ahttp_request(self):
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(self.requester.arequest(
+                'PUT', 'mock', data={'a': 1}))
+        finally:
+            loop.close()
+        if self.requester.get_client().async_pool.native:
+            self.assertEqual(result, {'status': 'async'})
+        else:
+            self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(self.sent, [
+            ('put', 'https://api.pagerduty.com/mock', {})])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,17 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+
+
+class FakeClock(object):
+    """A clock that only moves when set or slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
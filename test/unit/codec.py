@@ -0,0 +1,66 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests_mock
+
+from pypd import codec
+from pypd.mixins import ClientMixin
+
+
+class RecordingCodec(codec.JSONCodec):
+    """Remember what was decoded and encoded."""
+
+    def __init__(self):
+        self.loaded = []
+        self.dumped = []
+
+    def loads(self, data):
+        self.loaded.append(data)
+        return codec.JSONCodec.loads(self, data)
+
+    def dumps(self, obj):
+        self.dumped.append(obj)
+        return codec.JSONCodec.dumps(self, obj)
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_codec = codec.get_codec()
+
+    def tearDown(self):
+        codec.set_codec(self.previous_codec)
+
+    def test_available_codecs_round_trip(self):
+        data = {'incident': {'id': 'PT4KHLK', 'title': u'caf\xe9 down'}}
+        for name in codec.available():
+            instance = codec.create(name)
+            encoded = instance.dumps(data)
+            self.assertTrue(isinstance(encoded, bytes))
+            self.assertEqual(instance.loads(encoded), data)
+
+    def test_set_codec_by_name(self):
+        self.assertEqual(codec.set_codec('json').name, 'json')
+        self.assertEqual(codec.set_codec('auto').name, codec.available()[0])
+        self.assertRaises(ValueError, codec.set_codec, 'yaml')
+
+    @requests_mock.Mocker()
+    def test_client_codec(self, m):
+        url = 'https://api.pagerduty.com/mock'
+        m.register_uri('POST', url, json={'status': 'OK'})
+
+        client = ClientMixin(api_key='FAUX_API_KEY',
+                             base_url='https://api.pagerduty.com')
+        client.codec = RecordingCodec()
+        result = client.request('POST', 'mock', data={'a': 1})
+
+        self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(client.codec.dumped, [{'a': 1}])
+        # responses are decoded straight from bytes
+        self.assertEqual(client.codec.loaded, [b'{"status": "OK"}'])
+        self.assertEqual(m.last_request.body, b'{"a": 1}')
+
+
+if __name__ == '__main__':
+    unittest.main()
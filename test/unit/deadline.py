@@ -0,0 +1,150 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests
+import requests_mock
+
+from pypd import retry
+from pypd.deadline import Deadline
+from pypd.errors import DeadlineExceeded, UnknownError
+from pypd.mixins import ClientMixin
+from pypd.models.entity import Entity
+
+from .clock import FakeClock
+
+
+class DeadlineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.deadline = Deadline(10, clock=self.clock)
+
+    def test_remaining(self):
+        self.clock.now = 4
+        self.assertEqual(self.deadline.remaining(), 6)
+        self.deadline.check()
+        self.clock.now = 11
+        self.assertEqual(self.deadline.remaining(), 0)
+        self.assertTrue(self.deadline.expired)
+        self.assertRaises(DeadlineExceeded, self.deadline.check)
+
+    def test_timeout_is_capped(self):
+        self.clock.now = 8
+        self.assertEqual(self.deadline.timeout(None), 2)
+        self.assertEqual(self.deadline.timeout(1), 1)
+        self.assertEqual(self.deadline.timeout((5, 30)), (2, 2))
+        self.assertEqual(self.deadline.timeout((1, None)), (1, 2))
+
+    def test_coerce(self):
+        self.assertIsNone(Deadline.coerce(None))
+        self.assertIs(Deadline.coerce(self.deadline), self.deadline)
+        self.assertEqual(Deadline.coerce(5).seconds, 5)
+
+
+@requests_mock.Mocker()
+class RequestTimeoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.base_url = 'https://api.pagerduty.com'
+        self.url = self.base_url + '/entities'
+        self.client = ClientMixin(api_key='FAUX_API_KEY',
+                                  base_url=self.base_url)
+        self.clock = FakeClock()
+
+        previous_retry_policy = retry.get_retry_policy()
+        retry.set_retry_policy(retry.RetryPolicy(jitter=False,
+                                                 sleep=lambda s: None))
+        self.addCleanup(retry.set_retry_policy, previous_retry_policy)
+
+        class TestEntity(Entity):
+            endpoint = 'entities'
+
+        self.cls = TestEntity
+
+    def test_default_timeout(self, m):
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'entities')
+        self.assertEqual(m.last_request.timeout, (5.0, 30.0))
+
+        self.client.timeout = 1
+        self.client.request('GET', 'entities')
+        self.assertEqual(m.last_request.timeout, 1)
+
+    def test_timeout_capped_by_deadline(self, m):
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'entities',
+                            deadline=Deadline(2, clock=self.clock))
+        self.assertEqual(m.last_request.timeout, (2, 2))
+
+    def test_expired_deadline(self, m):
+        m.register_uri('GET', self.url, json={})
+        deadline = Deadline(2, clock=self.clock)
+        self.clock.now = 2
+        self.assertRaises(DeadlineExceeded, self.client.request, 'GET',
+                          'entities', deadline=deadline)
+        self.assertEqual(m.call_count, 0)
+
+    def test_timed_out_at_deadline(self, m):
+        deadline = Deadline(2, clock=self.clock)
+
+        def time_out(request, context):
+            self.clock.now = 2
+            raise requests.exceptions.ReadTimeout()
+
+        m.register_uri('GET', self.url, text=time_out)
+        self.assertRaises(DeadlineExceeded, self.client.request, 'GET',
+                          'entities', deadline=deadline)
+        self.assertEqual(m.call_count, 1)
+
+    def test_no_retry_past_deadline(self, m):
+        m.register_uri('GET', self.url, [{'status_code': 503}, {'json': {}}])
+        # the first retry waits 0.5 seconds
+        self.assertRaises(UnknownError, self.client.request, 'GET',
+                          'entities', deadline=Deadline(0.4, clock=self.clock))
+        self.assertEqual(m.call_count, 1)
+
+    def pages(self, m):
+        """Register two pages, the deadline passes while fetching the first."""
+        def first_page(request, context):
+            self.clock.now = 5
+            return {'entities': [{'id': 'id1'}], 'more': True, 'limit': 1,
+                    'offset': 0}
+
+        m.register_uri('GET', self.url + '?offset=0&limit=1', json=first_page,
+                       complete_qs=True)
+        m.register_uri('GET', self.url + '?offset=1&limit=1',
+                       json={'entities': [{'id': 'id2'}], 'more': False},
+                       complete_qs=True)
+        return Deadline(5, clock=self.clock)
+
+    def test_find_raises(self, m):
+        deadline = self.pages(m)
+        self.assertRaises(DeadlineExceeded, self.cls.find, limit=1,
+                          api_key='FAUX_API_KEY', deadline=deadline)
+        self.assertEqual(m.call_count, 1)
+
+    def test_iter_find_stops(self, m):
+        deadline = self.pages(m)
+        entities = list(self.cls.iter_find(limit=1, api_key='FAUX_API_KEY',
+                                           deadline=deadline))
+        self.assertEqual([e['id'] for e in entities], ['id1'])
+
+    def test_fetch_many_shares_deadline(self, m):
+        deadline = Deadline(5, clock=self.clock)
+
+        def fetch(request, context):
+            self.clock.now = 5
+            return {'entity': {'id': 'id1'}}
+
+        m.register_uri('GET', self.url + '/id1', json=fetch)
+        m.register_uri('GET', self.url + '/id2', json={'entity': {}})
+        entities = self.cls.fetch_many(['id1', 'id2'], concurrency=1,
+                                       api_key='FAUX_API_KEY',
+                                       deadline=deadline)
+        self.assertEqual([e['id'] for e in entities], ['id1'])
+        self.assertTrue(isinstance(entities.errors['id2'], DeadlineExceeded))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import logging
+import unittest
+
+import mock
+import requests_mock
+
+from pypd import hooks, retry
+from pypd.log import logger
+from pypd.mixins import ClientMixin
+
+
+class EndpointTemplateTestCase(unittest.TestCase):
+
+    def test_ids_are_replaced(self):
+        cases = [
+            ('incidents', 'incidents'),
+            ('incidents/PT4KHLK', 'incidents/{id}'),
+            ('incidents/PT4KHLK/log_entries', 'incidents/{id}/log_entries'),
+            ('users/PXPGF42/contact_methods/PXPGF43',
+             'users/{id}/contact_methods/{id}'),
+            ('', ''),
+        ]
+        for endpoint, expected in cases:
+            self.assertEqual(hooks.endpoint_template(endpoint), expected)
+
+
+@requests_mock.Mocker()
+class RequestHooksTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/incidents/PT4KHLK'
+        self.client = ClientMixin(api_key='FAUX_API_KEY',
+                                  base_url='https://api.pagerduty.com')
+        self.calls = []
+
+    def tearDown(self):
+        hooks.clear()
+
+    def record(self, event):
+        def hook(**info):
+            self.calls.append((event, info))
+        hooks.register(event, hook)
+        return hook
+
+    def test_unknown_event(self, m):
+        self.assertRaises(ValueError, hooks.register, 'on_nothing', id)
+
+    def test_request_start_and_end(self, m):
+        m.register_uri('PUT', self.url, json={'status': 'OK'})
+        self.record('on_request_start')
+        self.record('on_request_end')
+        self.client.request('PUT', 'incidents/PT4KHLK', data={'a': 1})
+
+        (start, start_info), (end, end_info) = self.calls
+        self.assertEqual(start, 'on_request_start')
+        self.assertEqual(start_info['endpoint'], 'incidents/{id}')
+        self.assertEqual(start_info['method'], 'put')
+        self.assertEqual(start_info['bytes_out'], len(b'{"a": 1}'))
+
+        self.assertEqual(end, 'on_request_end')
+        self.assertEqual(end_info['status'], 200)
+        self.assertEqual(end_info['bytes_in'], len(b'{"status": "OK"}'))
+        self.assertTrue(end_info['elapsed'] >= 0)
+        self.assertIsNone(end_info['error'])
+
+    def test_unregister(self, m):
+        m.register_uri('GET', self.url, json={})
+        hook = self.record('on_request_end')
+        hooks.unregister('on_request_end', hook)
+        self.client.request('GET', 'incidents/PT4KHLK')
+        self.assertEqual(self.calls, [])
+
+    def test_retry(self, m):
+        previous_retry_policy = retry.get_retry_policy()
+        retry.set_retry_policy(retry.RetryPolicy(sleep=lambda s: None))
+        self.addCleanup(retry.set_retry_policy, previous_retry_policy)
+
+        m.register_uri('GET', self.url, [{'status_code': 503}, {'json': {}}])
+        self.record('on_retry')
+        self.client.request('GET', 'incidents/PT4KHLK')
+
+        (event, info), = self.calls
+        self.assertEqual(info['attempt'], 1)
+        self.assertEqual(info['status'], 503)
+        self.assertEqual(info['endpoint'], 'incidents/{id}')
+
+    def test_failing_hook_is_ignored(self, m):
+        m.register_uri('GET', self.url, json={'status': 'OK'})
+
+        def fail(**info):
+            raise RuntimeError()
+
+        hooks.register('on_request_start', fail)
+        with mock.patch('pypd.hooks.error') as error:
+            result = self.client.request('GET', 'incidents/PT4KHLK')
+        self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(error.call_count, 1)
+
+    def test_no_debug_formatting_unless_enabled(self, m):
+        m.register_uri('GET', self.url, json={})
+        level = logger.level
+        self.addCleanup(logger.setLevel, level)
+
+        with mock.patch('pypd.mixins.debug') as debug:
+            logger.setLevel(logging.INFO)
+            self.client.request('GET', 'incidents/PT4KHLK')
+            self.assertEqual(debug.call_count, 0)
+
+            logger.setLevel(logging.DEBUG)
+            self.client.request('GET', 'incidents/PT4KHLK')
+            self.assertEqual(debug.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
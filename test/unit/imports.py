@@ -0,0 +1,48 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import os.path
+import subprocess
+import sys
+import unittest
+
+import pypd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+def imported_modules(statement):
+    """Return the modules imported by `statement` in a new interpreter."""
+    output = subprocess.check_output(
+        [sys.executable, '-c',
+         '%s\nimport sys\nprint(" ".join(sys.modules))' % statement],
+        cwd=ROOT or None,
+    )
+    return set(output.decode('utf-8').split())
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'models are imported up front')
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_import_loads_no_model(self):
+        modules = imported_modules('import pypd')
+        self.assertNotIn('pypd.models.entity', modules)
+        self.assertNotIn('requests', modules)
+
+    def test_model_loads_only_its_module(self):
+        modules = imported_modules('import pypd\npypd.EventV2')
+        self.assertIn('pypd.models.event', modules)
+        self.assertNotIn('pypd.models.incident', modules)
+        # the HTTP stack is imported by the first request
+        self.assertNotIn('requests', modules)
+        # and asyncio by the first awaited call
+        self.assertNotIn('asyncio', modules)
+
+    def test_attributes(self):
+        from pypd.models.incident import Incident
+        self.assertIs(pypd.Incident, Incident)
+        self.assertIn('Incident', dir(pypd))
+        self.assertRaises(AttributeError, getattr, pypd, 'Nothing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+from urllib.request import urlopen
+
+import requests_mock
+
+from pypd import hooks, metrics, retry
+from pypd.mixins import ClientMixin
+
+
+class MetricsRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry(buckets=(0.1, 1.0))
+
+    def record(self, elapsed, status=200, endpoint='incidents/{id}'):
+        self.registry.on_request_end(endpoint=endpoint, method='get',
+                                     status=status, elapsed=elapsed,
+                                     bytes_in=100, bytes_out=0)
+
+    def test_histogram(self):
+        self.record(0.05)
+        self.record(0.1)
+        self.record(0.5)
+        self.record(5)
+        text = self.registry.exposition()
+        labels = 'endpoint="incidents/{id}",method="GET"'
+        for line in (
+                'pypd_request_duration_seconds_bucket{%s,le="0.1"} 2',
+                'pypd_request_duration_seconds_bucket{%s,le="1.0"} 3',
+                'pypd_request_duration_seconds_bucket{%s,le="+Inf"} 4',
+                'pypd_request_duration_seconds_sum{%s} 5.65',
+                'pypd_request_duration_seconds_count{%s} 4',
+                'pypd_requests_total{%s,status="200"} 4',
+                'pypd_response_bytes_total{%s} 400',
+                'pypd_retries_total{%s} 0'):
+            self.assertIn(line % labels, text.splitlines())
+
+    def test_status_counts(self):
+        self.record(0.1, status=404)
+        self.record(0.1, status=None)
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot[('incidents/{id}', 'GET')]['statuses'],
+                         {'404': 1, 'error': 1})
+
+    def test_labels_are_escaped(self):
+        self.record(0.1, endpoint='a"b\\c')
+        self.assertIn('endpoint="a\\"b\\\\c"', self.registry.exposition())
+
+
+@requests_mock.Mocker()
+class RecordedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/incidents/PT4KHLK'
+        self.client = ClientMixin(api_key='FAUX_API_KEY',
+                                  base_url='https://api.pagerduty.com')
+        self.registry = metrics.set_metrics(metrics.MetricsRegistry())
+
+        previous_retry_policy = retry.get_retry_policy()
+        retry.set_retry_policy(retry.RetryPolicy(sleep=lambda s: None))
+        self.addCleanup(retry.set_retry_policy, previous_retry_policy)
+
+    def tearDown(self):
+        metrics.set_metrics(None)
+
+    def test_requests_are_recorded(self, m):
+        m.register_uri('PUT', self.url, [{'status_code': 503},
+                                         {'json': {'status': 'OK'}}])
+        self.client.request('PUT', 'incidents/PT4KHLK', data={'a': 1},
+                            idempotent=True)
+
+        series = self.registry.snapshot()[('incidents/{id}', 'PUT')]
+        self.assertEqual(series['count'], 2)
+        self.assertEqual(series['statuses'], {'503': 1, '200': 1})
+        self.assertEqual(series['retries'], 1)
+        self.assertEqual(series['bytes_out'], 2 * len(b'{"a": 1}'))
+        self.assertEqual(series['bytes_in'], len(b'{"status": "OK"}'))
+
+    def test_disabled(self, m):
+        metrics.set_metrics(None)
+        self.assertEqual(hooks.get('on_request_end'), ())
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'incidents/PT4KHLK')
+        self.assertEqual(self.registry.snapshot(), {})
+
+    def test_http_server(self, m):
+        m.real_http = True
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'incidents/PT4KHLK')
+
+        server = metrics.start_http_server(0, address='127.0.0.1')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:%d/metrics' % server.server_address[1]
+        with urlopen(url) as response:
+            body = response.read().decode('utf-8')
+        self.assertIn('pypd_requests_total{endpoint="incidents/{id}",'
+                      'method="GET",status="200"} 1', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests_mock
+
+from pypd import AuditRecord
+
+
+@requests_mock.Mocker()
+class AuditRecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/audit/records'
+        self.data = [{'id': 'P%03d' % n, 'action': 'update'}
+                     for n in range(250)]
+
+    def respond(self, request, context):
+        self.assertNotIn('offset', request.qs)
+        start = int(request.qs.get('cursor', ['0'])[0])
+        limit = int(request.qs['limit'][0])
+        end = start + limit
+        return {
+            'records': self.data[start:end],
+            'limit': limit,
+            'next_cursor': str(end) if end < len(self.data) else None,
+        }
+
+    def test_find_follows_cursors(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        records = AuditRecord.find(api_key='FAUX_API_KEY', limit=100)
+        self.assertEqual([r['id'] for r in records],
+                         [d['id'] for d in self.data])
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(m.request_history[1].qs['cursor'], ['100'])
+
+    def test_find_maximum(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        records = AuditRecord.find(maximum=120, limit=100)
+        self.assertEqual(len(records), 120)
+        self.assertEqual(m.last_request.qs['limit'], ['20'])
+
+    def test_find_first_page(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        records = AuditRecord.find(fetch_all=False, limit=50)
+        self.assertEqual(len(records), 50)
+        self.assertEqual(m.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
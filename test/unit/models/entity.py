@@ -1,14 +1,27 @@
 # Copyright (c) PagerDuty.
 # See LICENSE for details.
+import asyncio
 import unittest
 try:
     from urllib import urlencode
 except:
     from urllib.parse import urlencode
 
+import mock
 import requests_mock
 
+from pypd import pool
 from pypd.models.entity import Entity
+from pypd.models.windowed import TimeWindowed
+
+
+def run(coroutine):
+    """Run `coroutine` to completion on a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
 
 
 class EntityTestCase(unittest.TestCase):
@@ -51,6 +64,9 @@ class EntityTestCase(unittest.TestCase):
             endpoint = self.endpoint
 
         self.cls = TestEntity
+        # requests_mock only sees requests sent with `requests`
+        self.addCleanup(pool.set_async_pool, pool._async_pool)
+        pool.set_async_pool(pool.AsyncPool(native=False))
 
     def test_sanitize_endpoint(self):
         class PluralEndpoint(Entity):
@@ -95,6 +111,103 @@ class EntityTestCase(unittest.TestCase):
                 expected_result
             )
 
+    def test_endpoint_is_resolved_once(self):
+        class TrailingSlash(Entity):
+            endpoint = 'trailing_slashes/'
+
+        class EscalationRule(Entity):
+            pass
+
+        with mock.patch('pypd.models.entity.re') as re:
+            self.assertEqual(EscalationRule.get_endpoint(),
+                             'escalation_rules')
+            self.assertEqual(EscalationRule().endpoint, 'escalation_rules')
+        self.assertEqual(re.sub.call_count, 0)
+        self.assertEqual(TrailingSlash().endpoint, 'trailing_slashes')
+
+        # the endpoint can still be changed on the class
+        EscalationRule.endpoint = 'rules'
+        self.assertEqual(EscalationRule.get_endpoint(), 'rules')
+
+    def test_pagination_is_checked(self):
+        with self.assertRaises(ValueError):
+            class Paged(Entity):
+                PAGINATION = 'pages'
+
+        with self.assertRaises(ValueError):
+            class Windowed(Entity):
+                PAGINATION = 'time_window'
+
+        class Incident(TimeWindowed, Entity):
+            PAGINATION = 'time_window'
+
+        self.assertEqual(Incident.PAGINATION, 'time_window')
+
+    @requests_mock.Mocker()
+    def test_fetch_page_entities(self, m):
+        m.register_uri('GET', self.url, json=self.responses_data[1])
+        entities, _ = self.cls._fetch_page(api_key=self.api_key)
+        entity = entities[0]
+        self.assertEqual(entity.id, 'id5678')
+        self.assertEqual(entity.api_key, self.api_key)
+        self.assertEqual(entity.endpoint, self.endpoint)
+        self.assertEqual(entity.base_url, self.base_url)
+
+        class CustomInit(self.cls):
+            def __init__(self, *args, **kwargs):
+                super(CustomInit, self).__init__(*args, **kwargs)
+                self.custom = True
+
+        entities, _ = CustomInit._fetch_page(api_key=self.api_key)
+        self.assertTrue(entities[0].custom)
+
+    @requests_mock.Mocker()
+    def test_compact(self, m):
+        class Thing(self.cls):
+            INTERN_FIELDS = ('type', 'status',)
+
+        compact = Thing.compact()
+        self.assertIs(Thing.compact(), compact)
+        self.assertIs(compact.compact(), compact)
+        self.assertTrue(issubclass(compact, Thing))
+        self.assertEqual(compact.get_endpoint(), self.endpoint)
+
+        status = ''.join(['trig', 'gered'])
+        m.register_uri('GET', self.url, json={
+            'entities': [{'id': 'P1', 'type': 'thing', 'status': status},
+                         {'id': 'P2', 'type': 'thing', 'status': status}],
+            'more': False,
+        })
+        first, second = compact.find(api_key=self.api_key)
+        self.assertEqual(m.last_request.headers['Authorization'],
+                         'Token token=%s' % self.api_key)
+        self.assertIsInstance(first, Thing)
+        self.assertEqual(list(first), ['id', 'type', 'status'])
+        self.assertIs(first['status'], second['status'])
+        self.assertIs(first['status'], 'triggered')
+        # instances hold nothing but their data
+        self.assertFalse(hasattr(first, '__dict__') and first.__dict__)
+        self.assertEqual(first.endpoint, self.endpoint)
+        self.assertEqual(first.base_url, self.base_url)
+
+        # nor do fetched ones, which keep their validators in slots
+        m.register_uri('GET', self.url + '/P1', json={
+            'entity': {'id': 'P1'}}, headers={'ETag': '"1"'})
+        fetched = compact.fetch('P1', api_key=self.api_key)
+        self.assertEqual(fetched._validators, {'ETag': '"1"'})
+        self.assertFalse(fetched.__dict__)
+        self.assertIsNone(first._fetched)
+
+        other = compact(api_key='OTHER_API_KEY', _data={'id': 'P3'})
+        self.assertIsInstance(other, compact)
+        self.assertEqual(other.api_key, 'OTHER_API_KEY')
+        self.assertIsNone(compact(_data={}).api_key)
+
+        # the client's API key is held by the class itself
+        with mock.patch('pypd.api_key', self.api_key):
+            self.assertIs(type(compact(api_key=self.api_key)), compact)
+            self.assertIs(type(type(other)(api_key=self.api_key)), compact)
+
     @requests_mock.Mocker()
     def test_fetch_page(self, m):
         method = 'GET'
@@ -162,6 +275,74 @@ class EntityTestCase(unittest.TestCase):
             len(self.responses_data[1]['entities'])
         )
 
+    @requests_mock.Mocker()
+    def test_fetch_all_concurrently(self, m):
+        ids = ['id%s' % n for n in range(5)]
+        for n, id_ in enumerate(ids):
+            query = {'limit': 1, 'offset': n}
+            if n == 0:
+                query['total'] = 'true'
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, complete_qs=True, json={
+                'limit': 1,
+                'offset': n,
+                'total': len(ids),
+                'more': n < len(ids) - 1,
+                'entities': [{'id': id_}],
+            })
+
+        entities = self.cls._fetch_all(api_key=self.api_key, limit=1,
+                                       concurrency=3)
+        # pages come back in server order
+        self.assertEqual([e['id'] for e in entities], ids)
+
+        entities = self.cls._fetch_all(api_key=self.api_key, limit=1,
+                                       concurrency=3, maximum=3)
+        self.assertEqual([e['id'] for e in entities], ids[:3])
+
+    @requests_mock.Mocker()
+    def test_fetch_all_concurrently_overridden_page_flow(self, m):
+        for n in range(3):
+            query = {'limit': 1, 'offset': n}
+            if n == 0:
+                query['total'] = 'true'
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, complete_qs=True, json={
+                'limit': 1, 'offset': n, 'total': 3,
+                'entities': [{'id': 'id%s' % n}],
+            })
+        offsets = []
+
+        class CountingEntity(self.cls):
+            @classmethod
+            def _fetch_page_flow(cls, *args, **kwargs):
+                offsets.append(kwargs.get('offset'))
+                return (yield from super(CountingEntity, cls)._fetch_page_flow(
+                    *args, **kwargs))
+
+        entities = CountingEntity._fetch_all(api_key=self.api_key, limit=1,
+                                             concurrency=3)
+        self.assertEqual([e['id'] for e in entities], ['id0', 'id1', 'id2'])
+        # pages fetched by the workers go through the override too
+        self.assertEqual(sorted(offsets), [0, 1, 2])
+
+    @requests_mock.Mocker()
+    def test_fetch_all_concurrently_without_total(self, m):
+        # no total reported, falls back to walking page by page
+        for data in self.responses_data:
+            query = {
+                'limit': data['limit'],
+                'offset': data['offset'],
+            }
+            if data['offset'] == 0:
+                query['total'] = 'true'
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, json=data, complete_qs=True)
+
+        entities = self.cls._fetch_all(api_key=self.api_key, limit=self.limit,
+                                       concurrency=4)
+        self.assertEqual([e['id'] for e in entities], ['id1234', 'id5678'])
+
     @requests_mock.Mocker()
     def test_find(self, m):
         # setup mocked request uris
@@ -232,6 +413,84 @@ class EntityTestCase(unittest.TestCase):
         # expect that the excluded one is correctly Entity 1
         self.assertNotEqual(entities[0]['name'], 'Entity 1')
 
+    @requests_mock.Mocker()
+    def test_iter_find(self, m):
+        for data in self.responses_data:
+            query = {
+                'limit': data['limit'],
+                'offset': data['offset'],
+            }
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, json=data, complete_qs=True)
+
+        entities = self.cls.iter_find(api_key=self.api_key, limit=self.limit)
+        # nothing is fetched until iterated
+        self.assertEqual(m.call_count, 0)
+        self.assertEqual(next(entities)['id'], 'id1234')
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(next(entities)['id'], 'id5678')
+        self.assertEqual(m.call_count, 2)
+        self.assertRaises(StopIteration, next, entities)
+
+    @requests_mock.Mocker()
+    def test_find_one_with_exclude(self, m):
+        for data in self.responses_data:
+            query = {
+                'limit': data['limit'],
+                'offset': data['offset'],
+            }
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, json=data, complete_qs=True)
+
+        entity = self.cls.find_one(api_key=self.api_key, limit=self.limit,
+                                   exclude='Entity 1')
+        self.assertEqual(entity['id'], 'id5678')
+
+        entity = self.cls.find_one(api_key=self.api_key, limit=self.limit,
+                                   exclude=('Entity 1', 'Entity 2'))
+        self.assertIsNone(entity)
+
+    def test_find_one_uses_iter_find(self):
+        class FirstEntity(self.cls):
+            @classmethod
+            def iter_find(cls, *args, **kwargs):
+                yield cls(_data={'id': 'id1234', 'maximum': kwargs['maximum']})
+
+        entity = FirstEntity.find_one(api_key=self.api_key)
+        self.assertEqual(entity['id'], 'id1234')
+        self.assertEqual(entity['maximum'], 1)
+        entity = run(FirstEntity.afind_one(api_key=self.api_key))
+        self.assertEqual(entity['id'], 'id1234')
+
+    def test_compile_exclude_filter(self):
+        class ExcludeByFields(Entity):
+            endpoint = 'entities'
+            EXCLUDE_FILTERS = (
+                'id', 'tags',
+                lambda cls, item, ev: ev == item.get('name', '').upper(),
+            )
+
+        self.assertIsNone(ExcludeByFields._compile_exclude_filter(None))
+        self.assertIsNone(ExcludeByFields._compile_exclude_filter([]))
+
+        excluded = ExcludeByFields._compile_exclude_filter(
+            (v for v in ('id1234', ['a', 'b'], 'ENTITY 3')))
+        items = [
+            {'id': 'id1234'},
+            {'id': 'id5678', 'tags': ['a', 'b']},
+            {'id': 'id9012', 'tags': ['a'], 'name': 'Entity 3'},
+            {'id': 'id3456', 'tags': ['b'], 'name': 'Entity 4'},
+        ]
+        self.assertEqual([excluded(i) for i in items],
+                         [True, True, True, False])
+        # a generator of values is compiled once, not used up by an item
+        self.assertEqual([excluded(i) for i in items],
+                         [True, True, True, False])
+        self.assertTrue(
+            ExcludeByFields._find_exclude_filter(('id1234',), items[0]))
+        self.assertFalse(
+            ExcludeByFields._find_exclude_filter(None, items[0]))
+
     def test_translate_query_params_with_name(self):
         class TranslateNameQueryParam(Entity):
             TRANSLATE_QUERY_PARAM = ('name',)
@@ -325,6 +584,113 @@ class EntityTestCase(unittest.TestCase):
             )
             self.assertTrue(isinstance(entities[n], TestParseFunction))
 
+    @requests_mock.Mocker()
+    def test_afind(self, m):
+        for data in self.responses_data:
+            query = {
+                'limit': data['limit'],
+                'offset': data['offset'],
+            }
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, json=data, complete_qs=True)
+
+        entities = run(self.cls.afind(api_key=self.api_key, limit=self.limit))
+        self.assertEqual([e['id'] for e in entities], ['id1234', 'id5678'])
+
+    @requests_mock.Mocker()
+    def test_aiter_find(self, m):
+        for data in self.responses_data:
+            query = {
+                'limit': data['limit'],
+                'offset': data['offset'],
+            }
+            url = self.url + '?%s' % urlencode(query)
+            m.register_uri('GET', url, json=data, complete_qs=True)
+
+        async def collect():
+            return [entity async for entity in self.cls.aiter_find(
+                api_key=self.api_key,
+                limit=self.limit,
+                exclude=('Entity 1',),
+            )]
+
+        entities = run(collect())
+        self.assertEqual(len(entities), 1)
+        self.assertTrue(isinstance(entities[0], self.cls))
+        self.assertEqual(entities[0]['id'], 'id5678')
+
+    @requests_mock.Mocker()
+    def test_afetch(self, m):
+        url = '%s/%s' % (self.url, 'id1234')
+        m.register_uri('GET', url, json={'entity': {'id': 'id1234'}})
+
+        entity = run(self.cls.afetch('id1234', api_key=self.api_key))
+        self.assertTrue(isinstance(entity, self.cls))
+        self.assertEqual(entity['id'], 'id1234')
+
+    @requests_mock.Mocker()
+    def test_fetch_many(self, m):
+        for id_ in ('id1', 'id2', 'id3'):
+            m.register_uri('GET', '%s/%s' % (self.url, id_),
+                           json={'entity': {'id': id_}})
+        m.register_uri('GET', '%s/%s' % (self.url, 'missing'),
+                       status_code=404)
+
+        ids = ['id3', 'id1', 'missing', 'id3', 'id2', 'id1']
+        entities = self.cls.fetch_many(ids, api_key=self.api_key,
+                                       concurrency=3)
+        # fetched once per distinct ID, in the order given
+        self.assertEqual(m.call_count, 4)
+        self.assertEqual([e['id'] for e in entities], ['id3', 'id1', 'id2'])
+        self.assertTrue(all(isinstance(e, self.cls) for e in entities))
+        self.assertEqual(list(entities.errors), ['missing'])
+        self.assertEqual(
+            entities.errors['missing'].response.status_code, 404)
+
+    @requests_mock.Mocker()
+    def test_fetch_many_raise_errors(self, m):
+        m.register_uri('GET', '%s/%s' % (self.url, 'id1'),
+                       json={'entity': {'id': 'id1'}})
+        m.register_uri('GET', '%s/%s' % (self.url, 'missing'),
+                       status_code=404)
+
+        self.assertEqual(self.cls.fetch_many([], api_key=self.api_key), [])
+        self.assertRaises(Exception, self.cls.fetch_many, ['id1', 'missing'],
+                          api_key=self.api_key, concurrency=1,
+                          raise_errors=True)
+
+    @requests_mock.Mocker()
+    def test_refresh(self, m):
+        url = '%s/%s' % (self.url, 'id1234')
+        m.register_uri('GET', url, [
+            {'json': {'entity': {'id': 'id1234', 'name': 'Entity 1'}},
+             'headers': {'ETag': '"v1"',
+                         'Last-Modified': 'Fri, 07 Apr 2017 03:41:08 GMT'}},
+            {'status_code': 304},
+            {'json': {'entity': {'id': 'id1234', 'name': 'Renamed'}},
+             'headers': {'ETag': '"v2"'}},
+        ])
+
+        entity = self.cls.fetch('id1234', api_key=self.api_key)
+        self.assertFalse(entity.refresh())
+        self.assertEqual(m.last_request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(m.last_request.headers['If-Modified-Since'],
+                         'Fri, 07 Apr 2017 03:41:08 GMT')
+        self.assertEqual(entity['name'], 'Entity 1')
+
+        self.assertTrue(entity.refresh())
+        self.assertEqual(entity['name'], 'Renamed')
+        self.assertEqual(entity._validators, {'ETag': '"v2"'})
+
+    @requests_mock.Mocker()
+    def test_afetch_many(self, m):
+        m.register_uri('GET', '%s/%s' % (self.url, 'id1234'),
+                       json={'entity': {'id': 'id1234'}})
+
+        entities = run(self.cls.afetch_many(['id1234', 'id1234'],
+                                            api_key=self.api_key))
+        self.assertEqual([e['id'] for e in entities], ['id1234'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -28,7 +28,7 @@ class EntityTestCase(unittest.TestCase):
         self.endpoint = 'escalation_policies'
         self.url = '%s/%s' % (self.base_url, self.endpoint,)
         self.api_key = 'FAUX_API_KEY'
-        self.limit = 25
+        self.limit = EscalationPolicy.MAX_LIMIT_VALUE
 
         base_path = os.path.join(
             os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
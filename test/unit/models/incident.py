@@ -2,17 +2,22 @@
 # See LICENSE for details.
 import re
 import json
+import datetime
+import asyncio
+import threading
+import time
 import unittest
 import os.path
 try:
     from urllib import urlencode
 except ImportError:
     from urllib.parse import urlencode
+from urllib.parse import parse_qs, unquote, urlparse
 from operator import itemgetter
 
 import requests_mock
 
-from pypd import Incident
+from pypd import Incident, pool
 from pypd.errors import InvalidArguments, MissingFromEmail
 
 
@@ -53,6 +58,10 @@ class IncidentTestCase(unittest.TestCase):
         with open(path) as f:
             self.service_data = json.load(f)
 
+        # requests_mock only sees requests sent with `requests`
+        self.addCleanup(pool.set_async_pool, pool._async_pool)
+        pool.set_async_pool(pool.AsyncPool(native=False))
+
     @requests_mock.Mocker()
     def test_resolve_invalid_from_email(self, m):
         """Coverage for using an invalid (cheaply validated) from email."""
@@ -227,3 +236,171 @@ class IncidentTestCase(unittest.TestCase):
         )
         self.assertNotEqual(incident['id'], note['id'])
         self.assertEqual(content, note['content'])
+
+    @requests_mock.Mocker()
+    def test_aresolve_valid(self, m):
+        """Coverage for resolving an incident from a coroutine."""
+        query = {
+            'limit': 1,
+            'offset': 0,
+        }
+        url = self.url + '?{}'.format(urlencode(query))
+        m.register_uri('GET', url, json=self.query_datas[0], complete_qs=True)
+        path = os.path.join(
+            self.base_path,
+            'sample_incident_resolve_response.json'
+        )
+        with open(path) as f:
+            resolve_response = json.load(f)
+
+        async def find_and_resolve():
+            incident = await Incident.afind_one(api_key=self.api_key)
+            url = '{0}/{1}'.format(self.url, incident['id'])
+            m.register_uri('PUT', url, json=resolve_response)
+            response = await incident.aresolve('jdc@pagerduty.com')
+            return incident, response
+
+        loop = asyncio.new_event_loop()
+        try:
+            incident, response = loop.run_until_complete(find_and_resolve())
+        finally:
+            loop.close()
+        self.assertEqual(incident['id'], response['incidents'][0]['id'])
+
+
+class DenseIncident(Incident):
+    endpoint = 'incidents'
+    MAX_LIMIT_VALUE = 5
+    MAX_OFFSET = 10
+
+
+@requests_mock.Mocker()
+class ShardedFindTestCase(unittest.TestCase):
+    """Tests for finding incidents by time windows."""
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/incidents'
+        self.since = datetime.datetime(2018, 1, 1)
+        self.until = self.since + datetime.timedelta(hours=1)
+        # most incidents happen in the first ten minutes
+        minutes = list(range(10)) * 4 + list(range(10, 60, 3))
+        self.data = sorted(
+            ({'id': 'P%03d' % n,
+              'created_at': self.since + datetime.timedelta(minutes=minute)}
+             for n, minute in enumerate(minutes)),
+            key=itemgetter('created_at'))
+        # most incidents the server pages at once, if it caps pages
+        self.page_cap = None
+        # requests left in flight by finds stopped early are waited on, and
+        # answered by a mocker of their own instead of the network
+        mocker = requests_mock.Mocker()
+        mocker.start()
+        self.addCleanup(mocker.stop)
+        self.addCleanup(self.join_windows)
+
+    def join_windows(self):
+        """Wait on the requests left in flight by finds stopped early."""
+        for thread in threading.enumerate():
+            if thread.name.startswith('pypd-window'):
+                thread.join()
+
+    def respond(self, request, context):
+        qs = parse_qs(urlparse(request.url).query)
+        since, until = (datetime.datetime.strptime(qs[k][0][:19],
+                                                   '%Y-%m-%dT%H:%M:%S')
+                        for k in ('since', 'until'))
+        offset, limit = int(qs['offset'][0]), int(qs['limit'][0])
+        if self.page_cap is not None:
+            limit = min(limit, self.page_cap)
+        # windows include both their ends, so incidents can be found twice
+        found = [dict(d, created_at=d['created_at'].isoformat())
+                 for d in self.data if since <= d['created_at'] <= until]
+        return {
+            'incidents': found[offset:offset + limit],
+            'offset': offset,
+            'limit': limit,
+            'total': len(found) if 'total' in qs else None,
+            'more': offset + limit < len(found),
+        }
+
+    def test_sharded_find(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        incidents = DenseIncident.find(api_key='FAUX_API_KEY',
+                                       since=self.since, until=self.until,
+                                       sharded=True, concurrency=3)
+        self.assertEqual([i['id'] for i in incidents],
+                         [d['id'] for d in self.data])
+        self.assertTrue(all(isinstance(i, DenseIncident) for i in incidents))
+        # dense windows were cut until they could be paged through
+        offsets = [int(parse_qs(urlparse(r.url).query)['offset'][0])
+                   for r in m.request_history]
+        self.assertLess(max(offsets), DenseIncident.MAX_OFFSET)
+        self.assertGreater(len(m.request_history), 3)
+
+    def test_sharded_find_maximum(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        incidents = list(DenseIncident.iter_find(
+            since=self.since, until=self.until, sharded=True, maximum=7))
+        self.assertEqual([i['id'] for i in incidents],
+                         [d['id'] for d in self.data[:7]])
+
+    def test_sharded_find_server_capped_pages(self, m):
+        self.page_cap = 3
+        m.register_uri('GET', self.url, json=self.respond)
+        incidents = DenseIncident.find(since=self.since, until=self.until,
+                                       sharded=True, concurrency=3)
+        self.assertEqual([i['id'] for i in incidents],
+                         [d['id'] for d in self.data])
+
+    def test_sharded_find_one_stops_early(self, m):
+        class SparseIncident(DenseIncident):
+            MAX_OFFSET = 1000
+
+        m.register_uri('GET', self.url, json=self.respond)
+        incident = SparseIncident.find_one(since=self.since, until=self.until,
+                                           sharded=True, concurrency=1)
+        self.assertEqual(incident['id'], self.data[0]['id'])
+        self.assertEqual(m.call_count, 1)
+
+    def test_sharded_find_stops_without_waiting(self, m):
+        released = threading.Event()
+        middle = self.since + (self.until - self.since) / 2
+
+        def respond(request, context):
+            # the second window hangs until the test is done
+            if 'since=%s' % middle.isoformat() in unquote(request.url):
+                released.wait(5)
+            return self.respond(request, context)
+
+        m.register_uri('GET', self.url, json=respond)
+        incidents = Incident.iter_find(since=self.since, until=self.until,
+                                       sharded=True, concurrency=2)
+        try:
+            self.assertEqual(next(incidents)['id'], self.data[0]['id'])
+            started = time.monotonic()
+            incidents.close()
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            released.set()
+
+    def test_sharded_find_first_page(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        incidents = DenseIncident.find(since=self.since, until=self.until,
+                                       sharded=True, fetch_all=False)
+        self.assertEqual([i['id'] for i in incidents],
+                         [d['id'] for d in self.data[:5]])
+        self.assertEqual(m.call_count, 1)
+
+    def test_time_window_pagination(self, m):
+        class WindowedIncident(DenseIncident):
+            PAGINATION = 'time_window'
+
+        m.register_uri('GET', self.url, json=self.respond)
+        incidents = WindowedIncident.find(since=self.since, until=self.until)
+        self.assertEqual(len(incidents), len(self.data))
+
+    def test_sharded_find_needs_range(self, m):
+        with self.assertRaises(InvalidArguments):
+            Incident.find(since=self.since, sharded=True)
+        with self.assertRaises(InvalidArguments):
+            Incident.find(since=self.until, until=self.since, sharded=True)
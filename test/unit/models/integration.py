@@ -134,6 +134,10 @@ class IntegrationTestCase(unittest.TestCase):
         Integration.validate(integration._data)
         self.assertDictEqual(integration._data, integration_data)
 
+        # keyword arguments are query params, as for `integrations()`
+        service.get_integration(integration_id, include=['vendors'])
+        self.assertEqual(m.last_request.qs, {'include[]': ['vendors']})
+
     @requests_mock.Mocker()
     def test_fetch_with_service_id(self, m):
         # setup mocked request uris
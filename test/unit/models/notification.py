@@ -0,0 +1,74 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import datetime
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+import requests_mock
+
+from pypd import Notification
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+
+
+@requests_mock.Mocker()
+class NotificationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/notifications'
+        self.since = datetime.datetime(2018, 1, 1)
+        self.until = datetime.datetime(2018, 4, 1)
+        self.data = [
+            {'id': 'P%03d' % day,
+             'start_time': self.since + datetime.timedelta(days=day)}
+            for day in range(0, 90, 2)
+        ]
+
+    def respond(self, request, context):
+        qs = parse_qs(urlparse(request.url).query)
+        since, until = parse_date(qs['since'][0]), parse_date(qs['until'][0])
+        if until - since > datetime.timedelta(days=30):
+            context.status_code = 400
+            return {'error': {'message': 'Date range is too large'}}
+
+        offset, limit = int(qs['offset'][0]), int(qs['limit'][0])
+        found = [dict(d, start_time=d['start_time'].isoformat())
+                 for d in self.data if since <= d['start_time'] < until]
+        return {
+            'notifications': found[offset:offset + limit],
+            'offset': offset,
+            'limit': limit,
+            'total': len(found) if 'total' in qs else None,
+            'more': offset + limit < len(found),
+        }
+
+    def test_find_long_range(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        notifications = Notification.find(api_key='FAUX_API_KEY',
+                                          since=self.since, until=self.until)
+        self.assertEqual([n['id'] for n in notifications],
+                         [d['id'] for d in self.data])
+        self.assertGreaterEqual(m.call_count, 4)
+
+    def test_iter_find_long_range(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        notifications = Notification.iter_find(since=self.since,
+                                               until=self.until,
+                                               concurrency=2)
+        self.assertEqual(next(notifications)['id'], self.data[0]['id'])
+        self.assertEqual(len(list(notifications)), len(self.data) - 1)
+
+    def test_find_short_range(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        until = self.since + datetime.timedelta(days=10)
+        notifications = Notification.find(since=self.since, until=until)
+        self.assertEqual(len(notifications), 5)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(m.last_request.qs['since'],
+                         [self.since.isoformat().lower()])
+
+
+if __name__ == '__main__':
+    unittest.main()
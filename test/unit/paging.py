@@ -0,0 +1,141 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import time
+import unittest
+
+import requests_mock
+
+from pypd import hooks, metrics, paging, ratelimit
+from pypd.models.entity import Entity
+
+
+class PageSizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = []
+        hooks.register('on_page_size', self.record)
+        self.addCleanup(hooks.unregister, 'on_page_size', self.record)
+        sizing = paging.PageSizing(slow=2.0, large=1000, minimum=10)
+        self.sizer = sizing.sizer(100, 'incidents')
+
+    def record(self, previous, limit, reason, **kwargs):
+        self.changes.append((previous, limit, reason))
+
+    def test_slow_pages_shrink(self):
+        self.assertEqual(self.sizer.update(3.0, 0), 50)
+        self.assertEqual(self.sizer.update(3.0, 0), 25)
+        self.assertEqual(self.sizer.update(3.0, 0), 12)
+        self.assertEqual(self.sizer.update(3.0, 0), 10)
+        self.assertEqual(self.sizer.update(3.0, 0), 10)
+        self.assertEqual(self.changes[0], (100, 50, 'slow'))
+        self.assertEqual(len(self.changes), 4)
+
+    def test_large_pages_shrink_and_recover(self):
+        self.assertEqual(self.sizer.update(0.1, 5000), 50)
+        # neither fast nor small enough to grow back
+        self.assertEqual(self.sizer.update(1.5, 100), 50)
+        self.assertEqual(self.sizer.update(0.1, 100), 100)
+        self.assertEqual(self.sizer.update(0.1, 100), 100)
+        self.assertEqual(self.changes, [(100, 50, 'large'),
+                                        (50, 100, 'recovered')])
+
+
+@requests_mock.Mocker()
+class AdaptivePagesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/entities'
+        self.data = [{'id': 'P%03d' % n, 'name': 'x' * 50}
+                     for n in range(250)]
+        paging.set_page_sizing(paging.PageSizing(large=3000))
+        self.addCleanup(paging.set_page_sizing, paging.PageSizing())
+
+        class TestEntity(Entity):
+            endpoint = 'entities'
+
+        self.cls = TestEntity
+
+    def respond(self, request, context):
+        offset = int(request.qs['offset'][0])
+        limit = int(request.qs['limit'][0])
+        return {
+            'entities': self.data[offset:offset + limit],
+            'offset': offset,
+            'limit': limit,
+            'more': offset + limit < len(self.data),
+        }
+
+    def respond_capped(self, request, context):
+        """Respond like a server paging at most 25 entities at a time."""
+        offset = int(request.qs['offset'][0])
+        limit = min(25, int(request.qs['limit'][0]))
+        return {
+            'entities': self.data[offset:offset + limit],
+            'offset': offset,
+            'limit': limit,
+            'more': offset + limit < len(self.data),
+            'total': len(self.data) if 'total' in request.qs else None,
+        }
+
+    def limits(self, m):
+        return [int(r.qs['limit'][0]) for r in m.request_history]
+
+    def test_largest_pages_by_default(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        paging.set_page_sizing(None)
+        entities = self.cls.find()
+        self.assertEqual(len(entities), 250)
+        self.assertEqual(self.limits(m), [100, 100, 100])
+
+    def test_maximum_shrinks_pages(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        paging.set_page_sizing(None)
+        self.assertEqual(len(self.cls.find(maximum=30)), 30)
+        self.assertEqual(len(self.cls.find(maximum=130)), 130)
+        self.assertEqual(self.limits(m), [30, 100, 30])
+
+    def test_large_pages_shrink(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        registry = metrics.set_metrics(metrics.MetricsRegistry())
+        self.addCleanup(metrics.set_metrics, None)
+
+        entities = self.cls.find()
+        self.assertEqual([e['id'] for e in entities],
+                         [d['id'] for d in self.data])
+        limits = self.limits(m)
+        self.assertEqual(limits[:3], [100, 50, 25])
+        self.assertLess(max(limits[3:]), 100)
+
+        series = registry.snapshot()[('entities', 'GET')]
+        self.assertEqual(series['page_size'], limits[-1])
+        self.assertGreaterEqual(series['page_size_changes']['large'], 2)
+        self.assertIn('pypd_page_size_changes_total{endpoint="entities",'
+                      'method="GET",reason="large"}',
+                      registry.exposition())
+
+    def test_server_capped_pages(self, m):
+        m.register_uri('GET', self.url, json=self.respond_capped)
+        ids = [d['id'] for d in self.data]
+        for concurrency in (1, 4):
+            entities = self.cls.find(concurrency=concurrency)
+            self.assertEqual([e['id'] for e in entities], ids)
+        # only the first page of each find asks for more than the server pages
+        self.assertEqual(sorted(set(self.limits(m))), [25, 100])
+        self.assertEqual(self.limits(m).count(100), 2)
+
+    def test_rate_limiting_is_not_slowness(self, m):
+        m.register_uri('GET', self.url, json=self.respond)
+        paging.set_page_sizing(paging.PageSizing(slow=0.05))
+        previous = ratelimit.get_rate_limiter()
+        ratelimit.set_rate_limiter(ratelimit.RateLimiter(rate=10, burst=1))
+        self.addCleanup(ratelimit.set_rate_limiter, previous)
+
+        started = time.monotonic()
+        self.assertEqual(len(self.cls.find(concurrency=1)), 250)
+        # every page waited on the rate limiter, none was made smaller
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(self.limits(m), [100, 100, 100])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import asyncio
+import json
+import threading
+import unittest
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from pypd import Client, pool
+from pypd.mixins import ClientMixin
+from pypd.retry import RetryPolicy
+
+httpx = pool._import_httpx()
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"status": "OK"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:%s' % self.server.server_port
+        self.previous_pool = pool._pool
+        self.pool = pool.set_pool(pool.ConnectionPool())
+
+    def tearDown(self):
+        pool.set_pool(self.previous_pool)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_per_base_url_and_proxies(self):
+        session = self.pool.session(self.base_url)
+        self.assertIs(session, self.pool.session(self.base_url))
+        self.assertIsNot(session, self.pool.session('http://other'))
+        self.assertIsNot(
+            session,
+            self.pool.session(self.base_url, {'https': 'http://proxy:8080'}),
+        )
+        self.assertEqual(self.pool.stats()['sessions'], 3)
+
+    def test_connections_are_reused(self):
+        client = ClientMixin(api_key='FAUX_API_KEY', base_url=self.base_url)
+        for _ in range(3):
+            self.assertEqual(client.request('GET', 'mock'), {'status': 'OK'})
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['waits'], 0)
+
+    def test_set_pool_closes_previous(self):
+        session = self.pool.session(self.base_url)
+        pool.set_pool(pool.ConnectionPool())
+        self.assertIsNot(session, pool.get_pool().session(self.base_url))
+        self.assertEqual(self.pool.stats()['sessions'], 0)
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class NativeAsyncPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.responses = {}
+        self.in_flight = self.peak = 0
+        self.async_pool = pool.AsyncPool(
+            transport=httpx.MockTransport(self.respond))
+        self.client = Client(api_key='FAUX_API_KEY',
+                             async_pool=self.async_pool, rate_limiter=None,
+                             retry_policy=RetryPolicy(backoff=0))
+        self.addCleanup(self.client.close)
+
+    async def respond(self, request):
+        self.requests.append(request)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        response = self.responses.get(request.url.path)
+        if isinstance(response, list):
+            response = response.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        status, body = response or (404, {})
+        return httpx.Response(status, content=json.dumps(body).encode())
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.run_until_complete(self.async_pool.aclose())
+            loop.close()
+
+    def test_requests_do_not_hold_threads(self):
+        for n in range(200):
+            self.responses['/services/P%s' % n] = (
+                200, {'service': {'id': 'P%s' % n}})
+
+        async def fetch():
+            return await asyncio.gather(*[
+                self.client.Service.afetch('P%s' % n) for n in range(200)])
+
+        services = self.run_async(fetch())
+        self.assertEqual([s['id'] for s in services],
+                         ['P%s' % n for n in range(200)])
+        self.assertTrue(self.peak > 10)
+        self.assertIsNone(self.async_pool._executor)
+
+    def test_find_pages(self):
+        self.responses['/services'] = [
+            (200, {'services': [{'id': 'P1', 'name': 'a'}], 'more': True,
+                   'offset': 0, 'limit': 1}),
+            (200, {'services': [{'id': 'P2', 'name': 'b'}], 'more': False,
+                   'offset': 1, 'limit': 1}),
+        ]
+
+        services = self.run_async(self.client.Service.afind(
+            limit=1, exclude=['a'], include=['teams']))
+        self.assertEqual([s['id'] for s in services], ['P2'])
+        self.assertEqual(
+            str(self.requests[1].url),
+            'https://api.pagerduty.com/services'
+            '?include%5B%5D=teams&offset=1&limit=1')
+        self.assertEqual(self.requests[0].headers['Authorization'],
+                         'Token token=FAUX_API_KEY')
+
+    def test_retries_and_errors(self):
+        self.responses['/services/P1'] = [
+            (502, {}), (200, {'service': {'id': 'P1'}})]
+        service = self.run_async(self.client.Service.afetch('P1'))
+        self.assertEqual(service['id'], 'P1')
+        self.assertEqual(len(self.requests), 2)
+
+        self.responses['/services/P2'] = [
+            httpx.ReadTimeout('timed out')] * 3
+        self.assertRaises(requests.exceptions.Timeout, self.run_async,
+                          self.client.Service.afetch('P2'))
+        self.responses['/services/P3'] = (404, {})
+        self.assertRaises(requests.exceptions.HTTPError, self.run_async,
+                          self.client.Service.afetch('P3'))
+
+    def test_overridden_methods_fall_back_to_threads(self):
+        from pypd.errors import InvalidEndpoint
+
+        self.assertRaises(InvalidEndpoint, self.run_async,
+                          self.client.Notification.afetch('P1'))
+        self.assertIsNotNone(self.async_pool._executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
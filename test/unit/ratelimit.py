@@ -0,0 +1,141 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests_mock
+
+from pypd import ratelimit
+from pypd.deadline import Deadline
+from pypd.mixins import ClientMixin
+from pypd.errors import RateLimitExceeded, DeadlineExceeded
+
+from .clock import FakeClock
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = ratelimit.TokenBucket(2, 2, clock=self.clock,
+                                            sleep=self.clock.sleep)
+
+    def test_acquire_paces_once_empty(self):
+        self.assertEqual(self.bucket.acquire(), 0)
+        self.assertEqual(self.bucket.acquire(), 0)
+        self.assertEqual(self.bucket.acquire(), 0.5)
+        self.assertEqual(self.bucket.acquire(), 0.5)
+        self.assertEqual(self.clock.slept, [0.5, 0.5])
+
+    def test_pause(self):
+        self.bucket.pause(3)
+        self.assertEqual(self.bucket.acquire(), 3.5)
+
+    def test_update_from_server_budget(self):
+        self.bucket.update(remaining=10, reset=5)
+        self.assertEqual(self.bucket.rate, 2)
+
+        self.bucket.update(remaining=0, reset=4)
+        self.assertTrue(self.bucket.acquire() >= 4)
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def test_defaults_stay_within_a_minute_of_budget(self):
+        clock = FakeClock()
+        limiter = ratelimit.RateLimiter(clock=clock, sleep=clock.sleep)
+        requests = 0
+        while True:
+            limiter.acquire('key')
+            if clock.now >= 60:
+                break
+            requests += 1
+        self.assertTrue(requests <= 960)
+
+    def test_acquire_does_not_wait_past_deadline(self):
+        clock = FakeClock()
+        limiter = ratelimit.RateLimiter(clock=clock, sleep=clock.sleep)
+        limiter.bucket('key').pause(3)
+        self.assertRaises(DeadlineExceeded, limiter.acquire, 'key',
+                          Deadline(0.5, clock=clock))
+        self.assertEqual(clock.slept, [])
+        # the token is given back
+        self.assertEqual(limiter.acquire('key', Deadline(10, clock=clock)),
+                         3.0 + 1 / limiter.rate)
+
+
+class RetryAfterTestCase(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(ratelimit.retry_after({'Retry-After': '3'}), 3)
+
+    def test_http_date(self):
+        delay = ratelimit.retry_after(
+            {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(delay, 0)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(ratelimit.retry_after({}))
+        self.assertIsNone(ratelimit.retry_after({'Retry-After': 'soon'}))
+
+
+@requests_mock.Mocker()
+class RateLimitedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/mock'
+        self.clock = FakeClock()
+        self.previous_rate_limiter = ratelimit.get_rate_limiter()
+        self.rate_limiter = ratelimit.set_rate_limiter(
+            ratelimit.RateLimiter(rate=10, burst=10, max_retries=2,
+                                  clock=self.clock, sleep=self.clock.sleep)
+        )
+        self.client = ClientMixin(api_key='FAUX_API_KEY',
+                                  base_url='https://api.pagerduty.com')
+
+    def tearDown(self):
+        ratelimit.set_rate_limiter(self.previous_rate_limiter)
+
+    def test_429_is_retried_after_retry_after(self, m):
+        m.register_uri('GET', self.url, [
+            {'status_code': 429, 'headers': {'Retry-After': '2'}},
+            {'json': {'status': 'OK'}},
+        ])
+        result = self.client.request('GET', 'mock')
+        self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(m.call_count, 2)
+        self.assertTrue(sum(self.clock.slept) >= 2)
+
+    def test_429_retries_exhausted(self, m):
+        m.register_uri('GET', self.url, status_code=429,
+                       headers={'Retry-After': '1'})
+        self.assertRaises(RateLimitExceeded, self.client.request, 'GET',
+                          'mock')
+        self.assertEqual(m.call_count, 3)
+
+    def test_429_retry_after_past_deadline(self, m):
+        m.register_uri('GET', self.url, [
+            {'status_code': 429, 'headers': {'Retry-After': '3'}},
+            {'json': {'status': 'OK'}},
+        ])
+        self.assertRaises(RateLimitExceeded, self.client.request, 'GET',
+                          'mock', deadline=Deadline(0.5, clock=self.clock))
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(self.clock.slept, [])
+
+        # the paused budget does not allow another request before it either
+        self.assertRaises(DeadlineExceeded, self.client.request, 'GET',
+                          'mock', deadline=Deadline(0.5, clock=self.clock))
+        self.assertEqual(m.call_count, 1)
+
+    def test_budget_follows_headers(self, m):
+        m.register_uri('GET', self.url, json={'status': 'OK'}, headers={
+            'ratelimit-remaining': '0',
+            'ratelimit-reset': '30',
+        })
+        self.client.request('GET', 'mock')
+        self.client.request('GET', 'mock')
+        self.assertTrue(sum(self.clock.slept) >= 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import unittest
+
+import requests_mock
+from requests.exceptions import ConnectionError
+
+from pypd import retry, EventV2
+from pypd.mixins import ClientMixin
+from pypd.errors import UnknownError
+
+from .clock import FakeClock
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.policy = retry.RetryPolicy(
+            max_attempts=4, backoff=1, max_backoff=3, jitter=False,
+            deadline=10, clock=self.clock, sleep=self.clock.sleep,
+        )
+
+    def test_backoff_is_capped(self):
+        delays = [self.policy.backoff_for(n) for n in range(1, 5)]
+        self.assertEqual(delays, [1, 2, 3, 3])
+
+    def test_jitter(self):
+        policy = retry.RetryPolicy(backoff=2, jitter=True, rand=lambda: 0.25)
+        self.assertEqual(policy.backoff_for(1), 0.5)
+
+    def test_idempotency(self):
+        self.assertEqual(self.policy.delay('get', 1, 0, status=503), 1)
+        self.assertIsNone(self.policy.delay('post', 1, 0, status=503))
+        self.assertEqual(
+            self.policy.delay('post', 1, 0, status=503, idempotent=True), 1)
+        self.assertIsNone(
+            self.policy.delay('get', 1, 0, status=503, idempotent=False))
+
+    def test_only_transient_failures(self):
+        self.assertIsNone(self.policy.delay('get', 1, 0, status=500))
+        self.assertIsNone(self.policy.delay('get', 1, 0, status=400))
+        self.assertIsNone(
+            self.policy.delay('get', 1, 0, error=ValueError()))
+        self.assertEqual(
+            self.policy.delay('get', 1, 0, error=ConnectionError()), 1)
+
+    def test_attempts_and_deadline(self):
+        self.assertIsNone(self.policy.delay('get', 4, 0, status=503))
+        self.clock.now = 9.5
+        self.assertIsNone(self.policy.delay('get', 1, 0, status=503))
+
+
+@requests_mock.Mocker()
+class RetriedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/mock'
+        self.clock = FakeClock()
+        self.previous_retry_policy = retry.get_retry_policy()
+        self.policy = retry.set_retry_policy(retry.RetryPolicy(
+            max_attempts=3, backoff=1, jitter=False, clock=self.clock,
+            sleep=self.clock.sleep,
+        ))
+        self.client = ClientMixin(api_key='FAUX_API_KEY',
+                                  base_url='https://api.pagerduty.com')
+
+    def tearDown(self):
+        retry.set_retry_policy(self.previous_retry_policy)
+
+    def test_get_is_retried(self, m):
+        m.register_uri('GET', self.url, [
+            {'status_code': 503},
+            {'exc': ConnectionError},
+            {'json': {'status': 'OK'}},
+        ])
+        result = self.client.request('GET', 'mock')
+        self.assertEqual(result, {'status': 'OK'})
+        self.assertEqual(self.policy.stats(),
+                         {'retries': 2, 'sleep_time': 3.0})
+
+    def test_get_retries_exhausted(self, m):
+        m.register_uri('GET', self.url, status_code=502)
+        self.assertRaises(UnknownError, self.client.request, 'GET', 'mock')
+        self.assertEqual(m.call_count, 3)
+
+    def test_post_is_not_retried(self, m):
+        m.register_uri('POST', self.url, status_code=503)
+        self.assertRaises(UnknownError, self.client.request, 'POST', 'mock',
+                          data={})
+        self.assertEqual(m.call_count, 1)
+
+    def test_event_with_dedup_key_is_retried(self, m):
+        url = EventV2.base_url + '/'
+        m.register_uri('POST', url, [
+            {'status_code': 503},
+            {'json': {'status': 'success'}},
+        ])
+        data = {
+            'routing_key': 'ROUTING_KEY',
+            'event_action': 'trigger',
+            'dedup_key': 'DEDUP_KEY',
+            'payload': {
+                'summary': 'summary',
+                'source': 'source',
+                'severity': 'error',
+            },
+        }
+        result = EventV2.create(data=data)
+        self.assertEqual(result, {'status': 'success'})
+        self.assertEqual(m.call_count, 2)
+
+        m.register_uri('POST', url, [
+            {'status_code': 503},
+            {'json': {'status': 'success'}},
+        ])
+        m.reset_mock()
+        data.pop('dedup_key')
+        self.assertRaises(UnknownError, EventV2.create, data=data)
+        self.assertEqual(m.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
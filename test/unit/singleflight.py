@@ -0,0 +1,157 @@
+# Copyright (c) PagerDuty.
+# See LICENSE for details.
+import asyncio
+import threading
+import time
+import unittest
+
+import requests_mock
+
+from pypd import pool, singleflight
+from pypd.deadline import Deadline
+from pypd.errors import DeadlineExceeded
+from pypd.mixins import AsyncClientMixin
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.single_flight = singleflight.SingleFlight()
+
+    def run_concurrently(self, func, n):
+        """Call `do` from `n` threads while the first call is in flight."""
+        results = []
+
+        def call():
+            try:
+                results.append(self.single_flight.do('key', func))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def leader(self, n, result=None, error=None):
+        calls = []
+
+        def func():
+            calls.append(1)
+            wait_for(lambda: self.single_flight.coalesced == n - 1)
+            if error is not None:
+                raise error
+            return result
+        return func, calls
+
+    def test_calls_are_shared(self):
+        func, calls = self.leader(4, result={'users': []})
+        results = self.run_concurrently(func, 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'users': []}] * 4)
+        # every caller got its own copy
+        self.assertEqual(len(set(id(r) for r in results)), 4)
+        self.assertEqual(self.single_flight.stats(), {'coalesced': 3})
+
+    def test_errors_are_shared(self):
+        error = ValueError()
+        func, calls = self.leader(3, error=error)
+        results = self.run_concurrently(func, 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [error] * 3)
+
+    def test_followers_wait_until_their_deadline(self):
+        release = threading.Event()
+        leader = threading.Thread(
+            target=self.single_flight.do, args=('key', release.wait))
+        leader.start()
+        self.addCleanup(leader.join)
+        self.addCleanup(release.set)
+        wait_for(lambda: 'key' in self.single_flight._calls)
+
+        started = time.monotonic()
+        self.assertRaises(DeadlineExceeded, self.single_flight.do, 'key',
+                          release.wait, deadline=Deadline(0.05))
+        self.assertTrue(time.monotonic() - started < 1)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.assertEqual(self.single_flight.do('key', lambda: 1), 1)
+        self.assertEqual(self.single_flight.do('key', lambda: 2), 2)
+        self.assertEqual(self.single_flight.coalesced, 0)
+
+
+@requests_mock.Mocker()
+class CoalescedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'https://api.pagerduty.com/services/PSERVIC'
+        self.client = AsyncClientMixin(api_key='FAUX_API_KEY',
+                                       base_url='https://api.pagerduty.com')
+        self.single_flight = singleflight.set_single_flight(
+            singleflight.SingleFlight())
+        self.addCleanup(singleflight.set_single_flight,
+                        singleflight.SingleFlight())
+        # requests_mock only sees requests sent with `requests`
+        self.addCleanup(pool.set_async_pool, pool._async_pool)
+        pool.set_async_pool(pool.AsyncPool(native=False))
+
+    def test_threaded_requests(self, m):
+        def respond(request, context):
+            wait_for(lambda: self.single_flight.coalesced == 2)
+            return {'service': {'id': 'PSERVIC'}}
+
+        m.register_uri('GET', self.url, json=respond)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.client.request('GET', 'services/PSERVIC')))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(results, [{'service': {'id': 'PSERVIC'}}] * 3)
+
+    def test_different_params_are_not_shared(self, m):
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'services/PSERVIC',
+                            query_params={'include': ['teams']})
+        self.client.request('GET', 'services/PSERVIC')
+        self.assertEqual(m.call_count, 2)
+
+    def test_async_requests(self, m):
+        m.register_uri('GET', self.url, json={'service': {'id': 'PSERVIC'}})
+
+        async def fetch():
+            return await asyncio.gather(*[
+                self.client.arequest('GET', 'services/PSERVIC')
+                for _ in range(3)
+            ])
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(fetch())
+        finally:
+            loop.close()
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(results, [{'service': {'id': 'PSERVIC'}}] * 3)
+        self.assertEqual(self.single_flight.coalesced, 2)
+
+    def test_disabled(self, m):
+        singleflight.set_single_flight(None)
+        m.register_uri('GET', self.url, json={})
+        self.client.request('GET', 'services/PSERVIC')
+        self.assertEqual(m.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()